@@ -21,6 +21,7 @@ const ShopeeScraperUI = () => {
   const [reviewsFile, setReviewsFile] = useState(null);
   const [maxReviews, setMaxReviews] = useState(1000);
   const [analyzeFile, setAnalyzeFile] = useState(null);
+  const [preview, setPreview] = useState(null);
 
   useEffect(() => {
     // Check server health on mount
@@ -32,37 +33,38 @@ const ShopeeScraperUI = () => {
     return () => clearInterval(healthInterval);
   }, []);
 
-  // Poll for task status when a task is running
+  // Stream task logs and status changes while a task is running.  The
+  // browser reconnects by itself, resuming after the last log id it saw.
   useEffect(() => {
-    if (!isRunning) return;
+    if (!isRunning || !taskId) return;
     
-    const pollInterval = setInterval(async () => {
-      try {
-        const response = await fetch(`${API_URL}/api/task-status/${taskId}`);
-        const data = await response.json();
-        
-        if (data.logs && data.logs.length > 0) {
-          data.logs.forEach(log => {
-            addLog(log.message, log.type);
-          });
-        }
-        
-        if (data.status === 'completed') {
-          setIsRunning(false);
-          if (data.result) {
-            setResults(data.result);
-          }
-          addLog('Task completed successfully!', 'success');
-        } else if (data.status === 'error') {
-          setIsRunning(false);
-          addLog(`Error: ${data.error}`, 'error');
+    const events = new EventSource(`${API_URL}/api/task-events/${taskId}`);
+    
+    events.addEventListener('log', (event) => {
+      const log = JSON.parse(event.data);
+      addLog(log.message, log.type);
+    });
+    
+    events.addEventListener('status', (event) => {
+      const data = JSON.parse(event.data);
+      if (data.status === 'completed' || data.status === 'error' || data.status === 'cancelled') {
+        events.close();
+      }
+      if (data.status === 'completed') {
+        setIsRunning(false);
+        if (data.result) {
+          setResults(data.result);
         }
-      } catch (error) {
-        console.error('Polling error:', error);
+        addLog('Task completed successfully!', 'success');
+      } else if (data.status === 'error') {
+        setIsRunning(false);
+        addLog(`Error: ${data.error}`, 'error');
+      } else if (data.status === 'cancelled') {
+        setIsRunning(false);
       }
-    }, 2000);
+    });
     
-    return () => clearInterval(pollInterval);
+    return () => events.close();
   }, [isRunning, taskId]);
 
   const checkHealth = async () => {
@@ -124,7 +126,7 @@ const ShopeeScraperUI = () => {
       const data = await response.json();
       if (data.success) {
         setTaskId(data.task_id);
-        addLog('Search task started...', 'info');
+        addLog(data.coalesced ? data.message : 'Search task started...', 'info');
       } else {
         addLog(data.error, 'error');
         setIsRunning(false);
@@ -154,7 +156,7 @@ const ShopeeScraperUI = () => {
       const data = await response.json();
       if (data.success) {
         setTaskId(data.task_id);
-        addLog('Shop scraping task started...', 'info');
+        addLog(data.coalesced ? data.message : 'Shop scraping task started...', 'info');
       } else {
         addLog(data.error, 'error');
         setIsRunning(false);
@@ -226,10 +228,39 @@ const ShopeeScraperUI = () => {
     }
   };
 
+  const cancelTask = async () => {
+    if (!taskId) return;
+    try {
+      const response = await fetch(`${API_URL}/api/task-cancel/${taskId}`, {
+        method: 'POST'
+      });
+      const data = await response.json();
+      if (!data.success) {
+        addLog(data.error, 'error');
+      }
+    } catch (error) {
+      addLog(`Error: ${error.message}`, 'error');
+    }
+  };
+
   const downloadFile = (filename) => {
     window.open(`${API_URL}/api/download/${filename}`, '_blank');
   };
 
+  const loadPreview = async (filename, page = 1) => {
+    try {
+      const response = await fetch(`${API_URL}/api/preview/${encodeURIComponent(filename)}?page=${page}&page_size=20`);
+      const data = await response.json();
+      if (data.error) {
+        addLog(data.error, 'error');
+      } else {
+        setPreview(data);
+      }
+    } catch (error) {
+      addLog(`Error: ${error.message}`, 'error');
+    }
+  };
+
   const TabButton = ({ id, icon: Icon, label }) => (
     <button
       onClick={() => setActiveTab(id)}
@@ -545,6 +576,14 @@ const ShopeeScraperUI = () => {
               <h3 className="text-lg font-bold text-gray-800 mb-4 flex items-center gap-2">
                 <div className={`w-2 h-2 rounded-full ${connected ? 'bg-green-500 animate-pulse' : 'bg-gray-400'}`}></div>
                 Activity Log
+                {isRunning && taskId && (
+                  <button
+                    onClick={cancelTask}
+                    className="ml-auto text-sm font-medium px-3 py-1 rounded-lg bg-red-50 text-red-700 hover:bg-red-100 transition-colors"
+                  >
+                    Cancel
+                  </button>
+                )}
               </h3>
               <div className="space-y-2 max-h-96 overflow-y-auto">
                 {logs.length === 0 ? (
@@ -575,6 +614,53 @@ const ShopeeScraperUI = () => {
                         <Download size={16} />
                         Download CSV
                       </button>
+                      <button
+                        onClick={() => loadPreview(results.output_file.split('/').pop())}
+                        className="w-full bg-white text-green-700 border border-green-300 py-2 px-4 rounded-lg font-medium hover:bg-green-50 transition-colors"
+                      >
+                        Preview Rows
+                      </button>
+                      {preview && preview.filename === results.output_file.split('/').pop() && (
+                        <div className="pt-3 border-t border-green-200">
+                          <div className="overflow-x-auto max-h-80 overflow-y-auto bg-white rounded border border-green-200">
+                            <table className="text-xs w-full">
+                              <thead>
+                                <tr>
+                                  {preview.columns.map(column => (
+                                    <th key={column} className="px-2 py-1 text-left text-green-900 whitespace-nowrap">{column}</th>
+                                  ))}
+                                </tr>
+                              </thead>
+                              <tbody>
+                                {preview.rows.map((row, idx) => (
+                                  <tr key={idx} className="border-t border-green-100">
+                                    {row.map((value, col) => (
+                                      <td key={col} className="px-2 py-1 truncate max-w-xs">{value}</td>
+                                    ))}
+                                  </tr>
+                                ))}
+                              </tbody>
+                            </table>
+                          </div>
+                          <div className="flex items-center justify-between mt-2 text-xs text-green-700">
+                            <button
+                              onClick={() => loadPreview(preview.filename, preview.page - 1)}
+                              disabled={preview.page <= 1}
+                              className="px-2 py-1 rounded disabled:opacity-40"
+                            >
+                              Previous
+                            </button>
+                            <span>Page {preview.page} of {preview.total_pages} ({preview.total_rows} rows)</span>
+                            <button
+                              onClick={() => loadPreview(preview.filename, preview.page + 1)}
+                              disabled={preview.page >= preview.total_pages}
+                              className="px-2 py-1 rounded disabled:opacity-40"
+                            >
+                              Next
+                            </button>
+                          </div>
+                        </div>
+                      )}
                     </>
                   )}
                 </div>
@@ -1,98 +1,120 @@
-import undetected_chromedriver as uc
 import csv
 import time
+import math
 import os
-import random
+import queue
 import urllib.parse
-import pandas as pd
-import numpy as np
-from wordcloud import WordCloud
-import matplotlib.pyplot as plt
-from textblob import TextBlob
-import re
-from collections import Counter
+from collections import Counter, deque
 import argparse
+import contextlib
+import threading
+from concurrent.futures import ThreadPoolExecutor
+import metrics
+from transport import SHOPEE_BASE_URL, PacedTransport, as_transport, fetch_json_batch, open_transport
+from ratelimit import get_rate_controller
+from checkpoint import open_journal
+from output import is_parquet, iter_records, open_product_output, open_review_output
+from responsecache import CachingTransport, ResponseCache
+from capture import CaptureTransport, CaptureWriter, ReplayTransport
+
+# The analysis stack (pandas, numpy, wordcloud, matplotlib, TextBlob) lives in
+# analysis.py and the browser driver is only imported by launch_driver(), so
+# scraping and --help don't pay for either.  Analysis names are still
+# importable from here and load on first use.
+ANALYSIS_EXPORTS = {
+    'ANALYSIS_COLUMNS', 'TEXT_DTYPES', 'ProductAggregate',
+    'analyze_product', 'analyze_reviews', 'analyze_reviews_streaming',
+    'calculate_consensus', 'categorize_sentiment', 'clean_text',
+    'generate_wordcloud', 'generate_wordcloud_from_frequencies',
+    'get_sentiment', 'summarize_product',
+}
+
+
+def __getattr__(name):
+    if name in ANALYSIS_EXPORTS:
+        import analysis
+        return getattr(analysis, name)
+    raise AttributeError(f"module {__name__!r} has no attribute {name!r}")
 
 # ============================================================================
 # SCRAPING FUNCTIONS
 # ============================================================================
 
-def fetch_ratings(driver, shop_id, item_id, offset=0, limit=50):
-    """Fetch product ratings/reviews"""
-    api_url = (
-        f"https://shopee.ph/api/v2/item/get_ratings?"
+_captcha_lock = threading.Lock()
+_captcha_solved_at = 0.0
+
+def _fetch_json(driver, api_url):
+    """Send an API request through the driver or transport"""
+    return as_transport(driver).fetch_json(api_url)
+
+def paced_transport(driver, rate=None):
+    """Wrap a driver or transport so every request waits on the rate controller
+
+    A caching transport stays in front, so cache hits aren't paced.
+    """
+    limiter = rate or get_rate_controller()
+    if hasattr(driver, 'paced'):
+        return driver.paced(limiter)
+    return PacedTransport(as_transport(driver), limiter)
+
+def ratings_url(shop_id, item_id, offset=0, limit=50):
+    """Build the get_ratings API URL"""
+    return (
+        f"{SHOPEE_BASE_URL}/api/v2/item/get_ratings?"
         f"filter=0&flag=1&limit={limit}&offset={offset}&type=0"
         f"&exclude_filter=1&filter_size=0&fold_filter=0"
         f"&relevant_reviews=false&request_source=2"
         f"&shopid={shop_id}&itemid={item_id}"
     )
 
-    script = """
-    var callback = arguments[arguments.length - 1];
-    fetch('%s')
-        .then(response => response.json())
-        .then(data => callback(data))
-        .catch(err => callback({'error': err.message}));
-    """ % api_url
-
-    return driver.execute_async_script(script)
-
-def fetch_search_api(driver, keyword, newest=0, limit=60):
-    """Fetch items from search results"""
+def search_url(keyword, newest=0, limit=60):
+    """Build the search_items API URL"""
     encoded_keyword = urllib.parse.quote(keyword)
-    api_url = (
-        f"https://shopee.ph/api/v4/search/search_items?"
+    return (
+        f"{SHOPEE_BASE_URL}/api/v4/search/search_items?"
         f"by=relevancy&keyword={encoded_keyword}&limit={limit}"
         f"&newest={newest}&order=desc&page_type=search"
         f"&scenario=PAGE_GLOBAL_SEARCH&source=SRP&version=2"
     )
 
-    script = """
-    var callback = arguments[arguments.length - 1];
-    fetch('%s')
-        .then(response => response.json())
-        .then(data => callback(data))
-        .catch(err => callback({'error': err.message}));
-    """ % api_url
+def fetch_ratings(driver, shop_id, item_id, offset=0, limit=50):
+    """Fetch product ratings/reviews"""
+    return _fetch_json(driver, ratings_url(shop_id, item_id, offset, limit))
+
+def fetch_ratings_batch(driver, shop_id, item_id, offsets, limit=50, concurrency=4):
+    """Fetch several pages of ratings in one round-trip; one response per offset"""
+    urls = [ratings_url(shop_id, item_id, offset, limit) for offset in offsets]
+    return fetch_json_batch(as_transport(driver), urls, concurrency)
+
+def fetch_search_api(driver, keyword, newest=0, limit=60):
+    """Fetch items from search results"""
+    return _fetch_json(driver, search_url(keyword, newest, limit))
 
-    return driver.execute_async_script(script)
+def fetch_search_api_batch(driver, keyword, newests, limit=60, concurrency=4):
+    """Fetch several search pages in one round-trip; one response per offset"""
+    urls = [search_url(keyword, newest, limit) for newest in newests]
+    return fetch_json_batch(as_transport(driver), urls, concurrency)
 
 def fetch_shop_items_api(driver, shop_id, limit=30, offset=0):
     """Fetch active shop items"""
     api_url = (
-        f"https://shopee.ph/api/v4/recommend/recommend?"
+        f"{SHOPEE_BASE_URL}/api/v4/recommend/recommend?"
         f"bundle=shop_page_product_tab_main&limit={limit}&offset={offset}"
         f"&section=shop_page_product_tab_main_sec&shopid={shop_id}"
     )
 
-    script = """
-    var callback = arguments[arguments.length - 1];
-    fetch('%s')
-        .then(response => response.json())
-        .then(data => callback(data))
-        .catch(err => callback({'error': err.message}));
-    """ % api_url
-
-    return driver.execute_async_script(script)
+    return _fetch_json(driver, api_url)
 
 def fetch_soldout_items_api(driver, shop_id, limit=30, offset=0):
     """Fetch sold-out items"""
     api_url = (
-        f"https://shopee.ph/api/v4/shop/search_items?"
+        f"{SHOPEE_BASE_URL}/api/v4/shop/search_items?"
         f"filter_sold_out=1&item_card_use_scene=search_items_popular"
         f"&limit={limit}&offset={offset}&order=desc"
         f"&shopid={shop_id}&sort_by=pop&use_case=4"
     )
 
-    script = """
-    var callback = arguments[arguments.length - 1];
-    fetch('%s')
-        .then(response => response.json())
-        .then(data => callback(data))
-        .catch(err => callback({'error': err.message}));
-    """ % api_url
-
-    return driver.execute_async_script(script)
+    return _fetch_json(driver, api_url)
 
 def clean_price(price_val):
     """Converts Shopee's 100,000-based integer to standard currency."""
@@ -100,14 +122,30 @@ def clean_price(price_val):
         return price_val / 100000
     return 0
 
+def prompt_captcha(requested_at=None):
+    """Ask the user to solve a captcha in the browser.
+
+    Only one thread prompts at a time.  A thread whose request was sent before
+    the last captcha was solved skips the prompt and simply retries.
+    """
+    global _captcha_solved_at
+    with _captcha_lock:
+        if requested_at is not None and requested_at < _captcha_solved_at:
+            return
+        prompted_at = time.time()
+        print("ALERT: Bot detection triggered!")
+        print("Please go to the browser and solve any Captcha.")
+        input("Press Enter once you've proven you're human...")
+        _captcha_solved_at = time.time()
+        metrics.record_captcha(_captcha_solved_at - prompted_at)
+
 def handle_captcha(driver, shop_id, fetch_func, **kwargs):
     """Handle captcha detection and retry"""
+    requested_at = time.time()
     response = fetch_func(driver, shop_id, **kwargs)
     
     if response.get('error') == 90309999:
-        print("ALERT: Bot detection triggered!")
-        print("Please go to the browser and solve any Captcha.")
-        input("Press Enter once you've proven you're human...")
+        prompt_captcha(requested_at)
         response = fetch_func(driver, shop_id, **kwargs)
     
     return response
@@ -116,184 +154,494 @@ def handle_captcha(driver, shop_id, fetch_func, **kwargs):
 # SCRAPING MODES
 # ============================================================================
 
-def scrape_search(driver, keyword, max_pages=10, output_file=None):
-    """Scrape items from search results"""
+def scrape_search(driver, keyword, max_pages=10, output_file=None, rate=None, batch_pages=1, fmt='csv', stop_duplicate_rate=0.8):
+    """Scrape items from search results
+
+    With ``batch_pages`` > 1, that many pages are requested per round-trip.
+    An output path ending in .parquet (or ``fmt='parquet'`` for the default
+    name) writes typed Parquet instead of CSV.
+
+    Items are written once per (shop id, item id); repeats on later pages
+    are dropped.  Once a page's share of already-seen items reaches
+    ``stop_duplicate_rate`` the results have run dry and the search stops.
+    """
     if not output_file:
-        output_file = f"search_{keyword.replace(' ', '_')}.csv"
-    
-    with open(output_file, "w", newline='', encoding='utf-8-sig') as f:
-        writer = csv.writer(f)
-        writer.writerow([
-            "Shop ID", "Item ID", "Product Name", 
-            "Price (Current)", "Discount %", 
-            "Price Min", "Price Max", "Price Before Discount",
-            "Stock", "Sold", "Item Status"
-        ])
+        output_file = f"search_{keyword.replace(' ', '_')}.{fmt}"
 
+    transport = paced_transport(driver, rate)
+    
+    with open_product_output(output_file) as writer:
         newest = 0
         limit = 60
         total_items = 0
+        total_duplicates = 0
+        seen = set()
         
         print("\n" + "="*50)
         print(f"SEARCHING FOR: {keyword}")
         print("="*50)
         
-        for page in range(max_pages):
-            print(f"Fetching search page {page + 1}...")
-            response = fetch_search_api(driver, keyword, newest=newest, limit=limit)
+        page = 0
+        done = False
+        while page < max_pages and not done:
+            batch_size = min(batch_pages, max_pages - page)
+            newests = [newest + i * limit for i in range(batch_size)]
+            requested_at = time.time()
+            if batch_size > 1:
+                responses = fetch_search_api_batch(transport, keyword, newests, limit=limit)
+            else:
+                responses = [fetch_search_api(transport, keyword, newest=newest, limit=limit)]
 
-            if response.get('error') == 90309999:
-                print("ALERT: Bot detection triggered!")
-                print("Please solve the Captcha in the browser.")
-                input("Press Enter after solving...")
-                response = fetch_search_api(driver, keyword, newest=newest, limit=limit)
-            
-            if 'items' in response and response['items']:
-                for item in response['items']:
-                    ib = item.get('item_basic', {})
-                    
-                    shop_id = ib.get('shopid')
-                    item_id = ib.get('itemid')
-                    name = ib.get('name')
-                    
-                    price = clean_price(ib.get('price'))
-                    discount = ib.get('raw_discount', ib.get('discount'))
-                    p_min = clean_price(ib.get('price_min'))
-                    p_max = clean_price(ib.get('price_max'))
-                    p_before = clean_price(ib.get('price_before_discount'))
-                    stock = ib.get('stock', 0)
-                    sold = ib.get('historical_sold', 0)
-                    item_status = ib.get('item_status', 'active')
-
-                    writer.writerow([
-                        shop_id, item_id, name, 
-                        price, discount, 
-                        p_min, p_max, p_before,
-                        stock, sold, item_status
-                    ])
-                    total_items += 1
-                
+            for response in responses:
+                print(f"Fetching search page {page + 1}...")
+
+                if response.get('error') == 90309999:
+                    prompt_captcha(requested_at)
+                    response = fetch_search_api(transport, keyword, newest=newest, limit=limit)
+
+                write_start = time.monotonic()
+                returned, written = write_search_page(writer, response, seen)
+                metrics.record_write('search', written, time.monotonic() - write_start)
+                if not returned:
+                    print("No more items found.")
+                    done = True
+                    break
+
+                duplicates = returned - written
+                duplicate_rate = duplicates / returned
+                print(f"   {returned} items, {duplicates} already seen ({duplicate_rate:.0%})")
+                total_items += written
+                total_duplicates += duplicates
                 newest += limit
-                time.sleep(random.uniform(3, 5))
-            else:
-                print("No more items found.")
-                break
+                page += 1
+
+                if duplicate_rate >= stop_duplicate_rate:
+                    print("Results are repeating, stopping early.")
+                    done = True
+                    break
     
     print(f"\n✅ Found {total_items} items")
+    if total_duplicates:
+        print(f"🔁 Dropped {total_duplicates} duplicates across {page} pages")
     print(f"📄 Saved to: {output_file}")
     return output_file
 
-def scrape_shop(driver, shop_id, include_active=True, include_soldout=True, output_file=None):
-    """Scrape items from a specific shop"""
-    if not output_file:
-        output_file = f"shop_items_{shop_id}.csv"
-    
-    with open(output_file, "w", newline='', encoding='utf-8-sig') as f:
-        writer = csv.writer(f)
-        writer.writerow([
-            "Shop ID", "Item ID", "Product Name", 
-            "Price (Current)", "Discount %", 
-            "Price Min", "Price Max", "Price Before Discount",
-            "Stock", "Sold", "Item Status"
-        ])
-
-        total_active = 0
-        total_soldout = 0
-
-        # Fetch active items
-        if include_active:
-            print("\n" + "="*50)
-            print("FETCHING ACTIVE ITEMS")
-            print("="*50)
+def write_search_page(writer, response, seen=None):
+    """Write one page of search results, skipping items already in ``seen``
+
+    Returns (items on the page, items written); (0, 0) when the page is empty.
+    """
+    written = 0
+    if 'items' in response and response['items']:
+        for item in response['items']:
+            ib = item.get('item_basic', {})
             
-            offset = 0
-            limit = 30
+            shop_id = ib.get('shopid')
+            item_id = ib.get('itemid')
+            name = ib.get('name')
             
-            for page in range(10):
-                print(f"Fetching active page {page + 1}...")
-                response = handle_captcha(driver, shop_id, fetch_shop_items_api, limit=limit, offset=offset)
-                
-                if 'data' in response and 'sections' in response['data']:
-                    sections = response['data']['sections']
-                    if sections and 'data' in sections[0] and 'item' in sections[0]['data']:
-                        items = sections[0]['data']['item']
-                        
-                        if not items:
-                            break
-                        
-                        for item in items:
-                            writer.writerow([
-                                item.get('shopid'),
-                                item.get('itemid'),
-                                item.get('name'),
-                                clean_price(item.get('price')),
-                                item.get('raw_discount'),
-                                clean_price(item.get('price_min')),
-                                clean_price(item.get('price_max')),
-                                clean_price(item.get('price_before_discount')),
-                                item.get('stock', 0),
-                                item.get('historical_sold', 0),
-                                'active'
-                            ])
-                            total_active += 1
-                        
-                        offset += limit
-                        time.sleep(random.uniform(3, 5))
-                    else:
-                        break
-                else:
-                    break
-        
-        # Fetch sold-out items
-        if include_soldout:
-            print("\n" + "="*50)
-            print("FETCHING SOLD-OUT ITEMS")
-            print("="*50)
-            
-            offset = 0
-            limit = 30
+            if seen is not None:
+                if (shop_id, item_id) in seen:
+                    continue
+                seen.add((shop_id, item_id))
             
-            for page in range(20):
-                print(f"Fetching sold-out page {page + 1}...")
-                response = handle_captcha(driver, shop_id, fetch_soldout_items_api, limit=limit, offset=offset)
-                
-                if 'items' in response:
-                    items = response['items']
-                    
-                    if not items:
-                        break
-                    
-                    for item in items:
-                        ib = item.get('item_basic', {})
-                        writer.writerow([
-                            ib.get('shopid'),
-                            ib.get('itemid'),
-                            ib.get('name'),
-                            clean_price(ib.get('price')),
-                            ib.get('raw_discount'),
-                            clean_price(ib.get('price_min')),
-                            clean_price(ib.get('price_max')),
-                            clean_price(ib.get('price_before_discount')),
-                            ib.get('stock', 0),
-                            ib.get('historical_sold', 0),
-                            ib.get('item_status', 'sold_out')
-                        ])
-                        total_soldout += 1
-                    
-                    offset += limit
-                    time.sleep(random.uniform(3, 5))
-                else:
-                    break
-    
-    print(f"\n✅ Active items: {total_active}")
-    print(f"✅ Sold-out items: {total_soldout}")
+            price = clean_price(ib.get('price'))
+            discount = ib.get('raw_discount', ib.get('discount'))
+            p_min = clean_price(ib.get('price_min'))
+            p_max = clean_price(ib.get('price_max'))
+            p_before = clean_price(ib.get('price_before_discount'))
+            stock = ib.get('stock', 0)
+            sold = ib.get('historical_sold', 0)
+            item_status = ib.get('item_status', 'active')
+
+            writer.writerow([
+                shop_id, item_id, name, 
+                price, discount, 
+                p_min, p_max, p_before,
+                stock, sold, item_status
+            ])
+            written += 1
+        return len(response['items']), written
+    return 0, 0
+
+def active_item_row(item):
+    """Project one active item from the shop recommend API into a CSV row"""
+    return [
+        item.get('shopid'),
+        item.get('itemid'),
+        item.get('name'),
+        clean_price(item.get('price')),
+        item.get('raw_discount'),
+        clean_price(item.get('price_min')),
+        clean_price(item.get('price_max')),
+        clean_price(item.get('price_before_discount')),
+        item.get('stock', 0),
+        item.get('historical_sold', 0),
+        'active'
+    ]
+
+def soldout_item_row(item):
+    """Project one item from the sold-out search API into a CSV row"""
+    ib = item.get('item_basic', {})
+    return [
+        ib.get('shopid'),
+        ib.get('itemid'),
+        ib.get('name'),
+        clean_price(ib.get('price')),
+        ib.get('raw_discount'),
+        clean_price(ib.get('price_min')),
+        clean_price(ib.get('price_max')),
+        clean_price(ib.get('price_before_discount')),
+        ib.get('stock', 0),
+        ib.get('historical_sold', 0),
+        ib.get('item_status', 'sold_out')
+    ]
+
+def _active_page(response):
+    """(items, reported total, more pages) from a recommend API response; items is None when malformed"""
+    if 'data' not in response or 'sections' not in response['data']:
+        return None, None, False
+    sections = response['data']['sections']
+    if not sections or 'data' not in sections[0] or 'item' not in sections[0]['data']:
+        return None, None, False
+    section = sections[0]
+    return section['data']['item'], section.get('total'), section.get('has_more', True)
+
+def _soldout_page(response):
+    """(items, reported total, more pages) from a shop search_items response; items is None when malformed"""
+    if 'items' not in response:
+        return None, None, False
+    return response['items'], response.get('total_count'), not response.get('nomore', False)
+
+def iter_shop_pages(transport, shop_id, fetch_func, parse_page, label, limit=30):
+    """Yield each page of one shop item stream as a list of items
+
+    Paging goes on until the API reports no more pages, the reported total
+    has been reached, a page comes back empty, or a page holds only items
+    already seen (an API that ignores the offset would otherwise loop
+    forever).
+    """
+    offset = 0
+    page = 0
+    seen = set()
+    while True:
+        page += 1
+        print(f"Fetching {label} page {page}...")
+        response = handle_captcha(transport, shop_id, fetch_func, limit=limit, offset=offset)
+        items, total, more = parse_page(response)
+        if not items:
+            return
+
+        ids = {_item_id(item) for item in items}
+        if ids <= seen:
+            return
+        seen |= ids
+
+        yield items
+        offset += limit
+        if not more or (total is not None and offset >= total):
+            return
+
+def _item_id(item):
+    return item.get('itemid', item.get('item_basic', {}).get('itemid'))
+
+def scrape_shop(driver, shop_id, include_active=True, include_soldout=True, output_file=None, rate=None, fmt='csv'):
+    """Scrape items from a specific shop
+
+    The active and sold-out streams are fetched at the same time, both drawing
+    on the shared request budget, and each pages through to the end of the
+    shop's catalog.  Rows are still written active first, then sold-out: sold-out
+    pages that arrive early are held until the active stream is finished.
+    """
+    if not output_file:
+        output_file = f"shop_items_{shop_id}.{fmt}"
+
+    transport = paced_transport(driver, rate)
+
+    streams = []
+    if include_active:
+        streams.append(('active', fetch_shop_items_api, _active_page, active_item_row))
+    if include_soldout:
+        streams.append(('sold-out', fetch_soldout_items_api, _soldout_page, soldout_item_row))
+
+    print("\n" + "="*50)
+    print(f"FETCHING {' AND '.join(label.upper() for label, *_ in streams)} ITEMS")
+    print("="*50)
+
+    totals = Counter()
+    pages = queue.Queue()
+
+    def run_stream(label, fetch_func, parse_page):
+        try:
+            for items in iter_shop_pages(transport, shop_id, fetch_func, parse_page, label):
+                pages.put((label, items))
+        finally:
+            pages.put((label, None))
+
+    with open_product_output(output_file) as writer, ThreadPoolExecutor(max_workers=len(streams) or 1) as pool:
+        futures = [
+            pool.submit(run_stream, label, fetch_func, parse_page)
+            for label, fetch_func, parse_page, _ in streams
+        ]
+        to_row = {label: row for label, _, _, row in streams}
+        order = [label for label, *_ in streams]
+        held = {label: deque() for label in order}
+        finished = set()
+
+        def write_ready():
+            """Write held pages of the first unfinished stream and of any finished ones before it"""
+            while order:
+                label = order[0]
+                while held[label]:
+                    write_start = time.monotonic()
+                    items = held[label].popleft()
+                    writer.writerows(to_row[label](item) for item in items)
+                    metrics.record_write('shop', len(items), time.monotonic() - write_start)
+                if label not in finished:
+                    return
+                order.pop(0)
+
+        while len(finished) < len(streams):
+            label, items = pages.get()
+            if items is None:
+                finished.add(label)
+            else:
+                held[label].append(items)
+                totals[label] += len(items)
+            write_ready()
+
+        for future in futures:
+            future.result()
+
+    print(f"\n✅ Active items: {totals['active']}")
+    print(f"✅ Sold-out items: {totals['sold-out']}")
     print(f"📄 Saved to: {output_file}")
     return output_file
 
-def scrape_reviews_from_csv(driver, input_csv, output_file=None, max_reviews=1000):
-    """Scrape reviews for products listed in a CSV file"""
+def review_row(product_name, r):
+    """Project one rating into a CSV row"""
+    username = r.get("author_username", "Anonymous")
+    star = r.get("rating_star", 0)
+    region = r.get("region", "PH")
+    tags = ", ".join(r.get("template_tags", [])) if r.get("template_tags") else ""
+    comment = r.get("comment", "").replace("\n", " ")
+    return [product_name, username, star, region, tags, comment]
+
+def fetch_item_reviews(driver, shop_id, item_id, product_name, max_reviews=1000, batch_pages=1, offset=0, count=0):
+    """Yield (next_offset, rows) for one product, one page at a time
+
+    With ``batch_pages`` > 1, the first page is fetched alone to learn the
+    product's rating total, then the remaining pages are requested up to
+    ``batch_pages`` at a time in a single round-trip.  ``offset`` and
+    ``count`` resume a product part way through.
+    """
+    for next_offset, ratings_list in _iter_rating_pages(
+        driver, shop_id, item_id, max_reviews, batch_pages, offset, count
+    ):
+        yield next_offset, [review_row(product_name, r) for r in ratings_list]
+
+def _iter_rating_pages(driver, shop_id, item_id, max_reviews=1000, batch_pages=1, offset=0, count=0):
+    """Yield (next_offset, ratings) pages of raw ratings, newest first"""
+    start_offset = offset
+    limit = 50
+    item_reviews_count = count
+    rating_total = None
+
+    while item_reviews_count < max_reviews:
+        batch_size = 1 if offset == start_offset else batch_pages
+        batch_size = min(batch_size, math.ceil((max_reviews - item_reviews_count) / limit))
+        if rating_total is not None:
+            batch_size = min(batch_size, max(1, math.ceil((rating_total - offset) / limit)))
+
+        offsets = [offset + i * limit for i in range(batch_size)]
+        requested_at = time.time()
+        if batch_size > 1:
+            responses = fetch_ratings_batch(driver, shop_id, item_id, offsets, limit)
+        else:
+            responses = [fetch_ratings(driver, shop_id, item_id, offset, limit)]
+
+        for response in responses:
+            # Bot detection handling
+            if response.get('error') == 90309999:
+                prompt_captcha(requested_at)
+                response = fetch_ratings(driver, shop_id, item_id, offset, limit)
+
+            if 'data' in response and response['data'].get('ratings'):
+                ratings_list = response['data']['ratings']
+                summary = response['data'].get('item_rating_summary') or {}
+                rating_total = summary.get('rating_total', rating_total)
+                item_reviews_count += len(ratings_list)
+                offset += limit
+
+                yield offset, ratings_list
+                if item_reviews_count >= max_reviews:
+                    return
+            else:
+                if 'error' in response:
+                    print(f"Error response: {response}")
+                return  # No more reviews for this item
+
+def rating_mark(r):
+    """(ctime, rating id) of a rating; marks compare in the order ratings are listed"""
+    return (int(r.get("ctime") or 0), int(r.get("cmtid") or 0))
+
+def fetch_new_item_reviews(driver, shop_id, item_id, product_name, since=None, max_reviews=1000, batch_pages=1):
+    """Fetch only the reviews posted after ``since``; returns (rows, newest mark)
+
+    Ratings are listed newest first, so paging stops at the first one that
+    is not newer than ``since``, the rating_mark() of the newest review an
+    earlier run saved.  Without a mark, up to ``max_reviews`` are fetched.
+    The mark returned is that of the newest review fetched, or ``since``
+    when nothing new turned up.
+    """
+    rows = []
+    newest = since
+    for _, ratings_list in _iter_rating_pages(driver, shop_id, item_id, max_reviews, batch_pages):
+        for r in ratings_list:
+            mark = rating_mark(r)
+            if since is not None and mark <= since:
+                return rows, newest
+            if not rows:
+                newest = mark
+            rows.append(review_row(product_name, r))
+    if since is not None and len(rows) >= max_reviews:
+        print(f"⚠️ {product_name}: more than {max_reviews} new reviews, older ones were skipped")
+    return rows, newest
+
+@contextlib.contextmanager
+def _open_products(input_path):
+    """Rows of a product list, from CSV or Parquet"""
+    if is_parquet(input_path):
+        yield iter_records(input_path)
+        return
+    with open(input_path, "r", encoding='utf-8-sig') as f_in:
+        yield csv.DictReader(f_in)
+
+def _iter_products(reader):
+    """Yield (shop_id, item_id, product_name) for usable rows of a product CSV, once per product"""
+    seen = set()
+    for row in reader:
+        shop_id = row.get('Shop ID')
+        item_id = row.get('Item ID')
+        product_name = row.get('Product Name')
+
+        if not shop_id or not item_id:
+            print(f"Skipping row - missing Shop ID or Item ID")
+            continue
+
+        key = (str(shop_id), str(item_id))
+        if key in seen:
+            print(f"Skipping duplicate row - {product_name}")
+            continue
+        seen.add(key)
+
+        yield shop_id, item_id, product_name
+
+def _collect_item_reviews(transport, shop_id, item_id, product_name, max_reviews, batch_pages, offset, count):
+    """Worker body for concurrent mode: fetch every remaining page of one product"""
+    return list(fetch_item_reviews(
+        transport, shop_id, item_id, product_name, max_reviews, batch_pages, offset, count
+    ))
+
+def _resume_point(journal, shop_id, item_id, product_name):
+    """Look up where a product left off; None if it is already finished"""
+    offset, count, done = journal.get(shop_id, item_id)
+    if done:
+        print(f"⏭️ {product_name}: already scraped, skipping")
+        return None
+    if offset:
+        print(f"↪️ {product_name}: resuming at offset {offset} ({count} reviews already saved)")
+    return offset, count
+
+def _collect_new_item_reviews(transport, shop_id, item_id, product_name, since, max_reviews, batch_pages):
+    """Worker body for concurrent incremental mode"""
+    return fetch_new_item_reviews(transport, shop_id, item_id, product_name, since, max_reviews, batch_pages)
+
+def _sync_item_reviews(transport, journal, commit_page, shop_id, item_id, product_name, max_reviews, batch_pages, fetched=None):
+    """Append one product's new reviews and move its high-water mark in the same commit"""
+    since = journal.high_water(shop_id, item_id)
+    if fetched is None:
+        fetched = fetch_new_item_reviews(transport, shop_id, item_id, product_name, since, max_reviews, batch_pages)
+    rows, newest = fetched
+    commit_page(shop_id, item_id, 0, len(rows), rows, done=True, mark=newest)
+    print(f"✅ {product_name}: {len(rows)} new reviews" if since else f"✅ {product_name}: {len(rows)} reviews scraped")
+    return len(rows)
+
+def _scrape_reviews_concurrent(transport, products, journal, commit_page, max_reviews, workers, batch_pages, incremental=False):
+    """Fetch several products at once; pages are committed by the caller's thread in input order"""
+    total_products = 0
+    total_reviews = 0
+
+    def write_result(shop_id, item_id, product_name, offset, count, future):
+        if incremental:
+            return _sync_item_reviews(
+                transport, journal, commit_page, shop_id, item_id, product_name,
+                max_reviews, batch_pages, fetched=future.result()
+            )
+        scraped = 0
+        for offset, rows in future.result():
+            scraped += len(rows)
+            commit_page(shop_id, item_id, offset, count + scraped, rows)
+        commit_page(shop_id, item_id, offset, count + scraped, [], done=True)
+        print(f"✅ {product_name}: {scraped} reviews scraped")
+        return scraped
+
+    with ThreadPoolExecutor(max_workers=workers) as pool:
+        # Keep a bounded window of in-flight products so finished results
+        # don't pile up in memory behind a slow one.
+        in_flight = deque()
+        for shop_id, item_id, product_name in products:
+            total_products += 1
+            resume = _resume_point(journal, shop_id, item_id, product_name)
+            if resume is None:
+                continue
+            offset, count = resume
+
+            print(f"\n--- Queued Reviews for: {product_name} ---")
+            if incremental:
+                future = pool.submit(
+                    _collect_new_item_reviews, transport, shop_id, item_id, product_name,
+                    journal.high_water(shop_id, item_id), max_reviews, batch_pages
+                )
+            else:
+                future = pool.submit(
+                    _collect_item_reviews, transport, shop_id, item_id, product_name,
+                    max_reviews, batch_pages, offset, count
+                )
+            in_flight.append((shop_id, item_id, product_name, offset, count, future))
+
+            if len(in_flight) >= workers * 2:
+                total_reviews += write_result(*in_flight.popleft())
+
+        while in_flight:
+            total_reviews += write_result(*in_flight.popleft())
+
+    return total_products, total_reviews
+
+def scrape_reviews_from_csv(driver, input_csv, output_file=None, max_reviews=1000, workers=1, rate=None, batch_pages=1, restart=False, fmt='csv', incremental=False):
+    """Scrape reviews for products listed in a CSV file
+
+    With ``workers`` > 1, that many products are fetched concurrently.  Every
+    request, from every worker, is paced by the one shared rate controller.
+    ``batch_pages`` is passed on to fetch_item_reviews.
+
+    Progress is journaled next to the output after every page, so a run that
+    dies part way is picked up where it stopped: finished products are
+    skipped and partial ones resume at the next page.  ``restart`` ignores
+    the journal.  The journal is removed once a run completes.
+
+    The product list may be CSV or Parquet.  A Parquet output (a path ending
+    in .parquet, or ``fmt='parquet'`` for the default name) is a directory of
+    part files; pages are buffered into parts and journaled only once the
+    part holding them is on disk.
+
+    ``incremental`` appends only reviews newer than those an earlier
+    incremental run saved to the same output.  The newest review of each
+    product is remembered in the journal, which then stays behind after
+    the run; paging stops at the first review already seen.
+    """
     if not output_file:
-        output_file = "master_reviews_list.csv"
+        output_file = f"master_reviews_list.{fmt}"
     
     if not os.path.exists(input_csv):
         print(f"❌ File '{input_csv}' not found!")
@@ -302,75 +650,75 @@ def scrape_reviews_from_csv(driver, input_csv, output_file=None, max_reviews=100
     print("\n" + "="*50)
     print(f"SCRAPING REVIEWS FROM: {input_csv}")
     print("="*50)
-    
-    # Open Output CSV in 'Append' mode
-    file_exists = os.path.isfile(output_file)
-    with open(output_file, "a", newline='', encoding='utf-8-sig') as f_out:
-        writer = csv.writer(f_out)
-        if not file_exists:
-            writer.writerow(["Product Name", "Username", "Rating", "Region", "Tags", "Comment"])
-
-        # Read Input CSV
-        with open(input_csv, "r", encoding='utf-8-sig') as f_in:
-            reader = csv.DictReader(f_in)
-            
-            total_products = 0
-            total_reviews = 0
-            
-            for row in reader:
-                shop_id = row.get('Shop ID') 
-                item_id = row.get('Item ID')
-                product_name = row.get('Product Name')
-                
-                if not shop_id or not item_id:
-                    print(f"Skipping row - missing Shop ID or Item ID")
-                    continue
-                
-                total_products += 1
-                print(f"\n--- Scraping Reviews for: {product_name} ---")
-                
-                offset = 0
-                limit = 50
-                item_reviews_count = 0
-
-                # Scrape reviews for this product
-                while item_reviews_count < max_reviews:
-                    response = fetch_ratings(driver, shop_id, item_id, offset, limit)
-                    
-                    # Bot detection handling
-                    if response.get('error') == 90309999:
-                        print("ALERT: Bot detection triggered!")
-                        print("Please go to the browser and solve any Captcha.")
-                        input("Press Enter once you've proven you're human...")
-                        response = fetch_ratings(driver, shop_id, item_id, offset, limit)
-                    
-                    if 'data' in response and response['data'].get('ratings'):
-                        ratings_list = response['data']['ratings']
-                        
-                        if not ratings_list:
-                            break  # No more reviews for this item
-                        
-                        for r in ratings_list:
-                            username = r.get("author_username", "Anonymous")
-                            star = r.get("rating_star", 0)
-                            region = r.get("region", "PH")
-                            tags = ", ".join(r.get("template_tags", [])) if r.get("template_tags") else ""
-                            comment = r.get("comment", "").replace("\n", " ")
-
-                            writer.writerow([product_name, username, star, region, tags, comment])
-
-                        item_reviews_count += len(ratings_list)
-                        offset += limit
-                        
-                        # Randomized delay
-                        time.sleep(random.uniform(3, 5))
-                    else:
-                        if 'error' in response:
-                            print(f"Error response: {response}")
-                        break  # No more reviews for this item
-                
-                total_reviews += item_reviews_count
-                print(f"✅ {product_name}: {item_reviews_count} reviews scraped")
+
+    transport = paced_transport(driver, rate)
+    journal = open_journal(output_file, restart)
+    if journal.has_progress():
+        print("📒 Resuming from progress journal")
+    
+    # Output is opened in 'Append' mode
+    with open_review_output(output_file) as writer:
+        # Progress of pages written but not yet durable, newest per product
+        unjournaled = {}
+        unjournaled_marks = {}
+
+        def commit_page(shop_id, item_id, next_offset, count, rows, done=False, mark=None):
+            """Write a page, and journal every page the output has made durable"""
+            write_start = time.monotonic()
+            writer.writerows(rows)
+            unjournaled[(shop_id, item_id)] = (shop_id, item_id, next_offset, count, done)
+            if mark is not None:
+                unjournaled_marks[(shop_id, item_id)] = (shop_id, item_id, mark)
+            size = writer.checkpoint()
+            if size is not None:
+                journal.record_pages(list(unjournaled.values()), size, list(unjournaled_marks.values()))
+                unjournaled.clear()
+                unjournaled_marks.clear()
+            metrics.record_write('reviews', len(rows), time.monotonic() - write_start)
+
+        with _open_products(input_csv) as rows:
+            products = _iter_products(rows)
+
+            if workers > 1:
+                total_products, total_reviews = _scrape_reviews_concurrent(
+                    transport, products, journal, commit_page, max_reviews, workers, batch_pages, incremental
+                )
+            else:
+                total_products = 0
+                total_reviews = 0
+
+                for shop_id, item_id, product_name in products:
+                    total_products += 1
+                    resume = _resume_point(journal, shop_id, item_id, product_name)
+                    if resume is None:
+                        continue
+                    offset, count = resume
+                    print(f"\n--- Scraping Reviews for: {product_name} ---")
+
+                    if incremental:
+                        total_reviews += _sync_item_reviews(
+                            transport, journal, commit_page, shop_id, item_id, product_name,
+                            max_reviews, batch_pages
+                        )
+                        continue
+
+                    item_reviews_count = 0
+                    for offset, rows in fetch_item_reviews(
+                        transport, shop_id, item_id, product_name, max_reviews, batch_pages, offset, count
+                    ):
+                        item_reviews_count += len(rows)
+                        commit_page(shop_id, item_id, offset, count + item_reviews_count, rows)
+                    commit_page(shop_id, item_id, offset, count + item_reviews_count, [], done=True)
+
+                    total_reviews += item_reviews_count
+                    print(f"✅ {product_name}: {item_reviews_count} reviews scraped")
+
+        if unjournaled:
+            journal.record_pages(
+                list(unjournaled.values()), writer.checkpoint(force=True), list(unjournaled_marks.values())
+            )
+
+    journal.finish()
 
     print(f"\n{'='*50}")
     print(f"✅ Scraping complete!")
@@ -382,174 +730,58 @@ def scrape_reviews_from_csv(driver, input_csv, output_file=None, max_reviews=100
     return output_file
 
 # ============================================================================
-# SENTIMENT ANALYSIS FUNCTIONS
+# BROWSER
 # ============================================================================
 
-def clean_text(text):
-    """Clean and normalize text for analysis"""
-    if pd.isna(text) or text == "":
-        return ""
-    text = str(text).lower()
-    text = re.sub(r'http\S+|www\S+|@\w+', '', text)
-    text = re.sub(r'[^\w\s]', ' ', text)
-    text = re.sub(r'\s+', ' ', text).strip()
-    return text
-
-def get_sentiment(text):
-    """Get sentiment polarity using TextBlob"""
-    if not text:
-        return 0
-    try:
-        blob = TextBlob(text)
-        return blob.sentiment.polarity
-    except:
-        return 0
-
-def categorize_sentiment(polarity):
-    """Categorize sentiment into Positive, Neutral, Negative"""
-    if polarity > 0.1:
-        return "Positive"
-    elif polarity < -0.1:
-        return "Negative"
-    else:
-        return "Neutral"
-
-def calculate_consensus(ratings, sentiments):
-    """Calculate consensus value (0-100)"""
-    if len(ratings) == 0:
-        return 0
-    
-    rating_std = np.std(ratings)
-    rating_consensus = max(0, 100 - (rating_std * 25))
-    
-    sentiment_counts = Counter(sentiments)
-    if sentiment_counts:
-        dominant_sentiment_pct = max(sentiment_counts.values()) / len(sentiments) * 100
-    else:
-        dominant_sentiment_pct = 0
-    
-    consensus = (rating_consensus * 0.7) + (dominant_sentiment_pct * 0.3)
-    return round(consensus, 2)
-
-def generate_wordcloud(text, product_name, output_folder):
-    """Generate and save wordcloud image"""
-    if not text.strip():
-        return None
-    
-    stopwords = set([
-        'ang', 'ng', 'sa', 'na', 'at', 'mga', 'para', 'ko', 'mo', 'po',
-        'yung', 'lang', 'naman', 'pa', 'din', 'rin', 'kasi', 'yan', 'yun',
-        'the', 'and', 'is', 'it', 'to', 'of', 'a', 'in', 'for', 'on',
-        'very', 'so', 'got', 'just', 'really', 'much', 'good'
-    ])
-    
-    wordcloud = WordCloud(
-        width=800, height=400,
-        background_color='white',
-        stopwords=stopwords,
-        colormap='viridis',
-        max_words=100
-    ).generate(text)
-    
-    safe_name = re.sub(r'[^\w\s-]', '', product_name)[:50]
-    filename = f"{output_folder}/{safe_name}_wordcloud.png"
-    
-    plt.figure(figsize=(10, 5))
-    plt.imshow(wordcloud, interpolation='bilinear')
-    plt.axis('off')
-    plt.title(f"WordCloud: {product_name[:60]}...", fontsize=12)
-    plt.tight_layout()
-    plt.savefig(filename, dpi=150, bbox_inches='tight')
-    plt.close()
-    
-    return filename
+def launch_driver(profile_dir="shopee_session"):
+    """Start Chrome with the persistent Shopee login profile"""
+    import undetected_chromedriver as uc
+    options = uc.ChromeOptions()
+    profile_path = os.path.join(os.getcwd(), profile_dir)
+    options.add_argument(f"--user-data-dir={profile_path}")
+    return uc.Chrome(options=options)
+
+@contextlib.contextmanager
+def cli_transport(args, bypass_cache=False):
+    """The transport a scrape command runs on
+
+    With --replay, the captured responses and nothing else.  Otherwise a
+    logged-in browser behind the response cache, with every response
+    fetched from Shopee (not cache hits) recorded under --capture.
+    """
+    if args.replay:
+        transport = ReplayTransport(args.replay)
+        print(f"⏪ Replaying {len(transport)} captured URLs from {args.replay}")
+        try:
+            yield transport
+            print(f"⏪ Replay: {transport.summary()}")
+        finally:
+            transport.close()
+        return
 
-def analyze_reviews(input_csv, output_csv=None):
-    """Analyze reviews from CSV file"""
-    with open(input_csv, 'r', encoding='utf-8-sig') as f:
-        first_line = f.readline()
-        delimiter = '\t' if '\t' in first_line else ','
-    
-    df = pd.read_csv(input_csv, sep=delimiter, encoding='utf-8-sig')
-    
-    print(f"Delimiter detected: '{delimiter}'")
-    print(f"Columns found: {df.columns.tolist()}")
-    
-    if 'Product Name' not in df.columns:
-        print(f"\n❌ Error: 'Product Name' column not found!")
-        print(f"Available columns: {df.columns.tolist()}")
-        return None
-    
-    output_folder = "wordclouds"
-    os.makedirs(output_folder, exist_ok=True)
-    
-    products = df.groupby('Product Name')
-    results = []
-    
-    for product_name, group in products:
-        print(f"\n{'='*60}")
-        print(f"Analyzing: {product_name}")
-        print(f"{'='*60}")
-        
-        all_text = " ".join(
-            group['Comment'].fillna('') + " " + group['Tags'].fillna('')
-        )
-        cleaned_text = clean_text(all_text)
-        
-        ratings = group['Rating'].dropna().tolist()
-        avg_rating = np.mean(ratings) if ratings else 0
-        
-        comments = group['Comment'].fillna('').tolist()
-        sentiments = []
-        sentiment_scores = []
-        
-        for comment in comments:
-            cleaned = clean_text(comment)
-            score = get_sentiment(cleaned)
-            sentiment_scores.append(score)
-            sentiments.append(categorize_sentiment(score))
-        
-        avg_sentiment_score = np.mean(sentiment_scores) if sentiment_scores else 0
-        consensus = calculate_consensus(ratings, sentiments)
-        sentiment_dist = Counter(sentiments)
-        
-        wordcloud_file = generate_wordcloud(cleaned_text, product_name, output_folder)
-        
-        words = cleaned_text.split()
-        word_freq = Counter(words)
-        top_keywords = [word for word, count in word_freq.most_common(10) if len(word) > 3]
-        
-        results.append({
-            'Product Name': product_name,
-            'Total Reviews': len(group),
-            'Average Rating': round(avg_rating, 2),
-            'Average Sentiment Score': round(avg_sentiment_score, 3),
-            'Dominant Sentiment': max(sentiment_dist, key=sentiment_dist.get) if sentiment_dist else 'N/A',
-            'Positive Reviews': sentiment_dist.get('Positive', 0),
-            'Neutral Reviews': sentiment_dist.get('Neutral', 0),
-            'Negative Reviews': sentiment_dist.get('Negative', 0),
-            'Consensus Score': consensus,
-            'Top Keywords': ', '.join(top_keywords[:5]),
-            'WordCloud Image': wordcloud_file
-        })
-        
-        print(f"Total Reviews: {len(group)}")
-        print(f"Average Rating: {avg_rating:.2f} ⭐")
-        print(f"Sentiment Score: {avg_sentiment_score:.3f}")
-        print(f"Consensus Score: {consensus:.2f}/100")
-    
-    results_df = pd.DataFrame(results)
-    if not output_csv:
-        output_csv = "product_analysis_results.csv"
-    results_df.to_csv(output_csv, index=False, encoding='utf-8-sig')
-    
-    print(f"\n{'='*60}")
-    print(f"✅ Analysis complete!")
-    print(f"📊 Results saved to: {output_csv}")
-    print(f"🖼️ WordClouds saved in: {output_folder}/")
-    print(f"{'='*60}")
-    
-    return results_df
+    driver = launch_driver()
+    writer = None
+    try:
+        driver.get("https://shopee.ph/buyer/login")
+        print("\n" + "="*50)
+        print("LOGIN REQUIRED: Log in manually in the browser.")
+        print("="*50)
+        input("Press Enter AFTER logging in to start...")
+
+        transport = open_transport(driver, args.transport)
+        if args.capture:
+            writer = CaptureWriter(args.capture)
+            transport = CaptureTransport(transport, writer)
+        cache = ResponseCache()
+        transport = CachingTransport(transport, cache, bypass=args.no_cache or bypass_cache)
+        yield transport
+        print(f"🗄️ Response cache: {cache.summary()}")
+        if writer is not None:
+            print(f"📼 Captured {writer.records} responses to {args.capture}")
+    finally:
+        if writer is not None:
+            writer.close()
+        driver.quit()
 
 # ============================================================================
 # MAIN FUNCTION WITH CLI ARGS
@@ -560,6 +792,10 @@ def main():
         description='Shopee Scraper & Analyzer - Scrape products and analyze reviews',
         formatter_class=argparse.RawDescriptionHelpFormatter,
         epilog='''
+The request rate starts from the last learned value (rate_state.json),
+speeds up while Shopee responds cleanly and backs off on captchas or
+rising latency.
+
 Examples:
   # Search for products
   python script.py search --keyword "laptop" --pages 5 --output results.csv
@@ -576,8 +812,34 @@ Examples:
   # Scrape reviews from a CSV file
   python script.py reviews --input search_laptop.csv --max-reviews 500
   
+  # Scrape reviews over a direct HTTP session (falls back to the browser)
+  python script.py reviews --input search_laptop.csv --transport http
+  
+  # Scrape 4 products at a time, at most 1 request per second in total
+  python script.py reviews --input search_laptop.csv --transport http --workers 4 --max-rps 1
+  
+  # Keep every raw response, then re-run the parsing from it offline
+  python script.py search --keyword "laptop" --pages 5 --capture captures/laptop
+  python script.py search --keyword "laptop" --pages 5 --replay captures/laptop --output fixed.csv
+  
   # Analyze reviews
   python script.py analyze --input reviews.csv --output analysis.csv
+  
+  # Analyze reviews on 4 cores with the fast lexicon scorer
+  python script.py analyze --input reviews.csv --workers 4 --sentiment lexicon
+  
+  # Re-analyze an appended file, only scoring comments never seen before
+  python script.py analyze --input master_reviews_list.csv --cache-file sentiment_cache.sqlite
+  
+  # Keep a large review archive as a typed Parquet dataset, then analyze it
+  python script.py reviews --input search_laptop.csv --output reviews.parquet
+  python script.py analyze --input reviews.parquet --stream
+  
+  # Analyze quickly without wordclouds
+  python script.py analyze --input reviews.csv --sentiment lexicon --wordclouds skip
+  
+  # Analyze a review file too large to fit in memory
+  python script.py analyze --input master_reviews_list.csv --stream --chunk-size 100000
         '''
     )
     
@@ -587,25 +849,60 @@ Examples:
     search_parser = subparsers.add_parser('search', help='Search for products by keyword')
     search_parser.add_argument('--keyword', '-k', required=True, help='Search keyword')
     search_parser.add_argument('--pages', '-p', type=int, default=10, help='Number of pages to scrape (default: 10)')
-    search_parser.add_argument('--output', '-o', help='Output CSV file (default: search_<keyword>.csv)')
+    search_parser.add_argument('--output', '-o', help='Output CSV or .parquet file (default: search_<keyword>.csv)')
+    search_parser.add_argument('--max-rps', type=float, default=2.0, help='Ceiling for the adaptive request rate, in requests per second (default: 2.0)')
+    search_parser.add_argument('--batch-pages', type=int, default=1, help='Pages to request per browser round-trip (default: 1)')
+    search_parser.add_argument('--stop-duplicate-rate', type=float, default=0.8, help='Stop once this share of a page was already seen on earlier pages; above 1 never stops early (default: 0.8)')
+    search_source = search_parser.add_mutually_exclusive_group()
+    search_source.add_argument('--capture', metavar='DIR', help='Also append every raw API response to compressed JSONL segments in DIR')
+    search_source.add_argument('--replay', metavar='DIR', help='Scrape from the responses captured in DIR instead of Shopee (no browser, no network)')
+    search_parser.add_argument('--no-cache', action='store_true', help='Fetch every page from Shopee instead of the response cache; fresh pages still refresh it')
+    search_parser.add_argument('--transport', choices=['browser', 'http'], default='browser', help='Send API calls through the browser tab or a direct pooled HTTP session with browser fallback (default: browser)')
+    search_parser.add_argument('--format', choices=['csv', 'parquet'], default='csv', help='Format of the default output file search_<keyword>.<format>; an --output ending in .parquet also selects Parquet (default: csv)')
     
     # Shop command
     shop_parser = subparsers.add_parser('shop', help='Scrape items from a shop by Shop ID')
     shop_parser.add_argument('--shop-id', '-s', required=True, help='Shop ID')
     shop_parser.add_argument('--active', action='store_true', help='Include active items')
     shop_parser.add_argument('--soldout', action='store_true', help='Include sold-out items')
-    shop_parser.add_argument('--output', '-o', help='Output CSV file (default: shop_items_<shopid>.csv)')
+    shop_parser.add_argument('--output', '-o', help='Output CSV or .parquet file (default: shop_items_<shopid>.csv)')
+    shop_parser.add_argument('--max-rps', type=float, default=2.0, help='Ceiling for the adaptive request rate, in requests per second (default: 2.0)')
+    shop_source = shop_parser.add_mutually_exclusive_group()
+    shop_source.add_argument('--capture', metavar='DIR', help='Also append every raw API response to compressed JSONL segments in DIR')
+    shop_source.add_argument('--replay', metavar='DIR', help='Scrape from the responses captured in DIR instead of Shopee (no browser, no network)')
+    shop_parser.add_argument('--no-cache', action='store_true', help='Fetch every page from Shopee instead of the response cache; fresh pages still refresh it')
+    shop_parser.add_argument('--transport', choices=['browser', 'http'], default='browser', help='Send API calls through the browser tab or a direct pooled HTTP session with browser fallback (default: browser)')
+    shop_parser.add_argument('--format', choices=['csv', 'parquet'], default='csv', help='Format of the default output file shop_items_<shopid>.<format>; an --output ending in .parquet also selects Parquet (default: csv)')
     
     # Reviews command
     reviews_parser = subparsers.add_parser('reviews', help='Scrape reviews from products in a CSV file')
-    reviews_parser.add_argument('--input', '-i', required=True, help='Input CSV file with product list (must have Shop ID, Item ID, Product Name)')
-    reviews_parser.add_argument('--output', '-o', help='Output CSV file (default: master_reviews_list.csv)')
+    reviews_parser.add_argument('--input', '-i', required=True, help='Input CSV or Parquet file with product list (must have Shop ID, Item ID, Product Name)')
+    reviews_parser.add_argument('--output', '-o', help='Output CSV file or .parquet dataset directory (default: master_reviews_list.csv)')
     reviews_parser.add_argument('--max-reviews', '-m', type=int, default=1000, help='Maximum reviews per product (default: 1000)')
+    reviews_parser.add_argument('--workers', '-w', type=int, default=1, help='Products to scrape concurrently (default: 1)')
+    reviews_parser.add_argument('--max-rps', type=float, default=2.0, help='Ceiling for the adaptive request rate, in requests per second (default: 2.0)')
+    reviews_parser.add_argument('--batch-pages', type=int, default=1, help='Pages to request per browser round-trip (default: 1)')
+    reviews_parser.add_argument('--restart', action='store_true', help='Ignore the progress journal of an interrupted run and start from the first product')
+    reviews_parser.add_argument('--incremental', action='store_true', help='Only fetch reviews newer than those saved to the output by an earlier --incremental run')
+    reviews_source = reviews_parser.add_mutually_exclusive_group()
+    reviews_source.add_argument('--capture', metavar='DIR', help='Also append every raw API response to compressed JSONL segments in DIR')
+    reviews_source.add_argument('--replay', metavar='DIR', help='Scrape from the responses captured in DIR instead of Shopee (no browser, no network)')
+    reviews_parser.add_argument('--no-cache', action='store_true', help='Fetch every page from Shopee instead of the response cache; fresh pages still refresh it')
+    reviews_parser.add_argument('--transport', choices=['browser', 'http'], default='browser', help='Send API calls through the browser tab or a direct pooled HTTP session with browser fallback (default: browser)')
+    reviews_parser.add_argument('--format', choices=['csv', 'parquet'], default='csv', help='Format of the default output file master_reviews_list.<format>; an --output ending in .parquet also selects Parquet (default: csv)')
     
     # Analyze command
     analyze_parser = subparsers.add_parser('analyze', help='Analyze reviews from CSV file')
-    analyze_parser.add_argument('--input', '-i', required=True, help='Input CSV file with reviews')
+    analyze_parser.add_argument('--input', '-i', required=True, help='Input CSV or Parquet file/dataset with reviews')
     analyze_parser.add_argument('--output', '-o', help='Output CSV file (default: product_analysis_results.csv)')
+    analyze_parser.add_argument('--workers', '-w', type=int, default=1, help='Processes to analyze products with (default: 1)')
+    analyze_parser.add_argument('--cache-size', type=int, default=200000, help='Distinct comments to memoize in memory, 0 to disable (default: 200000)')
+    analyze_parser.add_argument('--cache-file', help='SQLite file that keeps scored comments across runs')
+    analyze_parser.add_argument('--sentiment', choices=['textblob', 'lexicon'], default='textblob', help='Sentiment scorer: per-comment TextBlob or the faster vectorized lexicon (default: textblob)')
+    analyze_parser.add_argument('--stream', action='store_true', help='Read the input in chunks with bounded memory instead of loading it whole')
+    analyze_parser.add_argument('--chunk-size', type=int, default=50000, help='Rows per chunk with --stream (default: 50000)')
+    analyze_parser.add_argument('--wordclouds', choices=['inline', 'background', 'lazy', 'skip'], default='background', help='Draw wordclouds with each product, in a background process pool, later on request from the web app, or not at all (default: background)')
+    analyze_parser.add_argument('--wordcloud-workers', type=int, default=2, help='Processes drawing wordclouds with --wordclouds background (default: 2)')
     
     args = parser.parse_args()
     
@@ -618,22 +915,12 @@ Examples:
         print("SHOPEE SEARCH SCRAPER")
         print("="*60)
         
-        options = uc.ChromeOptions()
-        profile_path = os.path.join(os.getcwd(), "shopee_session")
-        options.add_argument(f"--user-data-dir={profile_path}")
-        driver = uc.Chrome(options=options)
-        
-        try:
-            driver.get("https://shopee.ph/buyer/login")
-            print("\n" + "="*50)
-            print("LOGIN REQUIRED: Log in manually in the browser.")
-            print("="*50)
-            input("Press Enter AFTER logging in to start...")
-            
-            scrape_search(driver, args.keyword, args.pages, args.output)
-            
-        finally:
-            driver.quit()
+        with cli_transport(args) as transport:
+            rate = get_rate_controller(max_rate=args.max_rps)
+            scrape_search(
+                transport, args.keyword, args.pages, args.output, rate,
+                args.batch_pages, args.format, args.stop_duplicate_rate
+            )
     
     elif args.command == 'shop':
         print("\n" + "="*60)
@@ -644,44 +931,23 @@ Examples:
         include_active = args.active or not args.soldout
         include_soldout = args.soldout or not args.active
         
-        options = uc.ChromeOptions()
-        profile_path = os.path.join(os.getcwd(), "shopee_session")
-        options.add_argument(f"--user-data-dir={profile_path}")
-        driver = uc.Chrome(options=options)
-        
-        try:
-            driver.get("https://shopee.ph/buyer/login")
-            print("\n" + "="*50)
-            print("LOGIN REQUIRED: Log in manually in the browser.")
-            print("="*50)
-            input("Press Enter AFTER logging in to start...")
-            
-            scrape_shop(driver, args.shop_id, include_active, include_soldout, args.output)
-            
-        finally:
-            driver.quit()
+        with cli_transport(args) as transport:
+            rate = get_rate_controller(max_rate=args.max_rps)
+            scrape_shop(transport, args.shop_id, include_active, include_soldout, args.output, rate, args.format)
     
     elif args.command == 'reviews':
         print("\n" + "="*60)
         print("SHOPEE REVIEWS SCRAPER")
         print("="*60)
         
-        options = uc.ChromeOptions()
-        profile_path = os.path.join(os.getcwd(), "shopee_session")
-        options.add_argument(f"--user-data-dir={profile_path}")
-        driver = uc.Chrome(options=options)
-        
-        try:
-            driver.get("https://shopee.ph/buyer/login")
-            print("\n" + "="*50)
-            print("LOGIN REQUIRED: Log in manually in the browser.")
-            print("="*50)
-            input("Press Enter AFTER logging in to start...")
-            
-            scrape_reviews_from_csv(driver, args.input, args.output, args.max_reviews)
-            
-        finally:
-            driver.quit()
+        # An incremental sync is after reviews posted since the last run,
+        # which a cached first page would hide
+        with cli_transport(args, bypass_cache=args.incremental) as transport:
+            rate = get_rate_controller(max_rate=args.max_rps)
+            scrape_reviews_from_csv(
+                transport, args.input, args.output, args.max_reviews,
+                args.workers, rate, args.batch_pages, args.restart, args.format, args.incremental
+            )
     
     elif args.command == 'analyze':
         print("\n" + "="*60)
@@ -694,7 +960,12 @@ Examples:
         
         print("\n🚀 Starting analysis...")
         try:
-            results = analyze_reviews(args.input, args.output)
+            from analysis import analyze_reviews
+            results = analyze_reviews(
+                args.input, args.output, args.workers, args.sentiment,
+                args.cache_size, args.cache_file, args.stream, args.chunk_size,
+                args.wordclouds, args.wordcloud_workers
+            )
             
             if results is not None:
                 print("\n📈 Summary Statistics:")
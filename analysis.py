@@ -0,0 +1,526 @@
+import contextlib
+import math
+import re
+from collections import Counter, deque
+from concurrent.futures import ProcessPoolExecutor
+
+import numpy as np
+import pandas as pd
+
+from output import column_names, is_parquet, iter_frames, read_frame
+from rendering import (
+    WORDCLOUD_FOLDER, WordcloudRenderer, count_frequencies, render_wordcloud,
+    text_frequencies, wordcloud_path
+)
+from sentiment import clean_series, get_backend, get_comment_cache
+
+# ============================================================================
+# SENTIMENT ANALYSIS FUNCTIONS
+# ============================================================================
+
+ANALYSIS_COLUMNS = ['Product Name', 'Comment', 'Tags', 'Rating']
+# Read text columns as strings so a chunk of all-numeric comments isn't
+# parsed as floats
+TEXT_DTYPES = {'Product Name': str, 'Comment': str, 'Tags': str}
+
+def clean_text(text):
+    """Clean and normalize text for analysis"""
+    if pd.isna(text) or text == "":
+        return ""
+    text = str(text).lower()
+    text = re.sub(r'http\S+|www\S+|@\w+', '', text)
+    text = re.sub(r'[^\w\s]', ' ', text)
+    text = re.sub(r'\s+', ' ', text).strip()
+    return text
+
+def get_sentiment(text):
+    """Get sentiment polarity using TextBlob"""
+    return get_backend('textblob').score(text)
+
+def categorize_sentiment(polarity):
+    """Categorize sentiment into Positive, Neutral, Negative"""
+    if polarity > 0.1:
+        return "Positive"
+    elif polarity < -0.1:
+        return "Negative"
+    else:
+        return "Neutral"
+
+def rating_std(count, total, total_squares):
+    """Population standard deviation from the count, sum and sum of squares of ratings
+
+    Ratings are whole stars, so the sums are exact and both the in-memory
+    and the streaming analysis get the same value.
+    """
+    if count == 0:
+        return 0.0
+    return math.sqrt(max(0, count * total_squares - total * total) / (count * count))
+
+def calculate_consensus(ratings, sentiments):
+    """Calculate consensus value (0-100)"""
+    if len(ratings) == 0:
+        return 0
+    
+    spread = rating_std(len(ratings), sum(ratings), sum(rating * rating for rating in ratings))
+    rating_consensus = max(0, 100 - (spread * 25))
+    
+    sentiment_counts = Counter(sentiments)
+    if sentiment_counts:
+        dominant_sentiment_pct = max(sentiment_counts.values()) / len(sentiments) * 100
+    else:
+        dominant_sentiment_pct = 0
+    
+    consensus = (rating_consensus * 0.7) + (dominant_sentiment_pct * 0.3)
+    return round(consensus, 2)
+
+def generate_wordcloud(text, product_name, output_folder):
+    """Generate and save wordcloud image (reused if already drawn)"""
+    return render_wordcloud(output_folder, product_name, text_frequencies(text))[0]
+
+def generate_wordcloud_from_frequencies(word_freq, product_name, output_folder):
+    """Generate and save a wordcloud from word counts instead of raw text
+
+    Used by streaming analysis, which never holds a product's full text;
+    two-word collocations can't be recovered from counts and are left out.
+    """
+    return render_wordcloud(output_folder, product_name, count_frequencies(word_freq))[0]
+
+def analyze_product(product_name, texts, comments, ratings, total_reviews, output_folder, sentiment='textblob', cache=None):
+    """Analyze one product's reviews into a row of the results CSV, drawing its wordcloud
+
+    ``cache`` holds get_comment_cache settings; None scores every comment.
+    """
+    result, words = summarize_product(
+        product_name, texts, comments, ratings, total_reviews, output_folder, sentiment, cache
+    )
+    render_wordcloud(output_folder, product_name, words)
+    return result
+
+def summarize_product(product_name, texts, comments, ratings, total_reviews, output_folder, sentiment='textblob', cache=None, wordclouds=True):
+    """analyze_product without drawing; returns (result row, wordcloud frequencies)
+
+    With ``wordclouds`` False no frequencies are counted and the row has no
+    image.
+    """
+    all_text = " ".join(texts)
+    cleaned_text = clean_text(all_text)
+    
+    avg_rating = sum(ratings) / len(ratings) if ratings else 0
+    
+    if cache is not None:
+        comment_cache = get_comment_cache(**cache)
+        _, sentiment_scores = comment_cache.score(comments, sentiment)
+        comment_cache.flush()
+    else:
+        sentiment_scores = get_backend(sentiment).score_many(clean_series(comments))
+    sentiments = [categorize_sentiment(score) for score in sentiment_scores]
+    
+    avg_sentiment_score = math.fsum(sentiment_scores) / len(sentiment_scores) if len(sentiment_scores) else 0
+    consensus = calculate_consensus(ratings, sentiments)
+    sentiment_dist = Counter(sentiments)
+    
+    wordcloud_words = text_frequencies(cleaned_text) if wordclouds else []
+    
+    words = cleaned_text.split()
+    word_freq = Counter(words)
+    top_keywords = [word for word, count in word_freq.most_common(10) if len(word) > 3]
+    
+    result = {
+        'Product Name': product_name,
+        'Total Reviews': total_reviews,
+        'Average Rating': round(avg_rating, 2),
+        'Average Sentiment Score': round(avg_sentiment_score, 3),
+        'Dominant Sentiment': max(sentiment_dist, key=sentiment_dist.get) if sentiment_dist else 'N/A',
+        'Positive Reviews': sentiment_dist.get('Positive', 0),
+        'Neutral Reviews': sentiment_dist.get('Neutral', 0),
+        'Negative Reviews': sentiment_dist.get('Negative', 0),
+        'Consensus Score': consensus,
+        'Top Keywords': ', '.join(top_keywords[:5]),
+        'WordCloud Image': wordcloud_path(output_folder, product_name, wordcloud_words)
+    }
+    return result, wordcloud_words
+
+def _cache_counts(cache):
+    if cache is None:
+        return 0, 0
+    return get_comment_cache(**cache).thread_counts()
+
+def _analyze_product_task(task):
+    """Run summarize_product on an argument tuple
+
+    In inline mode the wordcloud is drawn here, in the worker.  Returns
+    (result, frequencies left for the renderer, drew an image, cache hits,
+    cache misses).
+    """
+    *args, cache, wordclouds = task
+    hits, misses = _cache_counts(cache)
+    result, words = summarize_product(*args, cache, wordclouds != 'skip')
+    new_hits, new_misses = _cache_counts(cache)
+    drawn = False
+    if wordclouds == 'inline':
+        _, drawn = render_wordcloud(args[5], args[0], words)
+        words = None
+    return result, words, drawn, new_hits - hits, new_misses - misses
+
+def _product_tasks(df, output_folder, sentiment, cache, wordclouds):
+    """Yield one _analyze_product_task argument tuple per product, in groupby order"""
+    for product_name, group in df.groupby('Product Name', observed=True):
+        texts = (group['Comment'].fillna('') + " " + group['Tags'].fillna('')).tolist()
+        comments = group['Comment'].fillna('').tolist()
+        ratings = group['Rating'].dropna().tolist()
+        yield product_name, texts, comments, ratings, len(group), output_folder, sentiment, cache, wordclouds
+
+def _print_product_result(result):
+    print(f"\n{'='*60}")
+    print(f"Analyzing: {result['Product Name']}")
+    print(f"{'='*60}")
+    print(f"Total Reviews: {result['Total Reviews']}")
+    print(f"Average Rating: {result['Average Rating']:.2f} ⭐")
+    print(f"Sentiment Score: {result['Average Sentiment Score']:.3f}")
+    print(f"Consensus Score: {result['Consensus Score']:.2f}/100")
+
+def _read_reviews(input_path, delimiter):
+    """Load the analysis columns of a review CSV or Parquet file/dataset"""
+    if delimiter is None:
+        df = read_frame(input_path, ANALYSIS_COLUMNS)
+        names = df['Product Name']
+        if isinstance(names.dtype, pd.CategoricalDtype):
+            # Sorted categories make groupby order match the CSV path
+            names = names.cat.remove_unused_categories()
+            df['Product Name'] = names.cat.reorder_categories(sorted(names.cat.categories))
+        return df
+    return pd.read_csv(
+        input_path, sep=delimiter, encoding='utf-8-sig',
+        usecols=lambda column: column in ANALYSIS_COLUMNS, dtype=TEXT_DTYPES
+    )
+
+def _read_review_chunks(input_path, delimiter, chunk_size):
+    """Iterate over a review CSV or Parquet file/dataset ``chunk_size`` rows at a time"""
+    if delimiter is None:
+        return iter_frames(input_path, ANALYSIS_COLUMNS, chunk_size)
+    return pd.read_csv(
+        input_path, sep=delimiter, encoding='utf-8-sig',
+        usecols=lambda column: column in ANALYSIS_COLUMNS,
+        dtype=TEXT_DTYPES, chunksize=chunk_size
+    )
+
+def _analyze_in_memory(input_csv, delimiter, renderer, workers, sentiment, cache):
+    """Load the whole review CSV and analyze it product by product
+
+    Returns (results in product order, cache hits, cache misses).
+    """
+    df = _read_reviews(input_csv, delimiter)
+    tasks = _product_tasks(df, renderer.output_folder, sentiment, cache, renderer.mode)
+    results = []
+    cache_hits = 0
+    cache_misses = 0
+    
+    def collect(result, words, drawn):
+        if words is None:
+            renderer.record(drawn)
+        else:
+            renderer.submit(result['Product Name'], words)
+        _print_product_result(result)
+        results.append(result)
+    
+    if workers > 1:
+        product_count = df['Product Name'].nunique()
+        # Several products per task keeps inter-process overhead low when
+        # there are many small products
+        chunksize = max(1, product_count // (workers * 4))
+        with ProcessPoolExecutor(max_workers=workers) as pool:
+            outcomes = pool.map(_analyze_product_task, tasks, chunksize=chunksize)
+            for result, words, drawn, hits, misses in outcomes:
+                collect(result, words, drawn)
+                cache_hits += hits
+                cache_misses += misses
+    else:
+        for task in tasks:
+            result, words, drawn, hits, misses = _analyze_product_task(task)
+            collect(result, words, drawn)
+            cache_hits += hits
+            cache_misses += misses
+    
+    return results, cache_hits, cache_misses
+
+def analyze_reviews(input_csv, output_csv=None, workers=1, sentiment='textblob', cache_size=200000, cache_file=None, stream=False, chunk_size=50000, wordclouds='inline', wordcloud_workers=2):
+    """Analyze reviews from CSV file
+
+    With ``workers`` > 1, products are spread over that many processes.
+    Results are collected in product order, so the output is the same as a
+    single-process run.  ``sentiment`` picks the scoring backend: 'textblob'
+    (reference) or 'lexicon' (vectorized, faster for bulk runs).
+
+    Cleaned text and polarity are memoized per distinct comment in an LRU of
+    ``cache_size`` entries (0 disables it) and, with ``cache_file``, in a
+    SQLite file reused by later runs.
+
+    With ``stream``, the CSV is read ``chunk_size`` rows at a time into
+    running per-product aggregates instead of being loaded whole; the
+    results are the same, in bounded memory.
+
+    ``input_csv`` may also be a Parquet file or review dataset directory.
+    Either way only the Product Name, Rating, Tags and Comment columns are
+    read.
+
+    ``wordclouds`` is a rendering mode from rendering.py: 'inline',
+    'background' (a pool of ``wordcloud_workers`` processes), 'lazy' or
+    'skip'.  Images already drawn for the same frequencies are reused.
+    """
+    if is_parquet(input_csv):
+        delimiter = None
+        columns = column_names(input_csv)
+        print("Format detected: Parquet")
+    else:
+        with open(input_csv, 'r', encoding='utf-8-sig') as f:
+            first_line = f.readline()
+            delimiter = '\t' if '\t' in first_line else ','
+        
+        columns = pd.read_csv(input_csv, sep=delimiter, encoding='utf-8-sig', nrows=0).columns.tolist()
+        
+        print(f"Delimiter detected: '{delimiter}'")
+    print(f"Columns found: {columns}")
+    
+    if 'Product Name' not in columns:
+        print(f"\n❌ Error: 'Product Name' column not found!")
+        print(f"Available columns: {columns}")
+        return None
+    
+    output_folder = WORDCLOUD_FOLDER
+    renderer = WordcloudRenderer(wordclouds, output_folder, wordcloud_workers)
+    
+    cache = {'max_entries': cache_size, 'path': cache_file} if cache_size > 0 else None
+    
+    try:
+        if stream:
+            print(f"🌊 Streaming {chunk_size} rows at a time")
+            results, cache_hits, cache_misses = analyze_reviews_streaming(
+                input_csv, delimiter, renderer, workers, sentiment, cache, chunk_size
+            )
+        else:
+            results, cache_hits, cache_misses = _analyze_in_memory(
+                input_csv, delimiter, renderer, workers, sentiment, cache
+            )
+    finally:
+        renderer.close()
+    
+    results_df = pd.DataFrame(results)
+    if not output_csv:
+        output_csv = "product_analysis_results.csv"
+    results_df.to_csv(output_csv, index=False, encoding='utf-8-sig')
+    
+    print(f"\n{'='*60}")
+    print(f"✅ Analysis complete!")
+    print(f"📊 Results saved to: {output_csv}")
+    if wordclouds == 'skip':
+        print("🖼️ WordClouds skipped")
+    elif wordclouds == 'lazy':
+        print(f"🖼️ WordClouds in: {output_folder}/ ({renderer.summary()}; deferred ones are drawn on first request)")
+    else:
+        print(f"🖼️ WordClouds saved in: {output_folder}/ ({renderer.summary()})")
+    if cache is not None:
+        lookups = cache_hits + cache_misses
+        hit_rate = cache_hits / lookups if lookups else 0
+        print(f"🧠 Comment cache: {cache_hits} hits, {cache_misses} misses ({hit_rate:.1%} hit rate)")
+    print(f"{'='*60}")
+    
+    return results_df
+
+# ============================================================================
+# STREAMING ANALYSIS
+# ============================================================================
+#
+# For review files too big to load at once, the CSV is read in chunks and
+# each chunk is folded into running per-product aggregates.  Memory grows
+# with the number of products and their vocabulary, not with the number of
+# rows.  Every aggregate is kept in a form that reproduces the in-memory
+# path exactly: counters are updated in row order so ties in most_common()
+# and the dominant sentiment resolve the same way, ratings are kept as an
+# exact count, sum and sum of squares, and sentiment scores as the exact
+# partial sums math.fsum works with, so chunk boundaries never change a
+# rounded average.
+
+def add_exact(partials, value):
+    """Add ``value`` to the non-overlapping partial sums of an exact float sum
+
+    math.fsum(partials) is then the correctly rounded total, the same as
+    math.fsum over every value added.
+    """
+    i = 0
+    for partial in partials:
+        if abs(value) < abs(partial):
+            value, partial = partial, value
+        high = value + partial
+        low = partial - (high - value)
+        if low:
+            partials[i] = low
+            i += 1
+        value = high
+    partials[i:] = [value]
+
+class ProductAggregate:
+    """Running statistics for one product's reviews"""
+
+    def __init__(self):
+        self.total_reviews = 0
+        self.rating_count = 0
+        self.rating_sum = 0
+        self.rating_squares = 0
+        self.sentiment_partials = []
+        self.sentiment_count = 0
+        self.sentiments = Counter()
+        self.words = Counter()
+
+    def add_ratings(self, ratings):
+        for rating in ratings:
+            self.rating_count += 1
+            self.rating_sum += rating
+            self.rating_squares += rating * rating
+
+    def merge(self, other):
+        """Fold in the aggregate of a later chunk"""
+        self.total_reviews += other.total_reviews
+        self.rating_count += other.rating_count
+        self.rating_sum += other.rating_sum
+        self.rating_squares += other.rating_squares
+        for partial in other.sentiment_partials:
+            add_exact(self.sentiment_partials, partial)
+        self.sentiment_count += other.sentiment_count
+        self.sentiments.update(other.sentiments)
+        self.words.update(other.words)
+
+    def consensus(self):
+        """calculate_consensus() from the running aggregates"""
+        if self.rating_count == 0:
+            return 0
+        spread = rating_std(self.rating_count, self.rating_sum, self.rating_squares)
+        rating_consensus = max(0, 100 - (spread * 25))
+        if self.sentiments:
+            dominant_sentiment_pct = max(self.sentiments.values()) / self.sentiment_count * 100
+        else:
+            dominant_sentiment_pct = 0
+        consensus = (rating_consensus * 0.7) + (dominant_sentiment_pct * 0.3)
+        return round(consensus, 2)
+
+    def result(self, product_name, renderer):
+        avg_rating = self.rating_sum / self.rating_count if self.rating_count else 0
+        avg_sentiment_score = math.fsum(self.sentiment_partials) / self.sentiment_count if self.sentiment_count else 0
+        top_keywords = [word for word, count in self.words.most_common(10) if len(word) > 3]
+        wordcloud_file = None
+        if renderer.mode != 'skip':
+            wordcloud_file = renderer.submit(product_name, count_frequencies(self.words))
+
+        return {
+            'Product Name': product_name,
+            'Total Reviews': self.total_reviews,
+            'Average Rating': round(avg_rating, 2),
+            'Average Sentiment Score': round(avg_sentiment_score, 3),
+            'Dominant Sentiment': max(self.sentiments, key=self.sentiments.get) if self.sentiments else 'N/A',
+            'Positive Reviews': self.sentiments.get('Positive', 0),
+            'Neutral Reviews': self.sentiments.get('Neutral', 0),
+            'Negative Reviews': self.sentiments.get('Negative', 0),
+            'Consensus Score': self.consensus(),
+            'Top Keywords': ', '.join(top_keywords[:5]),
+            'WordCloud Image': wordcloud_file
+        }
+
+
+def _aggregate_chunk(task):
+    """Score one chunk of reviews into per-product aggregates.
+
+    Returns (aggregates, cache hits, cache misses); runs in a worker process
+    when the analysis is spread over several.
+    """
+    product_names, comments, tags, ratings, sentiment, cache = task
+    hits, misses = _cache_counts(cache)
+    if cache is not None:
+        comment_cache = get_comment_cache(**cache)
+        _, scores = comment_cache.score(comments, sentiment)
+        comment_cache.flush()
+    else:
+        scores = get_backend(sentiment).score_many(clean_series(comments))
+    new_hits, new_misses = _cache_counts(cache)
+
+    aggregates = {}
+    for product_name, comment, tag, rating, score in zip(product_names, comments, tags, ratings, scores):
+        agg = aggregates.get(product_name)
+        if agg is None:
+            agg = aggregates[product_name] = ProductAggregate()
+        agg.total_reviews += 1
+        if not math.isnan(rating):
+            agg.add_ratings((rating,))
+        add_exact(agg.sentiment_partials, score)
+        agg.sentiment_count += 1
+        agg.sentiments[categorize_sentiment(score)] += 1
+        agg.words.update(clean_text(comment + " " + tag).split())
+
+    return aggregates, new_hits - hits, new_misses - misses
+
+
+def _chunk_tasks(reader, sentiment, cache):
+    """Yield one _aggregate_chunk argument tuple per CSV chunk"""
+    for chunk in reader:
+        chunk = chunk[chunk['Product Name'].notna()]
+        if chunk.empty:
+            continue
+        if 'Tags' in chunk.columns:
+            tags = chunk['Tags'].fillna('').tolist()
+        else:
+            tags = [''] * len(chunk)
+        yield (
+            chunk['Product Name'].tolist(),
+            chunk['Comment'].fillna('').tolist(),
+            tags,
+            pd.to_numeric(chunk['Rating'], errors='coerce').astype(float).tolist(),
+            sentiment,
+            cache,
+        )
+
+
+def analyze_reviews_streaming(input_csv, delimiter, renderer, workers=1, sentiment='textblob', cache=None, chunk_size=50000):
+    """Fold the review CSV into per-product aggregates ``chunk_size`` rows at a time
+
+    Returns (results in product order, cache hits, cache misses).
+    """
+    reader = _read_review_chunks(input_csv, delimiter, chunk_size)
+    tasks = _chunk_tasks(reader, sentiment, cache)
+    aggregates = {}
+    cache_hits = 0
+    cache_misses = 0
+    rows = 0
+
+    def fold(outcome):
+        nonlocal cache_hits, cache_misses, rows
+        partial, hits, misses = outcome
+        for product_name, agg in partial.items():
+            rows += agg.total_reviews
+            if product_name in aggregates:
+                aggregates[product_name].merge(agg)
+            else:
+                aggregates[product_name] = agg
+        cache_hits += hits
+        cache_misses += misses
+        print(f"📥 Aggregated {rows} reviews across {len(aggregates)} products")
+
+    with contextlib.closing(reader):
+        if workers > 1:
+            # Chunks are folded in file order; only a window of them is in
+            # flight so memory stays bounded
+            with ProcessPoolExecutor(max_workers=workers) as pool:
+                pending = deque()
+                for task in tasks:
+                    pending.append(pool.submit(_aggregate_chunk, task))
+                    if len(pending) >= workers * 2:
+                        fold(pending.popleft().result())
+                while pending:
+                    fold(pending.popleft().result())
+        else:
+            for task in tasks:
+                fold(_aggregate_chunk(task))
+
+    results = []
+    for product_name in sorted(aggregates):
+        result = aggregates.pop(product_name).result(product_name, renderer)
+        _print_product_result(result)
+        results.append(result)
+    return results, cache_hits, cache_misses
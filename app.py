@@ -1,19 +1,32 @@
-from flask import Flask, request, jsonify, send_file
+from flask import Flask, Response, request, jsonify, send_file, stream_with_context
 from flask_cors import CORS
+import contextlib
+import hashlib
+import itertools
 import threading
 import os
 import json
 import time
 import uuid
+import zlib
+from collections import Counter, deque
 from werkzeug.utils import secure_filename
-import undetected_chromedriver as uc
-
-# Import your scraper functions
+import metrics
+from browserpool import BrowserPool
+from output import add_output_listener, compact_dataset, dataset_parts, is_parquet, read_page
+from scheduler import JobScheduler, QueueFull
+from responsecache import RESPONSE_CACHE_FILE, CachingTransport, ResponseCache
+from ratelimit import get_rate_controller
+from taskstore import TaskStore
+from transport import CancellableTransport, TaskCancelled, as_transport
+
+# Import your scraper functions (analysis is imported on first use, see
+# analyze_with_logging, so workers boot without pandas and matplotlib)
 from ShopeeTool import (
+    launch_driver,
     scrape_search, 
     scrape_shop, 
-    scrape_reviews_from_csv, 
-    analyze_reviews
+    scrape_reviews_from_csv
 )
 
 app = Flask(__name__)
@@ -22,7 +35,24 @@ CORS(app)
 # Configuration
 UPLOAD_FOLDER = 'uploads'
 OUTPUT_FOLDER = 'outputs'
-ALLOWED_EXTENSIONS = {'csv'}
+ALLOWED_EXTENSIONS = {'csv', 'parquet'}
+SENTIMENT_CACHE_FILE = 'sentiment_cache.sqlite'
+TASK_DB_FILE = 'tasks.sqlite'
+WORDCLOUD_MODES = ('inline', 'background', 'lazy', 'skip')
+BROWSER_POOL_SIZE = 3
+# One more worker than browsers, so an analysis can run beside full scrapes
+TASK_WORKERS = BROWSER_POOL_SIZE + 1
+MAX_QUEUED_TASKS = 20
+# Log entries kept per task; older ones are dropped from the front
+TASK_LOG_LIMIT = 1000
+# Seconds between keep-alive comments on an idle event stream
+EVENT_KEEPALIVE = 15
+TERMINAL_STATUSES = ('completed', 'error', 'cancelled')
+DOWNLOAD_CHUNK_SIZE = 256 * 1024
+PREVIEW_PAGE_SIZE = 50
+MAX_PREVIEW_PAGE_SIZE = 500
+# Seconds a finished search or shop scrape is handed to identical requests
+RESULT_REUSE_WINDOW = 300
 
 os.makedirs(UPLOAD_FOLDER, exist_ok=True)
 os.makedirs(OUTPUT_FOLDER, exist_ok=True)
@@ -30,110 +60,300 @@ os.makedirs(OUTPUT_FOLDER, exist_ok=True)
 app.config['UPLOAD_FOLDER'] = UPLOAD_FOLDER
 app.config['MAX_CONTENT_LENGTH'] = 16 * 1024 * 1024  # 16MB max file size
 
-# Global driver instance
-driver = None
-driver_lock = threading.Lock()
+# Browsers are leased to scrape tasks, one task per browser at a time
+browsers = BrowserPool(launch_driver, size=BROWSER_POOL_SIZE)
+
+# Tasks run on a bounded pool of workers, highest priority first
+jobs = JobScheduler(TASK_WORKERS, MAX_QUEUED_TASKS)
 
-# Task storage for polling
+# API responses are shared across tasks, so a repeated scrape is served
+# from disk without using a browser's request budget
+response_cache = ResponseCache(RESPONSE_CACHE_FILE)
+
+# Task storage for polling.  Log entries carry a sequence number so clients
+# fetch only what is new; event streams wait on tasks_changed.
 tasks = {}
 tasks_lock = threading.Lock()
+tasks_changed = threading.Condition(tasks_lock)
+
+# Server state for /api/metrics, read when it is scraped; the scraper's
+# own metrics are recorded as it runs (see metrics.py)
+TASKS_GAUGE = metrics.Gauge('shopee_tasks', 'Tasks held by the server, by status', ['status'])
+QUEUE_GAUGE = metrics.Gauge('shopee_job_queue', 'Scheduler jobs, by state', ['state'])
+BROWSERS_GAUGE = metrics.Gauge('shopee_browsers', 'Pooled browsers, by state', ['state'])
+TASK_ROWS_GAUGE = metrics.Gauge(
+    'shopee_task_rows_per_second', 'Output rows per second of each running task', ['task_id', 'kind']
+)
+RATE_GAUGE = metrics.Gauge('shopee_request_rate', 'Requests per second the rate controller allows')
+CACHE_GAUGE = metrics.Gauge('shopee_response_cache', 'Response cache counters and size in bytes', ['stat'])
+
+# Identical search and shop requests share one task: job key -> task_id of
+# the latest task started for it
+coalesced_jobs = {}
+coalesce_lock = threading.Lock()
+
+def is_output_name(filename):
+    """Whether a file in OUTPUT_FOLDER is a listed output (dot files are temporary)"""
+    return not filename.startswith('.') and (filename.endswith('.csv') or is_parquet(filename))
+
+# Task records and the output index outlive the process; live logs don't
+store = TaskStore(TASK_DB_FILE)
+interrupted = store.fail_unfinished('Interrupted by a server restart')
+if interrupted:
+    print(f"⚠️ {interrupted} tasks were interrupted by the last shutdown")
+store.reconcile(OUTPUT_FOLDER, is_output_name)
+
+def record_output(path, rows, appended):
+    """Output listener: index every output written to OUTPUT_FOLDER"""
+    if os.path.dirname(os.path.abspath(path)) == os.path.abspath(OUTPUT_FOLDER):
+        store.record_file(path, rows, appended)
+
+add_output_listener(record_output)
 
 def allowed_file(filename):
     return '.' in filename and filename.rsplit('.', 1)[1].lower() in ALLOWED_EXTENSIONS
 
-def create_task(task_id):
+def create_task(task_id, kind=None, params=None, output_file=None):
     """Create a new task entry"""
+    created_at = time.time()
+    store.create_task(task_id, kind, params, created_at)
+    if output_file:
+        store.link_file(output_file, task_id)
     with tasks_lock:
         tasks[task_id] = {
-            'status': 'running',
-            'logs': [],
+            'kind': kind,
+            'status': 'queued',
+            'logs': deque(maxlen=TASK_LOG_LIMIT),
+            'next_seq': 0,
             'result': None,
             'error': None,
-            'created_at': time.time()
+            'created_at': created_at,
+            'finished_at': None
         }
 
 def add_task_log(task_id, message, log_type='info'):
     """Add a log entry to a task"""
     with tasks_lock:
         if task_id in tasks:
-            tasks[task_id]['logs'].append({
+            task = tasks[task_id]
+            task['logs'].append({
+                'seq': task['next_seq'],
                 'message': message,
                 'type': log_type,
                 'time': time.strftime('%H:%M:%S')
             })
+            task['next_seq'] += 1
+            tasks_changed.notify_all()
             print(f"[{task_id}] {message}")
 
-def complete_task(task_id, result=None, error=None):
+def logs_since(task, since):
+    """Log entries after sequence number ``since``, taken from the newest end
+
+    Returns (entries, dropped) where ``dropped`` counts entries after
+    ``since`` that have already left the ring buffer.  Caller holds tasks_lock.
+    """
+    wanted = task['next_seq'] - (since + 1)
+    if wanted <= 0:
+        return [], 0
+    logs = task['logs']
+    entries = list(itertools.islice(reversed(logs), min(wanted, len(logs))))
+    entries.reverse()
+    return entries, wanted - len(entries)
+
+def parse_since(value):
+    try:
+        return int(value)
+    except (TypeError, ValueError):
+        return -1
+
+def set_task_status(task_id, status):
+    store.set_status(task_id, status)
+    with tasks_lock:
+        if task_id in tasks:
+            tasks[task_id]['status'] = status
+            tasks_changed.notify_all()
+
+def complete_task(task_id, result=None, error=None, cancelled=False):
     """Mark task as completed"""
+    if cancelled:
+        status = 'cancelled'
+    else:
+        status = 'completed' if error is None else 'error'
+    store.finish_task(task_id, status, result, error)
     with tasks_lock:
         if task_id in tasks:
-            tasks[task_id]['status'] = 'completed' if error is None else 'error'
+            tasks[task_id]['status'] = status
             tasks[task_id]['result'] = result
             tasks[task_id]['error'] = error
+            tasks[task_id]['finished_at'] = time.time()
+            tasks_changed.notify_all()
+
+def task_priority(value):
+    """Priority from a request field; higher runs sooner"""
+    try:
+        return int(value or 0)
+    except (TypeError, ValueError):
+        return 0
+
+def joinable_task(key, reuse=True):
+    """Task an identical request can follow: one still queued or running, or
+    (with ``reuse``) one that completed within RESULT_REUSE_WINDOW and whose
+    output is still there"""
+    task_id = coalesced_jobs.get(key)
+    with tasks_lock:
+        task = tasks.get(task_id)
+        if task is None:
+            return None
+        if task['status'] not in TERMINAL_STATUSES:
+            return task_id
+        if not reuse or task['status'] != 'completed':
+            return None
+        if time.time() - task['finished_at'] > RESULT_REUSE_WINDOW:
+            return None
+        output_file = (task['result'] or {}).get('output_file')
+        return task_id if output_file and os.path.exists(output_file) else None
+
+def start_or_join(key, start, reuse=True):
+    """Follow an identical task if there is one, else ``start()`` a new one
+
+    Returns (task_id, joined).  Both share the same progress, logs and
+    result, and only the first one scrapes.
+    """
+    with coalesce_lock:
+        task_id = joinable_task(key, reuse)
+        if task_id is not None:
+            add_task_log(task_id, 'Another client joined this task', 'info')
+            return task_id, True
+        task_id = start()
+        coalesced_jobs[key] = task_id
+        return task_id, False
+
+def start_unless_running(key, start):
+    """``start()`` a task unless one for ``key`` is still queued or running
+
+    Returns (task_id, started).  For jobs that must not run side by side,
+    such as two incremental syncs appending to the same output.
+    """
+    with coalesce_lock:
+        task_id = joinable_task(key, reuse=False)
+        if task_id is not None:
+            return task_id, False
+        task_id = start()
+        coalesced_jobs[key] = task_id
+        return task_id, True
+
+def keyed_output(key, label):
+    """Output path for a job key: ``label`` to read, plus a short hash of the
+    key so jobs that don't coalesce never write the same file"""
+    digest = hashlib.sha1(repr(key).encode('utf-8')).hexdigest()[:8]
+    return os.path.join(OUTPUT_FOLDER, f"{label}_{digest}.csv")
+
+def joined_response(task_id, what):
+    return jsonify({
+        'success': True,
+        'task_id': task_id,
+        'coalesced': True,
+        'message': f'Joined an identical {what} that is running or just finished. '
+                   'Poll /api/task-status/{task_id} for progress.'
+    })
 
 def initialize_driver():
     """Initialize Chrome driver with session persistence"""
-    global driver
-    with driver_lock:
-        if driver is None:
-            print('Initializing Chrome driver...')
-            options = uc.ChromeOptions()
-            profile_path = os.path.join(os.getcwd(), "shopee_session")
-            options.add_argument(f"--user-data-dir={profile_path}")
-            driver = uc.Chrome(options=options)
-            driver.get("https://shopee.ph/buyer/login")
-            print('Chrome driver ready. Please login in the browser.')
-    return driver
-
-def run_scraper_task(task_id, task_func, *args, **kwargs):
-    """Run scraper task in background thread"""
+    if not browsers.started:
+        print('Initializing Chrome driver...')
+        driver = browsers.start()
+        driver.get("https://shopee.ph/buyer/login")
+        print('Chrome driver ready. Please login in the browser.')
+
+@contextlib.contextmanager
+def lease_driver(task_id, no_cache=False):
+    """Lease a browser for a task, logging if it has to wait for one
+
+    Requests go through the shared response cache (skipped for lookups
+    with ``no_cache``) behind a CancellableTransport, so cancelling the task
+    stops its scrape at the next page, cached or not.
+    """
+    job = jobs.get(task_id)
+    with browsers.lease(
+        on_wait=lambda: add_task_log(task_id, 'All browsers are busy, waiting for one to free up...', 'info')
+    ) as driver:
+        transport = CachingTransport(as_transport(driver), response_cache, bypass=no_cache)
+        yield CancellableTransport(transport, job.cancelled)
+
+def run_scraper_task(task_id, task_func, *args, priority=0, **kwargs):
+    """Queue a task on the job scheduler; raises QueueFull when it is at capacity"""
     def task():
         try:
+            set_task_status(task_id, 'running')
             add_task_log(task_id, 'Starting task...', 'info')
-            result = task_func(task_id, *args, **kwargs)
+            with metrics.task_context(task_id):
+                result = task_func(task_id, *args, **kwargs)
             add_task_log(task_id, 'Task completed successfully!', 'success')
             complete_task(task_id, result=result)
+        except TaskCancelled:
+            add_task_log(task_id, 'Task cancelled', 'error')
+            complete_task(task_id, cancelled=True)
         except Exception as e:
             error_msg = str(e)
             add_task_log(task_id, f'Error: {error_msg}', 'error')
             complete_task(task_id, error=error_msg)
     
-    thread = threading.Thread(target=task)
-    thread.daemon = True
-    thread.start()
+    try:
+        jobs.submit(task_id, task, priority=priority)
+    except QueueFull:
+        with tasks_lock:
+            tasks.pop(task_id, None)
+        store.delete_task(task_id)
+        raise
 
 # Modified scraper wrappers to add logging
-def scrape_search_with_logging(task_id, keyword, pages, output_file):
+def scrape_search_with_logging(task_id, keyword, pages, output_file, no_cache=False):
     """Search wrapper with logging"""
     add_task_log(task_id, f'Searching for: {keyword}', 'info')
     add_task_log(task_id, f'Pages to scrape: {pages}', 'info')
-    result = scrape_search(driver, keyword, pages, output_file)
+    with lease_driver(task_id, no_cache) as driver:
+        result = scrape_search(driver, keyword, pages, output_file)
     add_task_log(task_id, f'Found items saved to {output_file}', 'success')
     return {'output_file': result, 'keyword': keyword}
 
-def scrape_shop_with_logging(task_id, shop_id, include_active, include_soldout, output_file):
+def scrape_shop_with_logging(task_id, shop_id, include_active, include_soldout, output_file, no_cache=False):
     """Shop scraper wrapper with logging"""
     add_task_log(task_id, f'Scraping shop: {shop_id}', 'info')
     add_task_log(task_id, f'Active items: {include_active}, Sold-out: {include_soldout}', 'info')
-    result = scrape_shop(driver, shop_id, include_active, include_soldout, output_file)
+    with lease_driver(task_id, no_cache) as driver:
+        result = scrape_shop(driver, shop_id, include_active, include_soldout, output_file)
     add_task_log(task_id, f'Shop items saved to {output_file}', 'success')
     return {'output_file': result, 'shop_id': shop_id}
 
-def scrape_reviews_with_logging(task_id, input_path, output_file, max_reviews):
+def scrape_reviews_with_logging(task_id, input_path, output_file, max_reviews, incremental=False, no_cache=False):
     """Reviews scraper wrapper with logging"""
     add_task_log(task_id, f'Scraping reviews from {input_path}', 'info')
     add_task_log(task_id, f'Max reviews per product: {max_reviews}', 'info')
-    result = scrape_reviews_from_csv(driver, input_path, output_file, max_reviews)
+    if incremental:
+        add_task_log(task_id, 'Incremental sync: only reviews newer than the last run', 'info')
+    # Cached first pages would hide reviews posted since the last sync
+    with lease_driver(task_id, no_cache or incremental) as driver:
+        result = scrape_reviews_from_csv(driver, input_path, output_file, max_reviews, incremental=incremental)
     add_task_log(task_id, f'Reviews saved to {output_file}', 'success')
     return {'output_file': result}
 
-def analyze_with_logging(task_id, input_path, output_file):
+def analyze_with_logging(task_id, input_path, output_file, workers, sentiment, stream, wordclouds):
     """Analysis wrapper with logging"""
+    from analysis import analyze_reviews
     add_task_log(task_id, f'Analyzing reviews from {input_path}', 'info')
-    result = analyze_reviews(input_path, output_file)
+    add_task_log(task_id, f'Worker processes: {workers}, sentiment: {sentiment}', 'info')
+    if stream:
+        add_task_log(task_id, 'Streaming the input in chunks', 'info')
+    add_task_log(task_id, f'Wordclouds: {wordclouds}', 'info')
+    result = analyze_reviews(
+        input_path, output_file, workers, sentiment,
+        cache_file=SENTIMENT_CACHE_FILE, stream=stream, wordclouds=wordclouds
+    )
     add_task_log(task_id, f'Analysis saved to {output_file}', 'success')
     
     if result is not None:
+        # Written by pandas rather than an output writer, so indexed here
+        record_output(output_file, len(result), False)
         return {
             'total_products': len(result),
             'avg_rating': round(result['Average Rating'].mean(), 2),
@@ -149,7 +369,13 @@ def analyze_with_logging(task_id, input_path, output_file):
 @app.route('/api/health', methods=['GET'])
 def health_check():
     """Health check endpoint"""
-    return jsonify({'status': 'ok', 'driver_initialized': driver is not None})
+    return jsonify({
+        'status': 'ok',
+        'driver_initialized': browsers.started,
+        'browsers': browsers.stats(),
+        'jobs': jobs.stats(),
+        'response_cache': response_cache.summary()
+    })
 
 @app.route('/api/initialize-driver', methods=['POST'])
 def init_driver():
@@ -169,19 +395,34 @@ def search_products():
     try:
         data = request.json
         keyword = data.get('keyword')
-        pages = data.get('pages', 10)
+        try:
+            pages = int(data.get('pages', 10))
+        except (TypeError, ValueError):
+            return jsonify({'success': False, 'error': 'Pages must be a number'}), 400
+        priority = task_priority(data.get('priority'))
+        no_cache = bool(data.get('no_cache', False))
         
         if not keyword:
             return jsonify({'success': False, 'error': 'Keyword is required'}), 400
         
-        if driver is None:
+        if not browsers.started:
             return jsonify({'success': False, 'error': 'Driver not initialized'}), 400
         
-        task_id = str(uuid.uuid4())
-        output_file = os.path.join(OUTPUT_FOLDER, f"search_{keyword.replace(' ', '_')}.csv")
+        # Shopee's search ignores case and extra spaces
+        normalized = ' '.join(keyword.lower().split())
+        key = ('search', normalized, pages)
+        output_file = keyed_output(key, f"search_{normalized.replace(' ', '_')}_{pages}p")
         
-        create_task(task_id)
-        run_scraper_task(task_id, scrape_search_with_logging, keyword, pages, output_file)
+        def start():
+            task_id = str(uuid.uuid4())
+            create_task(task_id, 'search', {'keyword': keyword, 'pages': pages}, output_file)
+            run_scraper_task(task_id, scrape_search_with_logging, keyword, pages, output_file,
+                             priority=priority, no_cache=no_cache)
+            return task_id
+        
+        task_id, joined = start_or_join(key, start, reuse=not no_cache)
+        if joined:
+            return joined_response(task_id, 'search')
         
         return jsonify({
             'success': True,
@@ -189,6 +430,8 @@ def search_products():
             'message': 'Search started. Poll /api/task-status/{task_id} for progress.'
         })
         
+    except QueueFull as e:
+        return jsonify({'success': False, 'error': str(e)}), 429
     except Exception as e:
         return jsonify({'success': False, 'error': str(e)}), 500
 
@@ -200,18 +443,35 @@ def scrape_shop_items():
         shop_id = data.get('shop_id')
         include_active = data.get('include_active', True)
         include_soldout = data.get('include_soldout', True)
+        priority = task_priority(data.get('priority'))
+        no_cache = bool(data.get('no_cache', False))
         
         if not shop_id:
             return jsonify({'success': False, 'error': 'Shop ID is required'}), 400
         
-        if driver is None:
+        if not browsers.started:
             return jsonify({'success': False, 'error': 'Driver not initialized'}), 400
         
-        task_id = str(uuid.uuid4())
-        output_file = os.path.join(OUTPUT_FOLDER, f"shop_{shop_id}.csv")
+        key = ('shop', str(shop_id).strip(), bool(include_active), bool(include_soldout))
+        scope = {(True, True): 'all', (True, False): 'active', (False, True): 'soldout'}.get(key[2:], 'none')
+        output_file = keyed_output(key, f"shop_{key[1]}_{scope}")
         
-        create_task(task_id)
-        run_scraper_task(task_id, scrape_shop_with_logging, shop_id, include_active, include_soldout, output_file)
+        def start():
+            task_id = str(uuid.uuid4())
+            create_task(
+                task_id, 'shop',
+                {'shop_id': shop_id, 'include_active': include_active, 'include_soldout': include_soldout},
+                output_file
+            )
+            run_scraper_task(
+                task_id, scrape_shop_with_logging, shop_id, include_active, include_soldout, output_file,
+                priority=priority, no_cache=no_cache
+            )
+            return task_id
+        
+        task_id, joined = start_or_join(key, start, reuse=not no_cache)
+        if joined:
+            return joined_response(task_id, 'shop scrape')
         
         return jsonify({
             'success': True,
@@ -219,6 +479,8 @@ def scrape_shop_items():
             'message': 'Shop scraping started. Poll /api/task-status/{task_id} for progress.'
         })
         
+    except QueueFull as e:
+        return jsonify({'success': False, 'error': str(e)}), 429
     except Exception as e:
         return jsonify({'success': False, 'error': str(e)}), 500
 
@@ -231,26 +493,56 @@ def scrape_reviews():
         
         file = request.files['file']
         max_reviews = int(request.form.get('max_reviews', 1000))
+        incremental = request.form.get('incremental', 'false').lower() in ('1', 'true', 'yes', 'on')
+        priority = task_priority(request.form.get('priority'))
+        no_cache = request.form.get('no_cache', 'false').lower() in ('1', 'true', 'yes', 'on')
         
         if file.filename == '':
             return jsonify({'success': False, 'error': 'No file selected'}), 400
         
         if not allowed_file(file.filename):
-            return jsonify({'success': False, 'error': 'Only CSV files allowed'}), 400
+            return jsonify({'success': False, 'error': 'Only CSV or Parquet files allowed'}), 400
         
-        if driver is None:
+        if not browsers.started:
             return jsonify({'success': False, 'error': 'Driver not initialized'}), 400
         
-        # Save uploaded file
         filename = secure_filename(file.filename)
         input_path = os.path.join(UPLOAD_FOLDER, filename)
-        file.save(input_path)
+        stem = os.path.splitext(filename)[0]
+        if incremental:
+            # A stable name per product list, so each sync appends to the last one
+            output_file = os.path.join(OUTPUT_FOLDER, f"reviews_{stem}.csv")
+        else:
+            output_file = os.path.join(OUTPUT_FOLDER, f"reviews_{int(time.time())}.csv")
         
-        task_id = str(uuid.uuid4())
-        output_file = os.path.join(OUTPUT_FOLDER, f"reviews_{int(time.time())}.csv")
+        def start():
+            # Save uploaded file
+            file.save(input_path)
+            task_id = str(uuid.uuid4())
+            create_task(
+                task_id, 'reviews',
+                {'input': filename, 'max_reviews': max_reviews, 'incremental': incremental},
+                output_file
+            )
+            run_scraper_task(
+                task_id, scrape_reviews_with_logging, input_path, output_file, max_reviews, incremental,
+                priority=priority, no_cache=no_cache
+            )
+            return task_id
         
-        create_task(task_id)
-        run_scraper_task(task_id, scrape_reviews_with_logging, input_path, output_file, max_reviews)
+        if incremental:
+            # Its output and progress journal are shared with every other
+            # sync of this list; the upload is checked before it replaces
+            # the running sync's input
+            task_id, started = start_unless_running(('reviews', stem), start)
+            if not started:
+                return jsonify({
+                    'success': False,
+                    'task_id': task_id,
+                    'error': f'An incremental sync of {filename} is already running (task {task_id})'
+                }), 409
+        else:
+            task_id = start()
         
         return jsonify({
             'success': True,
@@ -258,6 +550,8 @@ def scrape_reviews():
             'message': 'Review scraping started. Poll /api/task-status/{task_id} for progress.'
         })
         
+    except QueueFull as e:
+        return jsonify({'success': False, 'error': str(e)}), 429
     except Exception as e:
         return jsonify({'success': False, 'error': str(e)}), 500
 
@@ -269,12 +563,24 @@ def analyze_reviews_endpoint():
             return jsonify({'success': False, 'error': 'No file uploaded'}), 400
         
         file = request.files['file']
+        workers = max(1, int(request.form.get('workers', 1)))
+        sentiment = request.form.get('sentiment', 'textblob')
+        stream = request.form.get('stream', 'false').lower() in ('1', 'true', 'yes', 'on')
+        # Images are drawn when first requested from /api/wordcloud by default
+        wordclouds = request.form.get('wordclouds', 'lazy')
+        priority = task_priority(request.form.get('priority'))
         
         if file.filename == '':
             return jsonify({'success': False, 'error': 'No file selected'}), 400
         
         if not allowed_file(file.filename):
-            return jsonify({'success': False, 'error': 'Only CSV files allowed'}), 400
+            return jsonify({'success': False, 'error': 'Only CSV or Parquet files allowed'}), 400
+        
+        if sentiment not in ('textblob', 'lexicon'):
+            return jsonify({'success': False, 'error': 'Sentiment must be textblob or lexicon'}), 400
+        
+        if wordclouds not in WORDCLOUD_MODES:
+            return jsonify({'success': False, 'error': f"Wordclouds must be one of {', '.join(WORDCLOUD_MODES)}"}), 400
         
         # Save uploaded file
         filename = secure_filename(file.filename)
@@ -284,8 +590,15 @@ def analyze_reviews_endpoint():
         task_id = str(uuid.uuid4())
         output_file = os.path.join(OUTPUT_FOLDER, f"analysis_{int(time.time())}.csv")
         
-        create_task(task_id)
-        run_scraper_task(task_id, analyze_with_logging, input_path, output_file)
+        create_task(
+            task_id, 'analyze',
+            {'input': filename, 'workers': workers, 'sentiment': sentiment, 'stream': stream, 'wordclouds': wordclouds},
+            output_file
+        )
+        run_scraper_task(
+            task_id, analyze_with_logging, input_path, output_file, workers, sentiment, stream, wordclouds,
+            priority=priority
+        )
         
         return jsonify({
             'success': True,
@@ -293,66 +606,332 @@ def analyze_reviews_endpoint():
             'message': 'Analysis started. Poll /api/task-status/{task_id} for progress.'
         })
         
+    except QueueFull as e:
+        return jsonify({'success': False, 'error': str(e)}), 429
     except Exception as e:
         return jsonify({'success': False, 'error': str(e)}), 500
 
 @app.route('/api/task-status/<task_id>', methods=['GET'])
 def get_task_status(task_id):
-    """Get status of a running task"""
+    """Get status of a running task
+
+    ``since`` is the ``seq`` of the last log entry the client has; only
+    newer entries are returned.  Pass back ``last_seq`` on the next poll.
+    """
+    since = parse_since(request.args.get('since'))
+    # Copy what's needed under the lock; the store is queried after it's
+    # released so running tasks' add_task_log() never waits on disk
     with tasks_lock:
-        if task_id not in tasks:
+        task = tasks.get(task_id)
+        if task is not None:
+            logs, dropped = logs_since(task, since)
+            snapshot = {
+                'status': task['status'],
+                'logs': logs,
+                'last_seq': task['next_seq'] - 1,
+                'dropped_logs': dropped,
+                'result': task['result'],
+                'error': task['error'],
+            }
+    
+    if task is None:
+        # Finished long ago or before a restart: the stored record, without logs
+        stored = store.get_task(task_id)
+        if stored is None:
             return jsonify({'error': 'Task not found'}), 404
-        
-        task = tasks[task_id]
-        # Return logs since last check
-        logs = task['logs']
-        # Clear logs after sending (optional - keep them if you want history)
-        # task['logs'] = []
-        
         return jsonify({
-            'status': task['status'],
-            'logs': logs,
-            'result': task['result'],
-            'error': task['error']
+            'status': stored['status'],
+            'logs': [],
+            'last_seq': -1,
+            'dropped_logs': 0,
+            'result': stored['result'],
+            'error': stored['error'],
+            'files': store.files_for_task(task_id)
         })
+    
+    job = jobs.get(task_id)
+    return jsonify({
+        **snapshot,
+        'priority': job.priority if job else None,
+        'queue_position': jobs.position(task_id),
+        'queue_depth': jobs.stats()['queued'],
+        'files': store.files_for_task(task_id),
+        'wait_time': round(job.wait_time(), 2) if job else None
+    })
+
+def _sse(event, data, event_id=None):
+    message = f"event: {event}\ndata: {json.dumps(data)}\n\n"
+    if event_id is not None:
+        message = f"id: {event_id}\n{message}"
+    return message
+
+@app.route('/api/task-events/<task_id>', methods=['GET'])
+def task_events(task_id):
+    """Stream a task's log entries and status changes as Server-Sent Events
+
+    ``log`` events carry one entry each, with its ``seq`` as the event id,
+    so a reconnecting EventSource resumes after the last one it saw.  A
+    ``status`` event is sent whenever the status changes; the stream ends
+    after the final one.
+    """
+    since = parse_since(request.headers.get('Last-Event-ID', request.args.get('since')))
+    with tasks_lock:
+        if task_id not in tasks:
+            return jsonify({'error': 'Task not found'}), 404
+
+    def stream():
+        cursor = since
+        status = None
+        while True:
+            idle = False
+            with tasks_lock:
+                task = tasks.get(task_id)
+                if task is not None:
+                    cursor = min(cursor, task['next_seq'] - 1)
+                    if task['next_seq'] - 1 == cursor and task['status'] == status:
+                        # Woken by any task's change; only a timeout is idle
+                        idle = not tasks_changed.wait(EVENT_KEEPALIVE)
+                        task = tasks.get(task_id)
+                if task is None:
+                    return
+                logs, _ = logs_since(task, cursor)
+                changed = task['status'] != status
+                status = task['status']
+                snapshot = {'status': status, 'result': task['result'], 'error': task['error']}
+
+            if not logs and not changed:
+                if idle:
+                    yield ": keep-alive\n\n"
+                continue
+            for entry in logs:
+                cursor = entry['seq']
+                yield _sse('log', entry, cursor)
+            if changed:
+                yield _sse('status', snapshot)
+                if status in TERMINAL_STATUSES:
+                    return
+
+    return Response(
+        stream_with_context(stream()),
+        mimetype='text/event-stream',
+        headers={'Cache-Control': 'no-cache', 'X-Accel-Buffering': 'no'}
+    )
+
+@app.route('/api/tasks', methods=['GET'])
+def list_tasks():
+    """Recent tasks from the task store, newest first"""
+    limit = request.args.get('limit', 50, type=int)
+    offset = request.args.get('offset', 0, type=int)
+    return jsonify({'tasks': store.list_tasks(limit, offset)})
+
+@app.route('/api/task-cancel/<task_id>', methods=['POST'])
+def cancel_task(task_id):
+    """Cancel a queued task, or stop a running scrape at its next page"""
+    state = jobs.cancel(task_id)
+    if state is None:
+        return jsonify({'success': False, 'error': 'Task not found or already finished'}), 404
+    if state == 'queued':
+        add_task_log(task_id, 'Task cancelled before it started', 'error')
+        complete_task(task_id, cancelled=True)
+        return jsonify({'success': True, 'message': 'Task cancelled'})
+    with tasks_lock:
+        if task_id in tasks and tasks[task_id]['status'] == 'running':
+            tasks[task_id]['status'] = 'cancelling'
+            tasks_changed.notify_all()
+            store.set_status(task_id, 'cancelling')
+    add_task_log(task_id, 'Cancelling, the scrape stops after the current page...', 'info')
+    return jsonify({'success': True, 'message': 'Cancelling task'})
+
+def content_encodings():
+    """Encodings a download can be compressed with; zstd needs the zstandard package"""
+    try:
+        import zstandard  # noqa: F401
+    except ImportError:
+        return ['gzip']
+    return ['zstd', 'gzip']
+
+def compressed_chunks(path, encoding):
+    """Read a file in chunks and compress it on the fly"""
+    if encoding == 'zstd':
+        import zstandard
+        compressor = zstandard.ZstdCompressor(level=3).compressobj()
+    else:
+        compressor = zlib.compressobj(6, zlib.DEFLATED, 16 + zlib.MAX_WBITS)
+    with open(path, 'rb') as f:
+        for chunk in iter(lambda: f.read(DOWNLOAD_CHUNK_SIZE), b''):
+            data = compressor.compress(chunk)
+            if data:
+                yield data
+    yield compressor.flush()
+
+def send_compressed(path, filename, encoding):
+    """Stream a file with a Content-Encoding, honouring If-None-Match"""
+    stat = os.stat(path)
+    etag = f"{stat.st_mtime_ns:x}-{stat.st_size:x}-{encoding}"
+    if request.if_none_match.contains(etag):
+        response = Response(status=304)
+    else:
+        response = Response(compressed_chunks(path, encoding), mimetype='text/csv')
+        response.headers['Content-Encoding'] = encoding
+        response.headers['Content-Disposition'] = f'attachment; filename="{filename}"'
+    response.set_etag(etag)
+    response.last_modified = stat.st_mtime
+    response.vary.add('Accept-Encoding')
+    return response
+
+def compacted_dataset(file_path, filename):
+    """A Parquet dataset compacted into one file, reused while the dataset is unchanged
+
+    Keeping the same file between requests lets ETags and Range requests
+    (resumed downloads) work for datasets too.
+    """
+    parts = dataset_parts(file_path)
+    if not parts:
+        return None
+    version = f"{len(parts)}-{os.stat(parts[-1]).st_mtime_ns:x}"
+    prefix = f".download_{filename}."
+    compacted = os.path.join(OUTPUT_FOLDER, f"{prefix}{version}.parquet")
+    if not os.path.exists(compacted):
+        tmp_path = f"{compacted}.{uuid.uuid4().hex}.tmp"
+        compact_dataset(file_path, tmp_path)
+        os.replace(tmp_path, compacted)
+        for name in os.listdir(OUTPUT_FOLDER):
+            if name.startswith(prefix) and name.endswith('.parquet') and name != os.path.basename(compacted):
+                with contextlib.suppress(OSError):
+                    os.remove(os.path.join(OUTPUT_FOLDER, name))
+    return compacted
 
 @app.route('/api/download/<filename>', methods=['GET'])
 def download_file(filename):
-    """Download generated files"""
+    """Download generated files
+
+    Files are served with ETags and Range support.  A CSV requested without
+    a Range is compressed on the fly when the client accepts zstd or gzip;
+    Parquet is already compressed and always sent as is.
+    """
     try:
+        if filename.startswith('.'):
+            return jsonify({'error': 'File not found'}), 404
         file_path = os.path.join(OUTPUT_FOLDER, filename)
-        if os.path.exists(file_path):
-            return send_file(file_path, as_attachment=True)
-        return jsonify({'error': 'File not found'}), 404
+        if os.path.isdir(file_path) and is_parquet(file_path):
+            # A review dataset is sent as a single Parquet file
+            compacted = compacted_dataset(file_path, filename)
+            if compacted is None:
+                return jsonify({'error': 'Dataset is empty'}), 404
+            return send_file(os.path.abspath(compacted), as_attachment=True, download_name=filename, conditional=True)
+        if not os.path.isfile(file_path):
+            return jsonify({'error': 'File not found'}), 404
+        if is_parquet(file_path):
+            return send_file(os.path.abspath(file_path), as_attachment=True, conditional=True)
+
+        if 'Range' not in request.headers:
+            encoding = request.accept_encodings.best_match(content_encodings())
+            if encoding:
+                return send_compressed(file_path, filename, encoding)
+        response = send_file(os.path.abspath(file_path), as_attachment=True, conditional=True)
+        response.vary.add('Accept-Encoding')
+        return response
+    except Exception as e:
+        return jsonify({'error': str(e)}), 500
+
+@app.route('/api/preview/<filename>', methods=['GET'])
+def preview_file(filename):
+    """One page of an output file's rows as JSON
+
+    CSVs are read through their row index, so any page costs a seek and
+    at most a stride of rows, however large the file.
+    """
+    try:
+        file_path = os.path.join(OUTPUT_FOLDER, filename)
+        if filename.startswith('.') or not os.path.exists(file_path):
+            return jsonify({'error': 'File not found'}), 404
+        page = max(1, request.args.get('page', 1, type=int))
+        page_size = min(max(1, request.args.get('page_size', PREVIEW_PAGE_SIZE, type=int)), MAX_PREVIEW_PAGE_SIZE)
+        columns, rows, total = read_page(file_path, (page - 1) * page_size, page_size)
+        return jsonify({
+            'filename': filename,
+            'columns': columns,
+            'rows': rows,
+            'page': page,
+            'page_size': page_size,
+            'total_rows': total,
+            'total_pages': max(1, -(-total // page_size))
+        })
+    except Exception as e:
+        return jsonify({'error': str(e)}), 500
+
+@app.route('/api/wordcloud/<filename>', methods=['GET'])
+def wordcloud_image(filename):
+    """Serve a wordcloud image, drawing it on first request in lazy mode"""
+    try:
+        from rendering import WORDCLOUD_FOLDER, render_spec
+        # Product names keep their spaces, so secure_filename() can't be used
+        if filename.startswith('.') or os.path.basename(filename) != filename:
+            return jsonify({'error': 'Wordcloud not found'}), 404
+        path = render_spec(WORDCLOUD_FOLDER, filename)
+        if path is None:
+            return jsonify({'error': 'Wordcloud not found'}), 404
+        return send_file(os.path.abspath(path), mimetype='image/png')
     except Exception as e:
         return jsonify({'error': str(e)}), 500
 
 @app.route('/api/files', methods=['GET'])
 def list_files():
-    """List all output files"""
+    """List output files, newest first, from the output index"""
     try:
-        files = []
-        for filename in os.listdir(OUTPUT_FOLDER):
-            if filename.endswith('.csv'):
-                file_path = os.path.join(OUTPUT_FOLDER, filename)
-                files.append({
-                    'filename': filename,
-                    'size': os.path.getsize(file_path),
-                    'created': os.path.getctime(file_path)
-                })
+        limit = request.args.get('limit', type=int)
+        offset = request.args.get('offset', 0, type=int)
+        files = [
+            {
+                'filename': f['filename'],
+                'size': f['size'],
+                'rows': f['rows'],
+                'task_id': f['task_id'],
+                'created': f['created_at'],
+                'updated': f['updated_at']
+            }
+            for f in store.list_files(limit, offset)
+        ]
         return jsonify({'files': files})
     except Exception as e:
         return jsonify({'error': str(e)}), 500
 
+def collect_metrics():
+    """Refresh the server state gauges"""
+    now = time.time()
+    TASKS_GAUGE.clear()
+    TASK_ROWS_GAUGE.clear()
+    with tasks_lock:
+        statuses = Counter(task['status'] for task in tasks.values())
+        running = [(task_id, task['kind']) for task_id, task in tasks.items() if task['status'] == 'running']
+    for status, count in statuses.items():
+        TASKS_GAUGE.set(count, status=status)
+    for task_id, kind in running:
+        job = jobs.get(task_id)
+        if job is not None and job.started_at:
+            elapsed = max(now - job.started_at, 1e-6)
+            TASK_ROWS_GAUGE.set(round(metrics.task_rows(task_id) / elapsed, 3), task_id=task_id, kind=kind)
+    job_stats = jobs.stats()
+    for state in ('running', 'queued', 'max_queued', 'workers'):
+        QUEUE_GAUGE.set(job_stats[state], state=state)
+    for state, count in browsers.stats().items():
+        BROWSERS_GAUGE.set(count, state=state)
+    RATE_GAUGE.set(round(get_rate_controller().rate, 4))
+    for stat in ('hits', 'misses', 'expired', 'stores', 'evictions'):
+        CACHE_GAUGE.set(response_cache.stats[stat], stat=stat)
+    CACHE_GAUGE.set(response_cache.total_bytes, stat='bytes')
+
+@app.route('/api/metrics', methods=['GET'])
+def metrics_endpoint():
+    """Scraper and server metrics in the Prometheus text format"""
+    collect_metrics()
+    return Response(metrics.render(), content_type='text/plain; version=0.0.4; charset=utf-8')
+
 @app.route('/api/cleanup', methods=['POST'])
 def cleanup_driver():
-    """Close the Chrome driver"""
-    global driver
+    """Close every Chrome driver in the pool"""
     try:
-        with driver_lock:
-            if driver:
-                driver.quit()
-                driver = None
+        browsers.close()
         return jsonify({'success': True, 'message': 'Driver closed'})
     except Exception as e:
         return jsonify({'success': False, 'error': str(e)}), 500
@@ -362,18 +941,28 @@ def cleanup_driver():
 # ============================================================================
 
 def cleanup_old_tasks():
-    """Clean up tasks older than 1 hour"""
+    """Clean up tasks that finished over 1 hour ago
+
+    Queued and running tasks stay however old they are: coalescing and the
+    incremental sync guard look them up here.
+    """
     while True:
         time.sleep(300)  # Run every 5 minutes
         current_time = time.time()
         with tasks_lock:
             tasks_to_delete = [
                 task_id for task_id, task in tasks.items()
-                if current_time - task['created_at'] > 3600
+                if task['status'] in TERMINAL_STATUSES and current_time - task['finished_at'] > 3600
             ]
             for task_id in tasks_to_delete:
                 del tasks[task_id]
+                jobs.forget(task_id)
+                metrics.forget_task(task_id)
                 print(f"Cleaned up old task: {task_id}")
+        with coalesce_lock:
+            for key, task_id in list(coalesced_jobs.items()):
+                if task_id in tasks_to_delete:
+                    del coalesced_jobs[key]
 
 # Start cleanup thread
 cleanup_thread = threading.Thread(target=cleanup_old_tasks, daemon=True)
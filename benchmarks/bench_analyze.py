@@ -0,0 +1,206 @@
+"""analyze_reviews throughput on synthetic review corpora.
+
+Corpora of 10k, 100k and 1M reviews are generated once into
+benchmarks/corpora/ (same seed, same file) in the scraper's review
+format.  Roughly half the comments are distinct, the rest repeat, much as
+short marketplace reviews do.  Each size is analyzed in a fresh
+interpreter so peak memory is its own.
+
+Usage:
+  python benchmarks/bench_analyze.py
+  python benchmarks/bench_analyze.py --sizes 1m --stream --workers 4 --sentiment lexicon
+  python benchmarks/bench_analyze.py --sizes 100k --format parquet
+  python benchmarks/bench_analyze.py --sizes 10k --check
+
+With --check nothing is timed: each corpus is analyzed in memory and
+streamed in several chunks, and the two result CSVs must be identical.
+"""
+import argparse
+import contextlib
+import io
+import json
+import math
+import os
+import resource
+import shutil
+import subprocess
+import sys
+import tempfile
+import time
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, ROOT)
+
+CORPUS_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)), 'corpora')
+SIZES = {'10k': 10_000, '100k': 100_000, '1m': 1_000_000}
+REVIEWS_PER_PRODUCT = 200
+
+COMMENTS = [
+    "Good quality, fast delivery. Thank you seller!",
+    "Maganda po yung item, sulit sa presyo",
+    "Not good, the item arrived broken",
+    "Sobrang ganda! Will order again",
+    "Pangit ang quality, hindi worth it",
+    "ok naman, medyo matagal lang ang delivery",
+    "Very nice product, exactly as described",
+    "The size is wrong and the color is different from the picture",
+    "Legit seller, mabilis mag ship",
+    "Super bagal ng shipping, sira pa yung box",
+    "Nice! my kids love it",
+    "terrible, waste of money",
+    "Thank you po! Ang bilis dumating",
+    "not bad for the price",
+    "Hindi maganda, peke ata",
+    "Excellent product, highly recommended",
+    "",
+    "satisfied customer here, good packaging",
+    "disappointed, kulang yung parts",
+    "Solid! Matibay and malinis ang pagkakagawa",
+]
+WORDS = [
+    "charger", "case", "shirt", "shoes", "bag", "cable", "lamp", "bottle", "tumbler", "earphones",
+    "color", "size", "packaging", "rider", "seller", "price", "quality", "tela", "kulay", "sukat",
+]
+TAGS = ["Good Quality", "Fast Delivery", "Worth the Price", "Excellent Service", "Value for Money"]
+
+
+def corpus_path(size, fmt):
+    ext = '.parquet' if fmt == 'parquet' else '.csv'
+    return os.path.join(CORPUS_DIR, f"reviews_{size}{ext}")
+
+
+def generate_corpus(rows, path, seed=0):
+    """Write ``rows`` synthetic reviews in the scraper's review columns"""
+    import numpy as np
+    import pandas as pd
+
+    rng = np.random.default_rng(seed)
+    comments = np.array(COMMENTS, dtype=object)
+    words = np.array(WORDS, dtype=object)
+    tags = np.array([", ".join(TAGS[:k]) for k in range(len(TAGS) + 1)], dtype=object)
+
+    base = comments[rng.integers(0, len(comments), rows)]
+    # Half the comments get a detail that makes them (mostly) distinct
+    detail = rng.random(rows) < 0.5
+    extra = words[rng.integers(0, len(words), rows)] + " " + rng.integers(1, rows, rows).astype(str)
+    comment = np.where(detail, base + " " + extra, base)
+
+    frame = pd.DataFrame({
+        'Product Name': pd.Categorical(
+            "Product " + (np.arange(rows) // REVIEWS_PER_PRODUCT).astype(str).astype(object)
+        ),
+        'Username': "buyer" + rng.integers(0, rows, rows).astype(str).astype(object),
+        'Rating': rng.choice([1, 2, 3, 4, 5], rows, p=[0.05, 0.05, 0.1, 0.2, 0.6]).astype('int8'),
+        'Region': 'PH',
+        'Tags': tags[rng.integers(0, len(tags), rows)],
+        'Comment': comment,
+    })
+    os.makedirs(os.path.dirname(path), exist_ok=True)
+    tmp_path = path + '.tmp'
+    if path.endswith('.parquet'):
+        frame.to_parquet(tmp_path, index=False)
+    else:
+        frame.to_csv(tmp_path, index=False, encoding='utf-8-sig')
+    os.replace(tmp_path, path)
+
+
+def measure(args):
+    """Analyze one corpus in this interpreter and print the result as JSON"""
+    from analysis import analyze_reviews
+
+    output = os.path.join(tempfile.mkdtemp(prefix='bench_analyze_'), 'analysis.csv')
+    start = time.perf_counter()
+    result = analyze_reviews(
+        args.corpus, output, args.workers, args.sentiment, cache_size=args.cache_size,
+        stream=args.stream, wordclouds=args.wordclouds
+    )
+    elapsed = time.perf_counter() - start
+    # KB on Linux
+    peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    peak_children = resource.getrusage(resource.RUSAGE_CHILDREN).ru_maxrss
+    print(json.dumps({
+        'elapsed': elapsed,
+        'products': 0 if result is None else len(result),
+        'peak_mb': peak / 1024,
+        'peak_children_mb': peak_children / 1024,
+    }))
+
+
+def check(path, workers, sentiment, chunk_size):
+    """Whether the streamed and in-memory analyses of ``path`` write the same CSV"""
+    from analysis import analyze_reviews
+
+    workdir = tempfile.mkdtemp(prefix='bench_analyze_')
+    outputs = []
+    for stream in (False, True):
+        output = os.path.join(workdir, f"analysis_{'stream' if stream else 'memory'}.csv")
+        with contextlib.redirect_stdout(io.StringIO()):
+            analyze_reviews(
+                path, output, workers, sentiment, stream=stream, chunk_size=chunk_size, wordclouds='skip'
+            )
+        with open(output, 'rb') as f:
+            outputs.append(f.read())
+    shutil.rmtree(workdir, ignore_errors=True)
+    return outputs[0] == outputs[1]
+
+
+def main():
+    parser = argparse.ArgumentParser(description='analyze_reviews throughput on synthetic corpora')
+    parser.add_argument('--sizes', default='10k,100k', help=f"Comma-separated corpus sizes from {', '.join(SIZES)} (default: 10k,100k)")
+    parser.add_argument('--format', choices=['csv', 'parquet'], default='csv', help='Corpus format (default: csv)')
+    parser.add_argument('--workers', type=int, default=1, help='Analysis worker processes (default: 1)')
+    parser.add_argument('--sentiment', choices=['textblob', 'lexicon'], default='lexicon', help='Sentiment backend (default: lexicon)')
+    parser.add_argument('--stream', action='store_true', help='Stream the corpus in chunks')
+    parser.add_argument('--cache-size', type=int, default=200000, help='Sentiment LRU entries, 0 to disable (default: 200000)')
+    parser.add_argument('--wordclouds', default='skip', help='Wordcloud mode (default: skip)')
+    parser.add_argument('--regenerate', action='store_true', help='Rebuild the corpora even if present')
+    parser.add_argument('--check', action='store_true', help='Check that streamed and in-memory results are identical instead of timing')
+    parser.add_argument('--chunk-size', type=int, default=1000, help='Rows per chunk for --check (default: 1000)')
+    parser.add_argument('--corpus', help=argparse.SUPPRESS)
+    args = parser.parse_args()
+
+    if args.corpus:
+        measure(args)
+        return
+
+    sizes = [size.strip().lower() for size in args.sizes.split(',') if size.strip()]
+    unknown = [size for size in sizes if size not in SIZES]
+    if unknown:
+        parser.error(f"unknown sizes: {', '.join(unknown)}")
+
+    print(f"Sentiment: {args.sentiment}, workers: {args.workers}, stream: {args.stream}, format: {args.format}")
+    for size in sizes:
+        path = corpus_path(size, args.format)
+        if args.regenerate or not os.path.exists(path):
+            print(f"Generating {size} corpus...")
+            generate_corpus(SIZES[size], path)
+
+        if args.check:
+            chunks = math.ceil(SIZES[size] / args.chunk_size)
+            if not check(path, args.workers, args.sentiment, args.chunk_size):
+                sys.exit(f"❌ {size}: streamed results ({chunks} chunks) differ from in-memory")
+            print(f"✅ {size}: streamed results ({chunks} chunks) match in-memory")
+            continue
+
+        command = [
+            sys.executable, os.path.abspath(__file__), '--corpus', path,
+            '--workers', str(args.workers), '--sentiment', args.sentiment,
+            '--cache-size', str(args.cache_size), '--wordclouds', args.wordclouds,
+        ]
+        if args.stream:
+            command.append('--stream')
+        proc = subprocess.run(command, cwd=ROOT, capture_output=True, text=True)
+        if proc.returncode != 0:
+            print(proc.stdout[-2000:], proc.stderr[-2000:])
+            sys.exit(f"❌ {size} run failed")
+        result = json.loads(proc.stdout.strip().splitlines()[-1])
+        rows = SIZES[size]
+        print(
+            f"{size:>5}  {result['elapsed']:8.2f}s  {rows / result['elapsed']:10.0f} rows/s  "
+            f"{result['products']:6d} products  peak {result['peak_mb']:7.0f} MB"
+            + (f" (workers {result['peak_children_mb']:.0f} MB)" if args.workers > 1 else "")
+        )
+
+
+if __name__ == '__main__':
+    main()
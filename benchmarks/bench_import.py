@@ -0,0 +1,117 @@
+"""Import-time budget for the CLI and the Flask app.
+
+Each target is imported in a fresh interpreter under ``-X importtime``
+(best of --repeat runs).  The check fails when a target takes longer than
+its budget, or when a scrape-side entry point pulls in one of the heavy
+analysis or browser libraries, which should only load on the code paths
+that use them.  Cron spawns many short-lived CLI runs, so this doubles as a
+start-up regression check.
+
+Usage:
+  python benchmarks/bench_import.py
+  python benchmarks/bench_import.py --budget-ms 100 --app-budget-ms 300 --show 10
+"""
+import argparse
+import os
+import re
+import shutil
+import subprocess
+import sys
+import tempfile
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+HEAVY_MODULES = (
+    'pandas', 'numpy', 'matplotlib', 'wordcloud', 'textblob',
+    'undetected_chromedriver', 'pyarrow',
+)
+
+IMPORTTIME_LINE = re.compile(r"import time:\s+(\d+) \|\s+(\d+) \|( *)(\S+)")
+
+
+def import_profile(module):
+    """Import ``module`` in a fresh interpreter under -X importtime.
+
+    Returns (cumulative microseconds, {direct import: cumulative microseconds},
+    names of every top-level package loaded).
+    """
+    # Importing app opens its task and response-cache databases in the
+    # working directory, so run somewhere that isn't the repo
+    workdir = tempfile.mkdtemp(prefix='bench_import_')
+    env = dict(os.environ, PYTHONPATH=os.pathsep.join(filter(None, [ROOT, os.environ.get('PYTHONPATH')])))
+    try:
+        proc = subprocess.run(
+            [sys.executable, '-X', 'importtime', '-c', f"import {module}"],
+            cwd=workdir, env=env, capture_output=True, text=True
+        )
+    finally:
+        shutil.rmtree(workdir, ignore_errors=True)
+    if proc.returncode != 0:
+        sys.stderr.write(proc.stderr)
+        raise SystemExit(f"❌ import {module} failed")
+
+    # A module's own imports are listed before it, one level deeper
+    children = {}
+    seen = set()
+    for line in proc.stderr.splitlines():
+        match = IMPORTTIME_LINE.match(line)
+        if not match:
+            continue
+        _, cumulative_us, indent, name = match.groups()
+        seen.add(name.split('.')[0])
+        depth = len(indent) // 2
+        if depth == 1:
+            children[name] = int(cumulative_us)
+        elif depth == 0:
+            if name == module:
+                return int(cumulative_us), children, seen
+            children = {}
+    raise SystemExit(f"❌ no import time reported for {module}")
+
+
+def measure(module, repeat):
+    """The fastest of ``repeat`` import_profile runs"""
+    return min((import_profile(module) for _ in range(repeat)), key=lambda profile: profile[0])
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--budget-ms', type=float, default=150, help='Budget for importing ShopeeTool (default: 150)')
+    parser.add_argument('--app-budget-ms', type=float, default=500, help='Budget for importing app (default: 500)')
+    parser.add_argument('--repeat', type=int, default=5, help='Runs per target; the fastest counts (default: 5)')
+    parser.add_argument('--show', type=int, default=5, help='Slowest direct imports to list per target (default: 5)')
+    args = parser.parse_args()
+
+    targets = [
+        ('ShopeeTool', args.budget_ms, True),
+        ('app', args.app_budget_ms, True),
+        ('analysis', None, False),
+    ]
+
+    failed = False
+    for module, budget_ms, scrape_side in targets:
+        cumulative_us, children, seen = measure(module, args.repeat)
+        elapsed_ms = cumulative_us / 1000
+        status = ''
+        if budget_ms is not None:
+            over = elapsed_ms > budget_ms
+            failed |= over
+            status = f"  budget {budget_ms:.0f} ms {'❌' if over else '✅'}"
+        print(f"{module:12} {elapsed_ms:8.1f} ms{status}")
+
+        slowest = sorted(children.items(), key=lambda item: item[1], reverse=True)
+        for name, cumulative in slowest[:args.show]:
+            print(f"    {name:36} {cumulative / 1000:8.1f} ms")
+
+        if scrape_side:
+            heavy = sorted(set(HEAVY_MODULES) & seen)
+            if heavy:
+                failed = True
+                print(f"    ❌ loads {', '.join(heavy)}")
+
+    if failed:
+        sys.exit(1)
+
+
+if __name__ == '__main__':
+    main()
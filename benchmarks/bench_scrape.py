@@ -0,0 +1,155 @@
+"""End-to-end scrape throughput against the mock Shopee API.
+
+Runs scrape_search, scrape_shop and scrape_reviews_from_csv through a
+MockDriver (or the direct http transport) against a local MockShopee
+server, and reports requests/s and rows/s for each, with the time spent
+fetching, waiting on the rate limiter and writing, from the scraper's own
+metrics.  Nothing touches Shopee or a browser.
+
+The inter-request pacing is set with --rps (0, the default, runs
+unpaced to show the scraper's own overhead).  Captchas the server
+injects are "solved" after --captcha-solve seconds.
+
+Usage:
+  python benchmarks/bench_scrape.py
+  python benchmarks/bench_scrape.py --latency 0.05 --rps 20 --workers 4 --batch-pages 4
+  python benchmarks/bench_scrape.py --only reviews --transport http --captcha-rate 0.01
+"""
+import argparse
+import contextlib
+import io
+import os
+import shutil
+import sys
+import tempfile
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import metrics
+import ShopeeTool
+from mockshopee import Catalog, MockDriver, MockShopee
+from output import open_product_output
+from ratelimit import RequestBudget
+from transport import open_transport
+
+SCRAPES = ('search', 'shop', 'reviews')
+
+
+class Unpaced:
+    """A limiter that never waits"""
+
+    def acquire(self, n=1):
+        return 0.0
+
+    def record(self, response, latency):
+        pass
+
+
+def make_limiter(rps, burst):
+    return RequestBudget(rps, burst) if rps > 0 else Unpaced()
+
+
+def write_products(path, catalog, count):
+    """A product list of the first ``count`` search items, for the review scrape"""
+    with open_product_output(path) as writer:
+        for i in range(count):
+            item = catalog.item(i)
+            writer.writerow([
+                item['shopid'], item['itemid'], item['name'], item['price'] / 100000,
+                item['raw_discount'], None, None, None, item['stock'], item['historical_sold'], 'active'
+            ])
+
+
+def metric_totals():
+    """Seconds fetching, pacing and writing so far, and rows written"""
+    return (
+        metrics.FETCH_SECONDS.total(), metrics.PACING_SECONDS.total(),
+        metrics.WRITE_SECONDS.total(), metrics.ROWS_WRITTEN.total()
+    )
+
+
+def run(label, mock, scrape, verbose):
+    requests_before = sum(v for k, v in mock.stats.items() if k != 'captcha')
+    captchas_before = mock.stats['captcha']
+    before = metric_totals()
+    start = time.perf_counter()
+    if verbose:
+        scrape()
+    else:
+        with contextlib.redirect_stdout(io.StringIO()):
+            scrape()
+    elapsed = time.perf_counter() - start
+    fetch, pacing, write, rows = (a - b for a, b in zip(metric_totals(), before))
+    requests = sum(v for k, v in mock.stats.items() if k != 'captcha') - requests_before
+    captchas = mock.stats['captcha'] - captchas_before
+    print(
+        f"{label:<8} {elapsed:7.2f}s  {requests / elapsed:8.1f} req/s  {rows / elapsed:9.1f} rows/s  "
+        f"{requests:6d} req  {rows:7d} rows  {captchas:3d} captchas  "
+        f"fetch {fetch:6.2f}s  pacing {pacing:6.2f}s  write {write:5.2f}s"
+    )
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Scrape throughput against a mock Shopee API')
+    parser.add_argument('--only', default=','.join(SCRAPES), help=f"Comma-separated scrapes to run (default: {','.join(SCRAPES)})")
+    parser.add_argument('--transport', choices=['browser', 'http'], default='browser', help='Transport to scrape with (default: browser)')
+    parser.add_argument('--latency', type=float, default=0.0, help='Server-side latency per request (seconds)')
+    parser.add_argument('--captcha-rate', type=float, default=0.0, help='Share of requests answered with a captcha')
+    parser.add_argument('--captcha-solve', type=float, default=0.0, help='Seconds to "solve" each captcha (default: 0)')
+    parser.add_argument('--rps', type=float, default=0.0, help='Request budget per second; 0 runs unpaced (default: 0)')
+    parser.add_argument('--burst', type=int, default=1, help='Request budget burst (default: 1)')
+    parser.add_argument('--search-pages', type=int, default=20, help='Search pages of 60 items (default: 20)')
+    parser.add_argument('--shop-active', type=int, default=300, help='Active items in the shop (default: 300)')
+    parser.add_argument('--shop-soldout', type=int, default=150, help='Sold-out items in the shop (default: 150)')
+    parser.add_argument('--products', type=int, default=20, help='Products to scrape reviews for (default: 20)')
+    parser.add_argument('--reviews-per-item', type=int, default=500, help='Reviews per product (default: 500)')
+    parser.add_argument('--workers', type=int, default=1, help='Review scrape workers (default: 1)')
+    parser.add_argument('--batch-pages', type=int, default=1, help='Pages per round-trip (default: 1)')
+    parser.add_argument('--format', choices=['csv', 'parquet'], default='csv', help='Output format (default: csv)')
+    parser.add_argument('--verbose', action='store_true', help="Show the scrapers' own output")
+    args = parser.parse_args()
+
+    only = [name.strip() for name in args.only.split(',') if name.strip()]
+    catalog = Catalog(args.search_pages * 60, args.shop_active, args.shop_soldout, args.reviews_per_item)
+    workdir = tempfile.mkdtemp(prefix='bench_scrape_')
+    # The stand-in user solving captchas at the prompt
+    ShopeeTool.input = lambda prompt='': time.sleep(args.captcha_solve)
+
+    print(
+        f"Mock API: latency {args.latency * 1000:.0f} ms, captcha rate {args.captcha_rate:.1%}, "
+        f"transport {args.transport}, pacing {'%g req/s' % args.rps if args.rps > 0 else 'off'}"
+    )
+    with MockShopee(catalog, args.latency, args.captcha_rate) as mock:
+        driver = MockDriver(mock.base_url)
+        kwargs = {'base_url': mock.base_url} if args.transport == 'http' else {}
+        transport = open_transport(driver, args.transport, **kwargs)
+        limiter = make_limiter(args.rps, args.burst)
+        try:
+            if 'search' in only:
+                output = os.path.join(workdir, f"search.{args.format}")
+                run('search', mock, lambda: ShopeeTool.scrape_search(
+                    transport, 'mock', args.search_pages, output, limiter, args.batch_pages
+                ), args.verbose)
+            if 'shop' in only:
+                output = os.path.join(workdir, f"shop.{args.format}")
+                run('shop', mock, lambda: ShopeeTool.scrape_shop(
+                    transport, 1000, True, True, output, limiter
+                ), args.verbose)
+            if 'reviews' in only:
+                products = os.path.join(workdir, 'products.csv')
+                write_products(products, catalog, args.products)
+                output = os.path.join(workdir, f"reviews.{args.format}")
+                run('reviews', mock, lambda: ShopeeTool.scrape_reviews_from_csv(
+                    transport, products, output, args.reviews_per_item, args.workers, limiter,
+                    args.batch_pages, restart=True
+                ), args.verbose)
+        finally:
+            if hasattr(transport, 'close'):
+                transport.close()
+            driver.quit()
+            shutil.rmtree(workdir, ignore_errors=True)
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,148 @@
+"""Compare the vectorized lexicon scorer against TextBlob.
+
+Reports throughput for both backends on a synthetic corpus (or --input),
+then runs the accuracy regression check on benchmarks/data/
+sentiment_labelled.csv: hand-labelled marketplace reviews in English,
+Tagalog and Taglish, none of them used to build the synthetic corpus or
+the Tagalog word list.  On that sample:
+
+- the English-only lexicon must agree with TextBlob's class (Positive/
+  Neutral/Negative) on at least --min-agreement of the reviews, within
+  --max-mae mean absolute error, since it reimplements TextBlob's scoring;
+- the lexicon backend analyses actually use (with Tagalog) must match the
+  human labels on at least --min-accuracy of the reviews.
+
+The run exits non-zero when any of these fails.
+
+Usage:
+  python benchmarks/bench_sentiment.py --rows 20000
+  python benchmarks/bench_sentiment.py --input master_reviews_list.csv
+"""
+import argparse
+import os
+import random
+import sys
+import time
+
+import numpy as np
+import pandas as pd
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+LABELLED_SAMPLE = os.path.join(os.path.dirname(os.path.abspath(__file__)), 'data', 'sentiment_labelled.csv')
+
+from analysis import categorize_sentiment
+from sentiment import LexiconBackend, clean_series, get_backend
+
+SAMPLE_COMMENTS = [
+    "Good quality, fast delivery. Thank you seller!",
+    "Maganda po yung item, sulit sa presyo",
+    "Not good, the item arrived broken",
+    "Sobrang ganda! Will order again",
+    "Pangit ang quality, hindi worth it",
+    "ok naman, medyo matagal lang ang delivery",
+    "Very nice product, exactly as described",
+    "The size is wrong and the color is different from the picture",
+    "Legit seller, mabilis mag ship",
+    "Super bagal ng shipping, sira pa yung box",
+    "Nice! my kids love it",
+    "terrible, waste of money",
+    "Thank you po! Ang bilis dumating",
+    "not bad for the price",
+    "Hindi maganda, peke ata",
+    "Excellent product, highly recommended",
+    "",
+    "satisfied customer here, good packaging",
+    "disappointed, kulang yung parts",
+    "Solid! Matibay and malinis ang pagkakagawa",
+]
+
+
+def synthetic_comments(rows, seed=0):
+    rng = random.Random(seed)
+    return [" ".join(rng.sample(SAMPLE_COMMENTS, rng.randint(1, 2))) for _ in range(rows)]
+
+
+def timed(fn, *args):
+    start = time.perf_counter()
+    result = fn(*args)
+    return result, time.perf_counter() - start
+
+
+def classes(scores):
+    return np.array([categorize_sentiment(s) for s in scores])
+
+
+def check_labelled(path, min_agreement, max_mae, min_accuracy):
+    """Run the accuracy checks on a labelled sample; returns the failures"""
+    sample = pd.read_csv(path, encoding='utf-8-sig')
+    cleaned = clean_series(sample['Comment'].tolist())
+    labels = sample['Label'].to_numpy()
+    reference = get_backend('textblob').score_many(cleaned)
+    english = LexiconBackend(include_tagalog=False).score_many(cleaned)
+    fast = get_backend('lexicon').score_many(cleaned)
+
+    agreement = float(np.mean(classes(reference) == classes(english)))
+    mae = float(np.mean(np.abs(reference - english)))
+    accuracy = float(np.mean(classes(fast) == labels))
+    textblob_accuracy = float(np.mean(classes(reference) == labels))
+
+    print(f"\nLabelled sample:     {len(sample)} reviews ({os.path.basename(path)})")
+    print(f"Class agreement:     {agreement:12.1%}  (English lexicon vs TextBlob, min {min_agreement:.0%})")
+    print(f"Mean abs. error:     {mae:12.3f}  (max {max_mae:.3f})")
+    print(f"Label accuracy:      {accuracy:12.1%}  (lexicon, min {min_accuracy:.0%}; TextBlob {textblob_accuracy:.1%})")
+
+    failures = []
+    if agreement < min_agreement:
+        failures.append(f"agreement with TextBlob {agreement:.1%} is below {min_agreement:.0%}")
+    if mae > max_mae:
+        failures.append(f"mean abs. error {mae:.3f} is above {max_mae:.3f}")
+    if accuracy < min_accuracy:
+        failures.append(f"label accuracy {accuracy:.1%} is below {min_accuracy:.0%}")
+    return failures
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Lexicon vs TextBlob sentiment benchmark')
+    parser.add_argument('--input', '-i', help='Reviews CSV with a Comment column (default: synthetic comments)')
+    parser.add_argument('--rows', '-n', type=int, default=20000, help='Synthetic comments to score (default: 20000)')
+    parser.add_argument('--labelled', default=LABELLED_SAMPLE, help='Labelled sample for the accuracy check (Comment, Label columns)')
+    parser.add_argument('--min-agreement', type=float, default=0.99, help='Fail below this class agreement with TextBlob (default: 0.99)')
+    parser.add_argument('--max-mae', type=float, default=0.005, help='Fail above this mean absolute error vs TextBlob (default: 0.005)')
+    parser.add_argument('--min-accuracy', type=float, default=0.72, help='Fail below this accuracy against the labels (default: 0.72)')
+    args = parser.parse_args()
+
+    if args.input:
+        comments = pd.read_csv(args.input, encoding='utf-8-sig')['Comment'].tolist()
+    else:
+        comments = synthetic_comments(args.rows)
+
+    cleaned, clean_time = timed(clean_series, comments)
+    reference, textblob_time = timed(get_backend('textblob').score_many, cleaned)
+    english = LexiconBackend(include_tagalog=False).score_many(cleaned)
+    fast, lexicon_time = timed(get_backend('lexicon').score_many, cleaned)
+
+    ref_classes = classes(reference)
+    agreement = float(np.mean(ref_classes == classes(english)))
+    mae = float(np.mean(np.abs(reference - english)))
+    tagalog_changed = float(np.mean(classes(fast) != classes(english)))
+
+    n = len(comments)
+    print(f"Comments:            {n}")
+    print(f"Cleaning:            {n / clean_time:12.0f} comments/s")
+    print(f"TextBlob:            {n / textblob_time:12.0f} comments/s")
+    print(f"Lexicon:             {n / lexicon_time:12.0f} comments/s  ({textblob_time / lexicon_time:.1f}x)")
+    print(f"Class agreement:     {agreement:12.1%}  (English lexicon vs TextBlob)")
+    print(f"Mean abs. error:     {mae:12.3f}")
+    print(f"Tagalog reclassified:{tagalog_changed:12.1%}")
+
+    failures = check_labelled(args.labelled, args.min_agreement, args.max_mae, args.min_accuracy)
+    for failure in failures:
+        print(f"❌ {failure}")
+    if failures:
+        sys.exit(1)
+    print("✅ Accuracy checks passed")
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,92 @@
+"""Benchmark the direct HTTP transport against a local stand-in server.
+
+Usage:
+  python benchmarks/bench_transport.py --requests 2000 --threads 8 --latency 0.005
+"""
+import argparse
+import json
+import os
+import sys
+import threading
+import time
+import urllib.request
+from concurrent.futures import ThreadPoolExecutor
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from transport import HttpTransport, SHOPEE_BASE_URL
+
+PAYLOAD = json.dumps({
+    'error': 0,
+    'data': {'ratings': [
+        {'author_username': f'user{i}', 'rating_star': 5, 'region': 'PH',
+         'template_tags': ['Good Quality'], 'comment': 'Maganda po, fast delivery!'}
+        for i in range(50)
+    ]}
+}).encode()
+
+
+def make_handler(latency):
+    class Handler(BaseHTTPRequestHandler):
+        protocol_version = "HTTP/1.1"
+        disable_nagle_algorithm = True
+
+        def do_GET(self):
+            if latency:
+                time.sleep(latency)
+            self.send_response(200)
+            self.send_header('Content-Type', 'application/json')
+            self.send_header('Content-Length', str(len(PAYLOAD)))
+            self.end_headers()
+            self.wfile.write(PAYLOAD)
+
+        def log_message(self, *args):
+            pass
+
+    return Handler
+
+
+def urllib_fetch(url):
+    """Baseline: a fresh connection for every request"""
+    with urllib.request.urlopen(url) as resp:
+        return json.loads(resp.read())
+
+
+def run(label, fetch, url, n, threads):
+    start = time.perf_counter()
+    if threads > 1:
+        with ThreadPoolExecutor(threads) as pool:
+            list(pool.map(lambda _: fetch(url), range(n)))
+    else:
+        for _ in range(n):
+            fetch(url)
+    elapsed = time.perf_counter() - start
+    print(f"{label:<32} {n / elapsed:10.1f} req/s  ({elapsed:.2f}s)")
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Benchmark pooled HTTP transport')
+    parser.add_argument('--requests', '-n', type=int, default=1000)
+    parser.add_argument('--threads', '-t', type=int, default=8)
+    parser.add_argument('--latency', type=float, default=0.0, help='Server-side latency per request (seconds)')
+    args = parser.parse_args()
+
+    server = ThreadingHTTPServer(('127.0.0.1', 0), make_handler(args.latency))
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    base_url = f"http://127.0.0.1:{server.server_address[1]}"
+    path = "/api/v2/item/get_ratings?limit=50&offset=0&shopid=1&itemid=1"
+
+    transport = HttpTransport(base_url=base_url, pool_size=args.threads)
+    try:
+        run("urllib (new connection)", urllib_fetch, base_url + path, args.requests, 1)
+        run("HttpTransport (keep-alive)", transport.fetch_json, SHOPEE_BASE_URL + path, args.requests, 1)
+        run(f"urllib x{args.threads} threads", urllib_fetch, base_url + path, args.requests, args.threads)
+        run(f"HttpTransport x{args.threads} threads", transport.fetch_json, SHOPEE_BASE_URL + path, args.requests, args.threads)
+    finally:
+        transport.close()
+        server.shutdown()
+
+
+if __name__ == '__main__':
+    main()
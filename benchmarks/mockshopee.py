@@ -0,0 +1,269 @@
+"""Local stand-in for the Shopee API, for offline benchmarks.
+
+MockShopee serves generated payloads shaped like get_ratings,
+search_items, recommend and shop/search_items, with a fixed latency per
+request and a share of responses replaced by the captcha error.  Catalogs
+are deterministic, so every run pages through the same items and reviews.
+MockDriver stands in for the Chrome driver: execute_async_script() runs
+the scraper's fetch scripts against the mock server.
+
+Usage (serve it on its own, e.g. for the Flask app or a manual run):
+  python benchmarks/mockshopee.py --port 8765 --latency 0.05 --captcha-rate 0.01
+"""
+import argparse
+import json
+import os
+import random
+import sys
+import threading
+import time
+import urllib.parse
+from collections import Counter
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from transport import BATCH_FETCH_SCRIPT, CAPTCHA_ERROR, FETCH_SCRIPT, SHOPEE_BASE_URL, HttpTransport
+
+COMMENTS = [
+    "Good quality, fast delivery. Thank you seller!",
+    "Maganda po yung item, sulit sa presyo",
+    "Not good, the item arrived broken",
+    "Sobrang ganda! Will order again",
+    "ok naman, medyo matagal lang ang delivery",
+    "Legit seller, mabilis mag ship",
+    "The size is wrong and the color is different from the picture",
+    "Thank you po! Ang bilis dumating",
+]
+TAGS = ["Good Quality", "Fast Delivery", "Worth the Price", "Excellent Service"]
+REGIONS = ["PH", "PH", "PH", "SG"]
+
+
+class Catalog:
+    """Sizes of the generated search results, shop and review lists"""
+
+    def __init__(self, search_items=1200, shop_active=300, shop_soldout=150, reviews_per_item=500):
+        self.search_items = search_items
+        self.shop_active = shop_active
+        self.shop_soldout = shop_soldout
+        self.reviews_per_item = reviews_per_item
+
+    def item(self, i, status='normal'):
+        price = (100 + (i * 37) % 4900) * 100000
+        return {
+            'itemid': 10_000_000 + i,
+            'shopid': 1000 + i % 50,
+            'name': f"Mock product {i}",
+            'price': price,
+            'price_min': price,
+            'price_max': price + 5000000,
+            'price_before_discount': price + price // 5,
+            'raw_discount': 20,
+            'stock': (i * 7) % 500,
+            'historical_sold': (i * 13) % 10000,
+            'item_status': status,
+        }
+
+    def rating(self, item_id, n):
+        """The ``n``-th newest rating of an item
+
+        Ids and times count up from the oldest rating, so raising
+        ``reviews_per_item`` between runs adds newer ratings in front and
+        leaves the existing ones unchanged.
+        """
+        age = self.reviews_per_item - n
+        return {
+            'cmtid': item_id * 100_000 + age,
+            'ctime': 1_700_000_000 + age * 3600,
+            'author_username': f"buyer{(item_id + n) % 9973}",
+            'rating_star': 5 - (n * 7 + item_id) % 5 // 2,
+            'region': REGIONS[n % len(REGIONS)],
+            'template_tags': TAGS[:n % (len(TAGS) + 1)],
+            'comment': COMMENTS[(n + item_id) % len(COMMENTS)],
+        }
+
+
+def _page(total, offset, limit):
+    return range(min(offset, total), min(offset + limit, total))
+
+
+def search_items(catalog, query):
+    newest, limit = int(query.get('newest', 0)), int(query.get('limit', 60))
+    page = _page(catalog.search_items, newest, limit)
+    return {
+        'items': [{'item_basic': catalog.item(i)} for i in page],
+        'total_count': catalog.search_items,
+        'nomore': page.stop >= catalog.search_items,
+    }
+
+
+def recommend(catalog, query):
+    offset, limit = int(query.get('offset', 0)), int(query.get('limit', 30))
+    page = _page(catalog.shop_active, offset, limit)
+    return {'data': {'sections': [{
+        'total': catalog.shop_active,
+        'has_more': page.stop < catalog.shop_active,
+        'data': {'item': [catalog.item(i) for i in page]},
+    }]}}
+
+
+def shop_search_items(catalog, query):
+    offset, limit = int(query.get('offset', 0)), int(query.get('limit', 30))
+    page = _page(catalog.shop_soldout, offset, limit)
+    return {
+        'items': [{'item_basic': catalog.item(100_000 + i, 'sold_out')} for i in page],
+        'total_count': catalog.shop_soldout,
+        'nomore': page.stop >= catalog.shop_soldout,
+    }
+
+
+def get_ratings(catalog, query):
+    item_id = int(query.get('itemid', 0))
+    offset, limit = int(query.get('offset', 0)), int(query.get('limit', 50))
+    page = _page(catalog.reviews_per_item, offset, limit)
+    return {'data': {
+        'ratings': [catalog.rating(item_id, n) for n in page],
+        'item_rating_summary': {'rating_total': catalog.reviews_per_item},
+    }}
+
+
+ROUTES = {
+    '/api/v4/search/search_items': search_items,
+    '/api/v4/recommend/recommend': recommend,
+    '/api/v4/shop/search_items': shop_search_items,
+    '/api/v2/item/get_ratings': get_ratings,
+}
+
+
+class MockShopee:
+    """The mock API on a local port; ``stats`` counts requests by endpoint and captchas served"""
+
+    def __init__(self, catalog=None, latency=0.0, captcha_rate=0.0, seed=0, port=0):
+        self.catalog = catalog or Catalog()
+        self.latency = latency
+        self.captcha_rate = captcha_rate
+        self.stats = Counter()
+        self._rng = random.Random(seed)
+        self._lock = threading.Lock()
+        self.server = ThreadingHTTPServer(('127.0.0.1', port), self._handler())
+        self.server.daemon_threads = True
+        self._thread = None
+
+    @property
+    def base_url(self):
+        return f"http://127.0.0.1:{self.server.server_address[1]}"
+
+    def respond(self, path, query):
+        """(HTTP status, payload) for one request"""
+        route = ROUTES.get(path)
+        if route is None:
+            return 404, {'error': 'not found'}
+        with self._lock:
+            self.stats[path] += 1
+            captcha = self._rng.random() < self.captcha_rate
+            if captcha:
+                self.stats['captcha'] += 1
+        if captcha:
+            return 200, {'error': CAPTCHA_ERROR}
+        return 200, route(self.catalog, query)
+
+    def _handler(self):
+        mock = self
+
+        class Handler(BaseHTTPRequestHandler):
+            protocol_version = "HTTP/1.1"
+            disable_nagle_algorithm = True
+
+            def do_GET(self):
+                if mock.latency:
+                    time.sleep(mock.latency)
+                parts = urllib.parse.urlsplit(self.path)
+                status, payload = mock.respond(parts.path, dict(urllib.parse.parse_qsl(parts.query)))
+                body = json.dumps(payload, separators=(',', ':')).encode()
+                self.send_response(status)
+                self.send_header('Content-Type', 'application/json')
+                self.send_header('Content-Length', str(len(body)))
+                self.end_headers()
+                self.wfile.write(body)
+
+            def log_message(self, *args):
+                pass
+
+        return Handler
+
+    def start(self):
+        self._thread = threading.Thread(target=self.server.serve_forever, daemon=True)
+        self._thread.start()
+        return self
+
+    def stop(self):
+        self.server.shutdown()
+        self.server.server_close()
+
+    def __enter__(self):
+        return self.start()
+
+    def __exit__(self, *exc):
+        self.stop()
+
+
+class MockDriver:
+    """Enough of a Chrome WebDriver for the scrapers and the http transport
+
+    The in-page fetch() scripts are run with a keep-alive HttpTransport
+    pointed at the mock server, so a batch fetches its URLs concurrently
+    just as the browser would.
+    """
+
+    def __init__(self, base_url, pool_size=8):
+        self.http = HttpTransport(base_url=base_url, pool_size=pool_size)
+        self.current_url = SHOPEE_BASE_URL
+
+    def execute_async_script(self, script, *args):
+        if script == FETCH_SCRIPT:
+            return self.http.fetch_json(args[0])
+        if script == BATCH_FETCH_SCRIPT:
+            urls, concurrency = args
+            return self.http.fetch_json_batch(urls, concurrency)
+        raise NotImplementedError("MockDriver only runs the transport fetch scripts")
+
+    def execute_script(self, script, *args):
+        if 'navigator.userAgent' in script:
+            return "Mozilla/5.0 (mockshopee)"
+        return None
+
+    def get_cookies(self):
+        return [{'name': 'csrftoken', 'value': 'mock'}, {'name': 'SPC_EC', 'value': 'mock'}]
+
+    def get(self, url):
+        self.current_url = url
+
+    def quit(self):
+        self.http.close()
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Serve the mock Shopee API')
+    parser.add_argument('--port', type=int, default=8765)
+    parser.add_argument('--latency', type=float, default=0.0, help='Seconds before each response (default: 0)')
+    parser.add_argument('--captcha-rate', type=float, default=0.0, help='Share of requests answered with a captcha (default: 0)')
+    parser.add_argument('--search-items', type=int, default=1200)
+    parser.add_argument('--shop-active', type=int, default=300)
+    parser.add_argument('--shop-soldout', type=int, default=150)
+    parser.add_argument('--reviews-per-item', type=int, default=500)
+    args = parser.parse_args()
+
+    catalog = Catalog(args.search_items, args.shop_active, args.shop_soldout, args.reviews_per_item)
+    mock = MockShopee(catalog, args.latency, args.captcha_rate, port=args.port)
+    print(f"Mock Shopee API on {mock.base_url} (Ctrl+C to stop)")
+    try:
+        mock.server.serve_forever()
+    except KeyboardInterrupt:
+        pass
+    finally:
+        mock.server.server_close()
+        print(f"Requests served: {dict(mock.stats)}")
+
+
+if __name__ == '__main__':
+    main()
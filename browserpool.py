@@ -0,0 +1,212 @@
+import contextlib
+import os
+import shutil
+import threading
+import time
+
+from transport import SHOPEE_BASE_URL
+
+# ============================================================================
+# BROWSER POOL
+# ============================================================================
+#
+# A Chrome tab can only run one scrape at a time, so the Flask server keeps
+# a pool of browsers and leases one to each task for as long as it runs.
+# Chrome locks its profile directory, so only the first browser uses the
+# login profile itself.  The others are launched on demand from a copy of
+# it, taken after the user has logged in, and so share the session
+# cookies.  A browser that has died or is stuck on Shopee's verification
+# page when it comes back is quit, and a fresh one is launched in its slot
+# the next time one is needed.
+
+# Copying these would lock the clone or waste time on throwaway caches
+PROFILE_SKIP = (
+    'SingletonLock', 'SingletonSocket', 'SingletonCookie', 'lockfile',
+    'Cache', 'Code Cache', 'GPUCache', 'GrShaderCache', 'ShaderCache', 'Service Worker',
+)
+
+
+def clone_profile(source, dest):
+    """Copy a Chrome profile to ``dest``, leaving out its locks and caches"""
+    shutil.rmtree(dest, ignore_errors=True)
+    if not os.path.isdir(source):
+        os.makedirs(dest)
+        return dest
+    try:
+        shutil.copytree(source, dest, symlinks=True, ignore=shutil.ignore_patterns(*PROFILE_SKIP))
+    except shutil.Error:
+        # Files the running browser is rewriting may not copy; the session
+        # cookies are all a clone needs
+        pass
+    return dest
+
+
+def is_healthy(driver):
+    """Whether a browser still responds and isn't held up by a captcha"""
+    try:
+        url = driver.current_url
+    except Exception:
+        return False
+    return '/verify/' not in url
+
+
+def _quit(driver):
+    try:
+        driver.quit()
+    except Exception:
+        pass
+
+
+class BrowserPool:
+    """Up to ``size`` browsers, each leased to one task at a time.
+
+    ``launch(profile_dir)`` starts a browser.  start() launches the first
+    one on the login profile; lease() hands out an idle browser, launches
+    another while the pool has room, or waits for one to be returned.
+    """
+
+    def __init__(self, launch, size=2, profile_dir="shopee_session", clone_root=None):
+        self.launch = launch
+        self.size = max(1, size)
+        self.profile_dir = profile_dir
+        self.clone_root = clone_root or f"{profile_dir}_pool"
+        self.started = False
+        self._drivers = {}       # slot -> running browser
+        self._idle = []          # slots not leased
+        self._launching = set()  # slots whose browser is starting up
+        self._cond = threading.Condition()
+        # undetected_chromedriver patches its driver binary on launch, so
+        # browsers are started one at a time
+        self._launch_lock = threading.Lock()
+
+    def _profile(self, slot):
+        if slot == 0:
+            return self.profile_dir
+        return clone_profile(self.profile_dir, os.path.join(self.clone_root, f"browser_{slot}"))
+
+    def _launch(self, slot):
+        with self._launch_lock:
+            driver = self.launch(self._profile(slot))
+        if self.started:
+            driver.get(SHOPEE_BASE_URL)
+        return driver
+
+    def start(self):
+        """Launch the browser on the login profile; returns it so the user can log in"""
+        with self._cond:
+            if 0 in self._drivers:
+                return self._drivers[0]
+            self._launching.add(0)
+        try:
+            driver = self._launch(0)
+        finally:
+            with self._cond:
+                self._launching.discard(0)
+        with self._cond:
+            self._drivers[0] = driver
+            self._idle.append(0)
+            self.started = True
+            self._cond.notify()
+        return driver
+
+    def _take_slot(self, timeout, on_wait):
+        """Claim an idle slot, or a free one to launch into; returns (slot, launch)"""
+        deadline = None if timeout is None else time.monotonic() + timeout
+        waited = False
+        with self._cond:
+            while True:
+                if not self.started:
+                    raise RuntimeError("Browser pool not started")
+                if self._idle:
+                    return self._idle.pop(), False
+                free = [
+                    slot for slot in range(self.size)
+                    if slot not in self._drivers and slot not in self._launching
+                ]
+                if free:
+                    self._launching.add(free[0])
+                    return free[0], True
+                if not waited and on_wait is not None:
+                    on_wait()
+                waited = True
+                remaining = None if deadline is None else deadline - time.monotonic()
+                if remaining is not None and remaining <= 0:
+                    raise TimeoutError("No browser became free")
+                self._cond.wait(remaining)
+
+    def _replace(self, slot):
+        """Launch a browser into a claimed slot"""
+        try:
+            driver = self._launch(slot)
+        except Exception:
+            with self._cond:
+                self._launching.discard(slot)
+                self._cond.notify()
+            raise
+        with self._cond:
+            self._launching.discard(slot)
+            closed = not self.started
+            if not closed:
+                self._drivers[slot] = driver
+        if closed:
+            _quit(driver)
+            raise RuntimeError("Browser pool was closed")
+        return driver
+
+    def _drop(self, slot):
+        with self._cond:
+            driver = self._drivers.pop(slot, None)
+        if driver is not None:
+            print(f"♻️ Replacing browser {slot}")
+            _quit(driver)
+
+    @contextlib.contextmanager
+    def lease(self, timeout=None, on_wait=None):
+        """Hold a browser for the duration of a ``with`` block
+
+        ``on_wait`` is called once if every browser is busy and the task
+        has to queue.
+        """
+        slot, launch = self._take_slot(timeout, on_wait)
+        if not launch:
+            with self._cond:
+                driver = self._drivers.get(slot)
+            if driver is None or not is_healthy(driver):
+                self._drop(slot)
+                with self._cond:
+                    self._launching.add(slot)
+                launch = True
+        if launch:
+            driver = self._replace(slot)
+        try:
+            yield driver
+        finally:
+            self.release(slot, driver)
+
+    def release(self, slot, driver):
+        if not is_healthy(driver):
+            self._drop(slot)
+        with self._cond:
+            if self._drivers.get(slot) is driver:
+                self._idle.append(slot)
+            self._cond.notify()
+
+    def stats(self):
+        with self._cond:
+            return {
+                'size': self.size,
+                'running': len(self._drivers),
+                'idle': len(self._idle),
+                'leased': len(self._drivers) - len(self._idle),
+            }
+
+    def close(self):
+        """Quit every browser; tasks still holding one will fail"""
+        with self._cond:
+            drivers = list(self._drivers.values())
+            self._drivers.clear()
+            self._idle.clear()
+            self.started = False
+            self._cond.notify_all()
+        for driver in drivers:
+            _quit(driver)
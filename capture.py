@@ -0,0 +1,216 @@
+import glob
+import gzip
+import json
+import os
+import threading
+import time
+import urllib.parse
+import zlib
+from collections import Counter
+
+from responsecache import cache_key, is_cacheable
+from transport import PacedTransport, fetch_json_batch
+
+# ============================================================================
+# CAPTURE AND REPLAY
+# ============================================================================
+#
+# With capture on, every raw API response is appended to gzip JSONL
+# segments in a capture directory, one record per line: the request URL,
+# its endpoint and parameters, the time and the full response.  Only a
+# few fields of each response make it into the CSV, so a capture is what
+# lets a parsing fix or a new column be re-run without scraping again.
+#
+# Replay serves the scrapers from those records instead of Shopee: the
+# same scrape_search / scrape_shop / scrape_reviews_from_csv code parses
+# and exports them, with no network calls and no pacing.  Segments are
+# append-only and flushed after every record, so a crash loses at most the
+# line being written; replay skips a cut-off tail.
+
+CAPTURE_SEGMENT_BYTES = 64 * 1024 * 1024
+SEGMENT_PATTERN = "capture-*.jsonl.gz"
+
+
+class CaptureWriter:
+    """Appends response records to gzip segments of about ``segment_bytes`` each"""
+
+    def __init__(self, directory, segment_bytes=CAPTURE_SEGMENT_BYTES):
+        os.makedirs(directory, exist_ok=True)
+        self.directory = directory
+        self.segment_bytes = segment_bytes
+        # Sorts by start time, and never collides with another run's segments
+        self.prefix = f"capture-{time.strftime('%Y%m%d-%H%M%S')}-{os.getpid()}"
+        self.segment = 0
+        self.records = 0
+        self._raw = None
+        self._file = None
+        self._lock = threading.Lock()
+
+    def _rotate(self):
+        self._close_segment()
+        self.segment += 1
+        path = os.path.join(self.directory, f"{self.prefix}-{self.segment:04d}.jsonl.gz")
+        self._raw = open(path, "ab")
+        self._file = gzip.GzipFile(fileobj=self._raw, mode="ab")
+
+    def write(self, url, response):
+        parts = urllib.parse.urlsplit(url)
+        record = {
+            "time": time.time(),
+            "url": url,
+            "endpoint": parts.path,
+            "params": dict(urllib.parse.parse_qsl(parts.query, keep_blank_values=True)),
+            "response": response,
+        }
+        line = (json.dumps(record, ensure_ascii=False, separators=(",", ":")) + "\n").encode("utf-8")
+        with self._lock:
+            if self._file is None or self._raw.tell() >= self.segment_bytes:
+                self._rotate()
+            self._file.write(line)
+            # A sync flush: everything written so far can be decompressed
+            self._file.flush()
+            self.records += 1
+
+    def _close_segment(self):
+        if self._file is not None:
+            self._file.close()
+            self._raw.close()
+            self._file = self._raw = None
+
+    def close(self):
+        with self._lock:
+            self._close_segment()
+
+
+class CaptureTransport:
+    """Passes requests on and records every response it gets back"""
+
+    def __init__(self, inner, writer):
+        self.inner = inner
+        self.writer = writer
+
+    def paced(self, limiter):
+        """The same capture over a paced inner transport"""
+        if hasattr(self.inner, 'paced'):
+            return CaptureTransport(self.inner.paced(limiter), self.writer)
+        return CaptureTransport(PacedTransport(self.inner, limiter), self.writer)
+
+    def fetch_json(self, url):
+        response = self.inner.fetch_json(url)
+        self.writer.write(url, response)
+        return response
+
+    def fetch_json_batch(self, urls, concurrency=4):
+        responses = fetch_json_batch(self.inner, urls, concurrency)
+        for url, response in zip(urls, responses):
+            self.writer.write(url, response)
+        return responses
+
+
+def capture_segments(directory):
+    """Segment paths in the order they were written"""
+    return sorted(glob.glob(os.path.join(directory, SEGMENT_PATTERN)))
+
+
+def iter_segment_lines(path):
+    """(offset, line) of every complete record line of a segment; offsets
+    are in the decompressed stream"""
+    offset = 0
+    try:
+        with gzip.open(path, "rb") as f:
+            for line in f:
+                if line.endswith(b"\n"):
+                    yield offset, line
+                offset += len(line)
+    except (EOFError, OSError, zlib.error):
+        # Cut off mid-write; the records before it are intact
+        return
+
+
+def iter_capture_lines(directory):
+    """Every complete record line of every segment, oldest first"""
+    for path in capture_segments(directory):
+        for _, line in iter_segment_lines(path):
+            yield line
+
+
+def iter_captures(directory):
+    """Decoded capture records, oldest first"""
+    for line in iter_capture_lines(directory):
+        try:
+            yield json.loads(line)
+        except ValueError:
+            continue
+
+
+class ReplayTransport:
+    """Answers requests from a capture directory, never the network
+
+    For each URL (normalized as in the response cache) the newest clean
+    response is served.  Errors, captchas included, are never replayed: a
+    URL with no clean capture gets a "not in capture" error, which ends
+    that scrape loop like an empty page would, rather than sending the
+    scraper to a captcha prompt with no browser behind it.
+
+    Only where each record is kept in memory; its line is read back from
+    the segment when it is served.  Segments are gzip streams, so reading
+    is fastest in capture order, which is the order a re-run asks in.
+    """
+
+    def __init__(self, directory):
+        self.directory = directory
+        self.stats = Counter()
+        # key -> (segment path, offset of its record line)
+        self._index = {}
+        self._segments = {}
+        self._lock = threading.Lock()
+        for path in capture_segments(directory):
+            for offset, line in iter_segment_lines(path):
+                try:
+                    record = json.loads(line)
+                except ValueError:
+                    continue
+                self.stats["records"] += 1
+                if not is_cacheable(record["response"]):
+                    self.stats["skipped"] += 1
+                    continue
+                self._index[cache_key(record["url"])] = (path, offset)
+
+    def __len__(self):
+        return len(self._index)
+
+    def paced(self, limiter):
+        """Replay is never paced"""
+        return self
+
+    def fetch_json(self, url):
+        entry = self._index.get(cache_key(url))
+        if entry is None:
+            self.stats["missing"] += 1
+            return {"error": "Not in capture", "replay_missing": True}
+        self.stats["replayed"] += 1
+        return json.loads(self._read(*entry))["response"]
+
+    def fetch_json_batch(self, urls, concurrency=4):
+        return [self.fetch_json(url) for url in urls]
+
+    def _read(self, path, offset):
+        with self._lock:
+            segment = self._segments.get(path)
+            if segment is None:
+                segment = self._segments[path] = gzip.open(path, "rb")
+            segment.seek(offset)
+            return segment.readline()
+
+    def close(self):
+        with self._lock:
+            for segment in self._segments.values():
+                segment.close()
+            self._segments.clear()
+
+    def summary(self):
+        return (
+            f"{self.stats['replayed']} responses replayed, {self.stats['missing']} not captured "
+            f"({len(self._index)} URLs in {self.stats['records']} records, "
+            f"{self.stats['skipped']} error responses skipped)"
+        )
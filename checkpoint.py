@@ -0,0 +1,173 @@
+import os
+import sqlite3
+
+from output import output_size, truncate_output
+
+# ============================================================================
+# PROGRESS JOURNAL
+# ============================================================================
+#
+# A review scrape records, after every page it writes, the next offset for
+# that product and the size of the output at that point (bytes of a CSV,
+# sealed parts of a Parquet dataset).  The output is made durable before the
+# journal is committed, so after a crash the journal never claims rows that
+# are not on disk; anything past the recorded size is a partially written
+# page and is cut off before resuming.
+#
+# Incremental syncs also keep a high-water mark per product: the
+# (ctime, rating id) of the newest review in the output.  Marks are
+# committed in the same transaction as the page that wrote those reviews
+# and outlive the run, so the journal file stays behind once any exist.
+
+
+def journal_path(output_file):
+    """Where the progress journal for an output file lives"""
+    return f"{output_file}.progress.sqlite"
+
+
+class ProgressJournal:
+    """Durable per-product progress of a review scrape, keyed by (shop_id, item_id)"""
+
+    def __init__(self, path):
+        self.path = path
+        self.conn = sqlite3.connect(path)
+        self.conn.execute("PRAGMA journal_mode=WAL")
+        self.conn.execute("PRAGMA synchronous=FULL")
+        self.conn.executescript("""
+            CREATE TABLE IF NOT EXISTS progress (
+                shop_id TEXT NOT NULL,
+                item_id TEXT NOT NULL,
+                next_offset INTEGER NOT NULL DEFAULT 0,
+                reviews INTEGER NOT NULL DEFAULT 0,
+                done INTEGER NOT NULL DEFAULT 0,
+                PRIMARY KEY (shop_id, item_id)
+            );
+            CREATE TABLE IF NOT EXISTS meta (
+                key TEXT PRIMARY KEY,
+                value TEXT
+            );
+            CREATE TABLE IF NOT EXISTS high_water (
+                shop_id TEXT NOT NULL,
+                item_id TEXT NOT NULL,
+                ctime INTEGER NOT NULL,
+                rating_id INTEGER NOT NULL,
+                PRIMARY KEY (shop_id, item_id)
+            );
+        """)
+        self.conn.commit()
+
+    def get(self, shop_id, item_id):
+        """Return (next_offset, reviews_so_far, done) for a product"""
+        row = self.conn.execute(
+            "SELECT next_offset, reviews, done FROM progress WHERE shop_id = ? AND item_id = ?",
+            (str(shop_id), str(item_id))
+        ).fetchone()
+        if row is None:
+            return 0, 0, False
+        return row[0], row[1], bool(row[2])
+
+    def has_progress(self):
+        return self.conn.execute("SELECT 1 FROM progress LIMIT 1").fetchone() is not None
+
+    def output_size(self):
+        """Size of the output file as of the last committed page, if any"""
+        row = self.conn.execute("SELECT value FROM meta WHERE key = 'output_size'").fetchone()
+        return int(row[0]) if row else None
+
+    def high_water(self, shop_id, item_id):
+        """The (ctime, rating_id) mark of the newest review saved for a product, or None"""
+        row = self.conn.execute(
+            "SELECT ctime, rating_id FROM high_water WHERE shop_id = ? AND item_id = ?",
+            (str(shop_id), str(item_id))
+        ).fetchone()
+        return tuple(row) if row else None
+
+    def has_marks(self):
+        return self.conn.execute("SELECT 1 FROM high_water LIMIT 1").fetchone() is not None
+
+    def clear_marks(self):
+        with self.conn:
+            self.conn.execute("DELETE FROM high_water")
+
+    def record_pages(self, entries, output_size, marks=()):
+        """Record several (shop_id, item_id, next_offset, reviews, done) entries in one commit
+
+        ``marks`` are (shop_id, item_id, (ctime, rating_id)) high-water
+        marks to move forward in the same commit.
+        """
+        with self.conn:
+            self.conn.executemany(
+                "INSERT OR REPLACE INTO high_water (shop_id, item_id, ctime, rating_id) "
+                "VALUES (?, ?, ?, ?)",
+                [(str(shop_id), str(item_id), ctime, rating_id)
+                 for shop_id, item_id, (ctime, rating_id) in marks]
+            )
+            self.conn.executemany(
+                "INSERT INTO progress (shop_id, item_id, next_offset, reviews, done) "
+                "VALUES (?, ?, ?, ?, ?) "
+                "ON CONFLICT (shop_id, item_id) DO UPDATE SET "
+                "next_offset = excluded.next_offset, reviews = excluded.reviews, done = excluded.done",
+                [(str(shop_id), str(item_id), next_offset, reviews, int(done))
+                 for shop_id, item_id, next_offset, reviews, done in entries]
+            )
+            self.conn.execute(
+                "INSERT OR REPLACE INTO meta (key, value) VALUES ('output_size', ?)",
+                (str(output_size),)
+            )
+
+    def reset(self):
+        with self.conn:
+            self.conn.execute("DELETE FROM progress")
+            self.conn.execute("DELETE FROM meta")
+
+    def close(self):
+        self.conn.close()
+
+    def finish(self):
+        """Drop the run's progress once it has finished, keeping any high-water marks"""
+        if not self.has_marks():
+            self.discard()
+            return
+        self.reset()
+        self.close()
+
+    def discard(self):
+        """Close and delete the journal once a run has finished"""
+        self.close()
+        for suffix in ("", "-wal", "-shm"):
+            try:
+                os.remove(self.path + suffix)
+            except FileNotFoundError:
+                pass
+
+
+def open_journal(output_file, restart=False):
+    """Open the journal for an output file and line the file up with it.
+
+    Output written after the last committed page is truncated away.  If the
+    output is shorter than the journal expects (it was replaced or edited),
+    the journal no longer describes it and is reset.  ``restart`` drops an
+    unfinished run's progress but keeps high-water marks.
+    """
+    journal = ProgressJournal(journal_path(output_file))
+    if journal.has_marks() and not output_size(output_file):
+        print("⚠️ Output file is gone, forgetting the reviews it held")
+        journal.clear_marks()
+    if restart:
+        journal.reset()
+        return journal
+
+    committed = journal.output_size()
+    if committed is None:
+        return journal
+
+    actual = output_size(output_file)
+    if actual > committed:
+        unit = "parts" if os.path.isdir(output_file) else "bytes"
+        print(f"↩️ Dropping {actual - committed} {unit} written after the last checkpoint")
+        truncate_output(output_file, committed)
+    elif actual < committed:
+        print("⚠️ Output file doesn't match the progress journal, starting over")
+        journal.reset()
+        journal.clear_marks()
+    return journal
@@ -0,0 +1,259 @@
+import bisect
+import contextlib
+import threading
+import urllib.parse
+from collections import Counter as _Tally
+
+# ============================================================================
+# METRICS
+# ============================================================================
+#
+# Counters, gauges and histograms kept in memory and rendered in the
+# Prometheus text format by the API server's /api/metrics endpoint.  The
+# scraper records where its time goes: each Shopee request's latency and
+# outcome by endpoint (see PacedTransport), time spent waiting on the rate
+# controller, time spent writing output, and captcha prompts.  Recording
+# is a dict update under a lock, cheap enough to leave on for CLI runs.
+
+# Upper bounds, in seconds, of the fetch latency buckets
+LATENCY_BUCKETS = (0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0, 30.0)
+
+# Label values for the Shopee API paths
+ENDPOINT_NAMES = {
+    "/api/v4/search/search_items": "search",
+    "/api/v4/recommend/recommend": "shop_items",
+    "/api/v4/shop/search_items": "soldout_items",
+    "/api/v2/item/get_ratings": "ratings",
+}
+CAPTCHA_ERROR = 90309999
+THROTTLE_HTTP_STATUSES = {429, 503}
+
+REGISTRY = []
+
+
+def _escape(value):
+    return str(value).replace("\\", "\\\\").replace("\n", "\\n").replace('"', '\\"')
+
+
+def _format_labels(names, values, extra=()):
+    pairs = list(zip(names, values)) + list(extra)
+    if not pairs:
+        return ""
+    return "{" + ",".join(f'{name}="{_escape(value)}"' for name, value in pairs) + "}"
+
+
+def _format_value(value):
+    if value == float("inf"):
+        return "+Inf"
+    if float(value).is_integer():
+        return str(int(value))
+    return repr(float(value))
+
+
+class _Metric:
+    kind = None
+
+    def __init__(self, name, help, labelnames=(), registry=REGISTRY):
+        self.name = name
+        self.help = help
+        self.labelnames = tuple(labelnames)
+        self._values = {}
+        self._lock = threading.Lock()
+        if registry is not None:
+            registry.append(self)
+
+    def _key(self, labels):
+        if set(labels) != set(self.labelnames):
+            raise ValueError(f"{self.name} takes labels {self.labelnames}, got {tuple(labels)}")
+        return tuple(str(labels[name]) for name in self.labelnames)
+
+    def clear(self):
+        with self._lock:
+            self._values.clear()
+
+    def render(self):
+        lines = [f"# HELP {self.name} {self.help}", f"# TYPE {self.name} {self.kind}"]
+        with self._lock:
+            items = sorted(self._values.items())
+        for key, value in items:
+            lines.extend(self._lines(key, value))
+        return "\n".join(lines)
+
+    def _lines(self, key, value):
+        yield f"{self.name}{_format_labels(self.labelnames, key)} {_format_value(value)}"
+
+
+class Counter(_Metric):
+    """A total that only goes up"""
+
+    kind = "counter"
+
+    def inc(self, amount=1, **labels):
+        key = self._key(labels)
+        with self._lock:
+            self._values[key] = self._values.get(key, 0) + amount
+
+    def value(self, **labels):
+        with self._lock:
+            return self._values.get(self._key(labels), 0)
+
+    def total(self):
+        """Sum over every label set"""
+        with self._lock:
+            return sum(self._values.values())
+
+
+class Gauge(_Metric):
+    """A value that is set to the current state, such as a queue depth"""
+
+    kind = "gauge"
+
+    def set(self, value, **labels):
+        key = self._key(labels)
+        with self._lock:
+            self._values[key] = value
+
+    def value(self, **labels):
+        with self._lock:
+            return self._values.get(self._key(labels), 0)
+
+
+class Histogram(_Metric):
+    """Counts of observations at or below each bucket bound, with their sum"""
+
+    kind = "histogram"
+
+    def __init__(self, name, help, labelnames=(), buckets=LATENCY_BUCKETS, registry=REGISTRY):
+        super().__init__(name, help, labelnames, registry)
+        self.buckets = tuple(sorted(buckets))
+
+    def observe(self, value, **labels):
+        key = self._key(labels)
+        i = bisect.bisect_left(self.buckets, value)
+        with self._lock:
+            state = self._values.get(key)
+            if state is None:
+                # One count per bucket plus +Inf, then the sum
+                state = self._values[key] = [0] * (len(self.buckets) + 1) + [0.0]
+            state[i] += 1
+            state[-1] += value
+
+    def count(self, **labels):
+        with self._lock:
+            state = self._values.get(self._key(labels))
+            return sum(state[:-1]) if state else 0
+
+    def total(self):
+        """Sum of every observation, over every label set"""
+        with self._lock:
+            return sum(state[-1] for state in self._values.values())
+
+    def _lines(self, key, state):
+        cumulative = 0
+        for bound, count in zip(self.buckets + (float("inf"),), state[:-1]):
+            cumulative += count
+            labels = _format_labels(self.labelnames, key, [("le", _format_value(bound))])
+            yield f"{self.name}_bucket{labels} {cumulative}"
+        labels = _format_labels(self.labelnames, key)
+        yield f"{self.name}_sum{labels} {_format_value(state[-1])}"
+        yield f"{self.name}_count{labels} {cumulative}"
+
+
+def render(registry=REGISTRY):
+    """Every metric in the Prometheus text exposition format"""
+    return "\n".join(metric.render() for metric in registry) + "\n"
+
+
+# ============================================================================
+# SCRAPER METRICS
+# ============================================================================
+
+FETCH_SECONDS = Histogram(
+    "shopee_fetch_seconds", "Latency of Shopee API requests", ["endpoint"]
+)
+FETCHES = Counter(
+    "shopee_fetches_total", "Shopee API requests by outcome (ok, captcha, throttled, error)",
+    ["endpoint", "outcome"]
+)
+PACING_SECONDS = Counter(
+    "shopee_pacing_seconds_total", "Time spent waiting on the rate controller before requests"
+)
+CAPTCHA_PROMPTS = Counter(
+    "shopee_captcha_prompts_total", "Times the user was asked to solve a captcha"
+)
+CAPTCHA_SECONDS = Counter(
+    "shopee_captcha_seconds_total", "Time spent waiting for captchas to be solved"
+)
+ROWS_WRITTEN = Counter(
+    "shopee_rows_written_total", "Rows written to outputs", ["kind"]
+)
+WRITE_SECONDS = Counter(
+    "shopee_write_seconds_total", "Time spent turning pages into rows and writing them", ["kind"]
+)
+
+# Rows written per task, for the API server's rows/sec gauge
+_task_rows = _Tally()
+_task_rows_lock = threading.Lock()
+_current = threading.local()
+
+
+def endpoint_name(url):
+    path = urllib.parse.urlsplit(url).path
+    return ENDPOINT_NAMES.get(path, path)
+
+
+def fetch_outcome(response):
+    if not isinstance(response, dict):
+        return "error"
+    if response.get("error") == CAPTCHA_ERROR:
+        return "captcha"
+    if response.get("http_status") in THROTTLE_HTTP_STATUSES:
+        return "throttled"
+    if response.get("error") or response.get("transport_error"):
+        return "error"
+    return "ok"
+
+
+def record_fetch(url, response, seconds):
+    endpoint = endpoint_name(url)
+    FETCH_SECONDS.observe(seconds, endpoint=endpoint)
+    FETCHES.inc(endpoint=endpoint, outcome=fetch_outcome(response))
+
+
+def record_pacing(seconds):
+    if seconds:
+        PACING_SECONDS.inc(seconds)
+
+
+def record_captcha(seconds):
+    CAPTCHA_PROMPTS.inc()
+    CAPTCHA_SECONDS.inc(seconds)
+
+
+def record_write(kind, rows, seconds):
+    ROWS_WRITTEN.inc(rows, kind=kind)
+    WRITE_SECONDS.inc(seconds, kind=kind)
+    task_id = getattr(_current, "task_id", None)
+    if task_id is not None and rows:
+        with _task_rows_lock:
+            _task_rows[task_id] += rows
+
+
+@contextlib.contextmanager
+def task_context(task_id):
+    """Attribute rows written on this thread to ``task_id``"""
+    _current.task_id = task_id
+    try:
+        yield
+    finally:
+        _current.task_id = None
+
+
+def task_rows(task_id):
+    with _task_rows_lock:
+        return _task_rows.get(task_id, 0)
+
+
+def forget_task(task_id):
+    with _task_rows_lock:
+        _task_rows.pop(task_id, None)
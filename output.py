@@ -0,0 +1,580 @@
+import csv
+import io
+import os
+import re
+import struct
+from array import array
+
+# ============================================================================
+# OUTPUT FORMATS
+# ============================================================================
+#
+# Scrape modes write rows through an output object with the csv.writer
+# interface (``writerow``/``writerows``), so the same loop can produce CSV
+# or Parquet.  A path ending in ``.parquet`` selects Parquet.
+#
+# Parquet output carries a typed schema: IDs and counts are integers,
+# repeated strings (product names, item status, region) are dictionary
+# encoded, and prices are stored as integer centavos instead of float pesos.
+# pyarrow is only imported when Parquet is actually used.
+
+PARQUET_EXTENSION = ".parquet"
+
+# Column name -> type tag; see _arrow_type and _converter
+PRODUCT_COLUMNS = [
+    ("Shop ID", "int64"),
+    ("Item ID", "int64"),
+    ("Product Name", "category"),
+    ("Price (Current)", "price"),
+    ("Discount %", "int32"),
+    ("Price Min", "price"),
+    ("Price Max", "price"),
+    ("Price Before Discount", "price"),
+    ("Stock", "int64"),
+    ("Sold", "int64"),
+    ("Item Status", "category"),
+]
+
+REVIEW_COLUMNS = [
+    ("Product Name", "category"),
+    ("Username", "string"),
+    ("Rating", "int8"),
+    ("Region", "category"),
+    ("Tags", "string"),
+    ("Comment", "string"),
+]
+
+
+def is_parquet(path):
+    return str(path).lower().endswith(PARQUET_EXTENSION)
+
+
+def _to_int(value):
+    if value is None or value == "":
+        return None
+    if isinstance(value, str):
+        match = re.search(r"-?\d+(\.\d+)?", value)
+        if not match:
+            return None
+        value = match.group()
+    try:
+        return int(round(float(value)))
+    except (TypeError, ValueError):
+        return None
+
+
+def _to_centavos(value):
+    """Pesos (as produced by clean_price) to integer centavos"""
+    if value is None or value == "":
+        return None
+    return int(round(float(value) * 100))
+
+
+def _to_str(value):
+    if value is None:
+        return None
+    return str(value)
+
+
+def _converter(tag):
+    if tag == "price":
+        return _to_centavos
+    if tag.startswith("int"):
+        return _to_int
+    return _to_str
+
+
+def _arrow_type(tag):
+    import pyarrow as pa
+    if tag == "price":
+        return pa.int64()
+    if tag == "category":
+        return pa.dictionary(pa.int32(), pa.string())
+    if tag == "string":
+        return pa.string()
+    return getattr(pa, tag)()
+
+
+def arrow_schema(columns):
+    """Arrow schema for a list of (name, type tag) columns"""
+    import pyarrow as pa
+    fields = []
+    for name, tag in columns:
+        metadata = {"unit": "centavos"} if tag == "price" else None
+        fields.append(pa.field(name, _arrow_type(tag), metadata=metadata))
+    return pa.schema(fields)
+
+
+def rows_to_table(rows, columns, schema):
+    """Convert buffered csv-style rows into an Arrow table of ``schema``"""
+    import pyarrow as pa
+    arrays = []
+    for i, (name, tag) in enumerate(columns):
+        convert = _converter(tag)
+        values = [convert(row[i]) for row in rows]
+        if tag == "category":
+            arrays.append(pa.array(values, type=pa.string()).dictionary_encode())
+        else:
+            arrays.append(pa.array(values, type=schema.field(name).type))
+    return pa.Table.from_arrays(arrays, schema=schema)
+
+
+# ============================================================================
+# WRITERS
+# ============================================================================
+#
+# Listeners hear about every output a writer closes, so an index of outputs
+# can be kept up to date without scanning the files afterwards.
+
+_output_listeners = []
+
+
+def add_output_listener(callback):
+    """Call ``callback(path, rows, appended)`` each time a writer is closed
+
+    ``rows`` is the number of rows the writer made durable and ``appended``
+    tells whether they were added to rows already in the output.
+    """
+    _output_listeners.append(callback)
+
+
+def _notify_closed(path, rows, appended):
+    for callback in _output_listeners:
+        try:
+            callback(path, rows, appended)
+        except Exception as e:
+            print(f"⚠️ Output listener failed for {path}: {e}")
+
+
+class CsvOutput:
+    """utf-8-sig CSV written row at a time; the header goes on new files only
+
+    A row index (see ROW INDEX below) is kept alongside, so pages of the
+    file can be read without scanning it.
+    """
+
+    def __init__(self, path, columns, append=False):
+        self.path = path
+        self.append = append
+        exists = append and os.path.isfile(path) and os.path.getsize(path) > 0
+        if exists:
+            # Also trims entries for rows cut off by a resume
+            offsets, self.total_rows = scan_row_index(path, read_row_index(path))
+        else:
+            offsets, self.total_rows = array('Q'), 0
+        write_row_index(path, offsets)
+        self.index_file = open(row_index_path(path), "ab")
+        self.file = open(path, "a" if append else "w", newline='', encoding='utf-8-sig')
+        self.writer = csv.writer(self.file)
+        if not exists:
+            self.writer.writerow([name for name, _ in columns])
+        self.rows = 0
+        self.durable_rows = 0
+
+    def writerow(self, row):
+        if self.total_rows % ROW_INDEX_STRIDE == 0:
+            # tell() flushes, so it is only asked once per stride
+            self.index_file.write(struct.pack("<Q", self.file.tell()))
+        self.writer.writerow(row)
+        self.rows += 1
+        self.total_rows += 1
+
+    def writerows(self, rows):
+        for row in rows:
+            self.writerow(row)
+
+    def checkpoint(self, force=False):
+        """Make everything written so far durable; returns the file size"""
+        self.file.flush()
+        os.fsync(self.file.fileno())
+        self.durable_rows = self.rows
+        self.index_file.flush()
+        return os.fstat(self.file.fileno()).st_size
+
+    def close(self, rows=None):
+        self.file.close()
+        self.index_file.close()
+        _notify_closed(self.path, self.rows if rows is None else rows, self.append)
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc, tb):
+        # After a failure a resumed run cuts the file back to its last
+        # checkpoint, so only rows up to there are reported
+        self.close(None if exc_type is None or not self.append else self.durable_rows)
+
+
+class ParquetOutput:
+    """A single Parquet file, written one row group per ``row_group_size`` rows"""
+
+    def __init__(self, path, columns, row_group_size=50000):
+        import pyarrow.parquet as pq
+        self.path = path
+        self.columns = columns
+        self.schema = arrow_schema(columns)
+        self.row_group_size = row_group_size
+        self.rows = []
+        self.written = 0
+        self.writer = pq.ParquetWriter(path, self.schema, compression="zstd")
+
+    def writerow(self, row):
+        self.rows.append(row)
+        self.written += 1
+        if len(self.rows) >= self.row_group_size:
+            self._flush()
+
+    def writerows(self, rows):
+        for row in rows:
+            self.writerow(row)
+
+    def _flush(self):
+        if self.rows:
+            self.writer.write_table(rows_to_table(self.rows, self.columns, self.schema))
+            self.rows = []
+
+    def close(self):
+        self._flush()
+        self.writer.close()
+        _notify_closed(self.path, self.written, False)
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
+
+
+class ParquetDatasetOutput:
+    """A directory of Parquet part files that only ever grows by whole parts.
+
+    Rows are buffered and sealed into ``part-NNNNN.parquet`` by checkpoint()
+    once ``rows_per_part`` have accumulated (or when forced).  A part is
+    written under a temporary name, fsync'd and renamed into place, so the
+    number of parts is a durable resume position just like a CSV's size.
+    """
+
+    def __init__(self, path, columns, rows_per_part=50000):
+        self.path = path
+        self.columns = columns
+        self.schema = arrow_schema(columns)
+        self.rows_per_part = rows_per_part
+        self.rows = []
+        self.sealed_rows = 0
+        os.makedirs(path, exist_ok=True)
+        for name in os.listdir(path):
+            if name.endswith(".tmp"):
+                os.remove(os.path.join(path, name))
+        self.parts = len(dataset_parts(path))
+
+    def writerow(self, row):
+        self.rows.append(row)
+
+    def writerows(self, rows):
+        self.rows.extend(rows)
+
+    def checkpoint(self, force=False):
+        """Seal buffered rows into a new part once enough have built up
+
+        Returns the part count when everything written so far is durable,
+        or None while rows are still buffered.
+        """
+        import pyarrow.parquet as pq
+        if not self.rows:
+            return self.parts
+        if len(self.rows) < self.rows_per_part and not force:
+            return None
+
+        name = f"part-{self.parts:05d}{PARQUET_EXTENSION}"
+        part_path = os.path.join(self.path, name)
+        # Dot-prefixed so dataset readers skip a part that is still being written
+        tmp_path = os.path.join(self.path, f".{name}.tmp")
+        table = rows_to_table(self.rows, self.columns, self.schema)
+        with open(tmp_path, "wb") as f:
+            pq.write_table(table, f, compression="zstd")
+            f.flush()
+            os.fsync(f.fileno())
+        os.replace(tmp_path, part_path)
+        _fsync_dir(self.path)
+
+        self.parts += 1
+        self.sealed_rows += len(self.rows)
+        self.rows = []
+        return self.parts
+
+    def close(self):
+        self.checkpoint(force=True)
+        _notify_closed(self.path, self.sealed_rows, True)
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc, tb):
+        # After a failure the buffered rows are not journaled; sealing them
+        # would duplicate them when the run resumes
+        if exc_type is None:
+            self.close()
+        else:
+            _notify_closed(self.path, self.sealed_rows, True)
+
+
+def _fsync_dir(path):
+    try:
+        fd = os.open(path, os.O_RDONLY)
+    except OSError:
+        return
+    try:
+        os.fsync(fd)
+    except OSError:
+        pass
+    finally:
+        os.close(fd)
+
+
+def dataset_parts(path):
+    """Sealed part files of a Parquet dataset directory, in order"""
+    if not os.path.isdir(path):
+        return []
+    return sorted(
+        os.path.join(path, name) for name in os.listdir(path)
+        if name.startswith("part-") and name.endswith(PARQUET_EXTENSION)
+    )
+
+
+def open_product_output(path):
+    """Writer for search/shop results"""
+    if is_parquet(path):
+        return ParquetOutput(path, PRODUCT_COLUMNS)
+    return CsvOutput(path, PRODUCT_COLUMNS)
+
+
+def open_review_output(path):
+    """Appending, checkpointable writer for scraped reviews"""
+    if is_parquet(path):
+        return ParquetDatasetOutput(path, REVIEW_COLUMNS)
+    return CsvOutput(path, REVIEW_COLUMNS, append=True)
+
+
+# ============================================================================
+# RESUME POSITIONS
+# ============================================================================
+#
+# The progress journal records how much output existed at each checkpoint:
+# bytes for a CSV, sealed parts for a Parquet dataset.
+
+def output_size(path):
+    if os.path.isdir(path):
+        return len(dataset_parts(path))
+    if os.path.exists(path):
+        return os.path.getsize(path)
+    return 0
+
+
+def truncate_output(path, size):
+    """Cut the output back to a checkpointed size"""
+    if os.path.isdir(path):
+        for part in dataset_parts(path)[size:]:
+            os.remove(part)
+        for name in os.listdir(path):
+            if name.endswith(".tmp"):
+                os.remove(os.path.join(path, name))
+        _fsync_dir(path)
+        return
+    with open(path, "r+b") as f:
+        f.truncate(size)
+        os.fsync(f.fileno())
+
+
+# ============================================================================
+# ROW INDEX
+# ============================================================================
+#
+# A CSV's ``.rowidx`` sidecar holds the byte offset of every
+# ROW_INDEX_STRIDE-th data row, so a page deep into a large file is one
+# seek and at most a stride of rows away.  CsvOutput appends to it as rows
+# are written.  An index that runs past the end of its file (after a
+# resume cut the file back) is trimmed, and rows past its last entry are
+# found by scanning from there, so a stale index only costs a short scan.
+
+ROW_INDEX_STRIDE = 1000
+ROW_INDEX_SUFFIX = ".rowidx"
+
+
+def row_index_path(path):
+    return f"{path}{ROW_INDEX_SUFFIX}"
+
+
+def read_row_index(path):
+    """Offsets stored in a CSV's row index, or None if it has none"""
+    try:
+        with open(row_index_path(path), "rb") as f:
+            data = f.read()
+    except FileNotFoundError:
+        return None
+    offsets = array('Q')
+    offsets.frombytes(data[:len(data) - len(data) % 8])
+    if array('Q', [1]).tobytes() != struct.pack("<Q", 1):
+        offsets.byteswap()
+    return offsets
+
+
+def write_row_index(path, offsets):
+    """Replace a CSV's row index"""
+    index_path = row_index_path(path)
+    tmp_path = f"{index_path}.tmp"
+    with open(tmp_path, "wb") as f:
+        f.write(struct.pack(f"<{len(offsets)}Q", *offsets))
+    os.replace(tmp_path, index_path)
+
+
+def scan_row_index(path, offsets=None):
+    """Bring a row index up to date with its file; returns (offsets, data rows)
+
+    Rows are found in binary by newlines outside quotes, the way csv
+    writes them.
+    """
+    size = os.path.getsize(path)
+    offsets = array('Q', (o for o in offsets or () if o < size))
+    if offsets:
+        start = offsets.pop()
+        row = len(offsets) * ROW_INDEX_STRIDE
+    else:
+        start = 0
+        row = -1  # the header
+    with open(path, "rb") as f:
+        f.seek(start)
+        position = start
+        quotes = 0
+        for line in f:
+            if quotes == 0 and row >= 0 and row % ROW_INDEX_STRIDE == 0:
+                offsets.append(position)
+            quotes += line.count(b'"')
+            position += len(line)
+            if quotes % 2 == 0:
+                quotes = 0
+                row += 1
+        if quotes:
+            row += 1  # a final row cut off inside a quoted field
+    return offsets, max(row, 0)
+
+
+def read_csv_page(path, start, count):
+    """Rows ``start`` to ``start + count`` of a CSV; returns (columns, rows, total rows)
+
+    The row index is built on first use for files written some other way.
+    """
+    stored = read_row_index(path)
+    offsets, total = scan_row_index(path, stored)
+    if stored is None:
+        write_row_index(path, offsets)
+
+    with open(path, "r", newline='', encoding='utf-8-sig') as f:
+        columns = next(csv.reader(f), [])
+    if start >= total:
+        return columns, [], total
+
+    entry = start // ROW_INDEX_STRIDE
+    with open(path, "rb") as raw:
+        raw.seek(offsets[entry])
+        reader = csv.reader(io.TextIOWrapper(raw, encoding='utf-8', newline=''))
+        rows = []
+        for i, row in enumerate(reader, start=entry * ROW_INDEX_STRIDE):
+            if i >= start + count:
+                break
+            if i >= start:
+                rows.append(row)
+    return columns, rows, total
+
+
+def read_parquet_page(path, start, count):
+    """Rows ``start`` to ``start + count`` of a Parquet file or dataset; returns (columns, rows, total rows)
+
+    Only the row groups holding the page are read.  Prices come back in
+    pesos, as they appear in a CSV.
+    """
+    import pyarrow.parquet as pq
+    files = dataset_parts(path) if os.path.isdir(path) else [path]
+    columns = []
+    rows = []
+    total = 0
+    for file in files:
+        parquet = pq.ParquetFile(file)
+        if not columns:
+            columns = parquet.schema_arrow.names
+        for group in range(parquet.num_row_groups):
+            group_rows = parquet.metadata.row_group(group).num_rows
+            first, total = total, total + group_rows
+            if total <= start or first >= start + count:
+                continue
+            table = parquet.read_row_group(group)
+            table = table.slice(max(start - first, 0), start + count - max(start, first))
+            values = []
+            for field, column in zip(table.schema, table.columns):
+                column = column.to_pylist()
+                if field.metadata and field.metadata.get(b"unit") == b"centavos":
+                    column = [None if v is None else v / 100 for v in column]
+                values.append(column)
+            rows.extend([list(row) for row in zip(*values)])
+    return columns, rows, total
+
+
+def read_page(path, start, count):
+    """A page of rows from any output; returns (columns, rows, total rows)"""
+    if is_parquet(path):
+        return read_parquet_page(path, start, count)
+    return read_csv_page(path, start, count)
+
+
+# ============================================================================
+# READERS
+# ============================================================================
+
+def _parquet_dataset(path):
+    import pyarrow.dataset as ds
+    return ds.dataset(path, format="parquet")
+
+
+def read_frame(path, columns=None):
+    """Load a Parquet file or dataset as a DataFrame, reading only ``columns`` that exist"""
+    dataset = _parquet_dataset(path)
+    if columns is not None:
+        columns = [c for c in columns if c in dataset.schema.names]
+    return dataset.to_table(columns=columns).to_pandas()
+
+
+def iter_frames(path, columns=None, chunk_size=50000):
+    """Yield DataFrames of at most ``chunk_size`` rows from a Parquet file or dataset"""
+    dataset = _parquet_dataset(path)
+    if columns is not None:
+        columns = [c for c in columns if c in dataset.schema.names]
+    for batch in dataset.to_batches(columns=columns, batch_size=chunk_size):
+        if batch.num_rows:
+            yield batch.to_pandas()
+
+
+def column_names(path):
+    return _parquet_dataset(path).schema.names
+
+
+def iter_records(path):
+    """Yield each row of a Parquet file or dataset as a dict, like csv.DictReader"""
+    for frame in iter_frames(path):
+        frame = frame.astype(object).where(frame.notna(), None)
+        yield from frame.to_dict("records")
+
+
+def compact_dataset(path, dest):
+    """Copy every part of a Parquet dataset into one Parquet file, a part at a time"""
+    import pyarrow.parquet as pq
+    parts = dataset_parts(path)
+    writer = None
+    try:
+        for part in parts:
+            table = pq.read_table(part)
+            if writer is None:
+                writer = pq.ParquetWriter(dest, table.schema, compression="zstd")
+            writer.write_table(table)
+    finally:
+        if writer is not None:
+            writer.close()
+    return dest if parts else None
@@ -0,0 +1,189 @@
+import atexit
+import json
+import os
+import random
+import threading
+import time
+from collections import Counter
+
+# ============================================================================
+# REQUEST BUDGET
+# ============================================================================
+
+class RequestBudget:
+    """Token bucket shared by every worker so the total request rate stays capped.
+
+    ``rate`` is the ceiling in requests per second; ``burst`` is how many
+    requests may go out back-to-back after an idle period.
+    """
+
+    def __init__(self, rate, burst=1):
+        if rate <= 0:
+            raise ValueError("rate must be positive")
+        self.rate = rate
+        self.burst = burst
+        self._tokens = burst
+        self._updated = time.monotonic()
+        self._lock = threading.Lock()
+
+    def _refill(self, now):
+        elapsed = now - self._updated
+        self._tokens = min(self.burst, self._tokens + elapsed * self.rate)
+        self._updated = now
+
+    def acquire(self, n=1):
+        """Block until ``n`` requests may be sent; returns the time spent waiting"""
+        waited = 0.0
+        with self._lock:
+            now = time.monotonic()
+            self._refill(now)
+            # Tokens are taken immediately (possibly going negative) so that
+            # concurrent callers queue up behind each other instead of racing.
+            self._tokens -= n
+            if self._tokens < 0:
+                waited = -self._tokens / self.rate
+        if waited:
+            time.sleep(waited)
+        return waited
+
+    def record(self, response, latency):
+        """Feedback hook for adaptive limiters; a fixed budget ignores it"""
+
+
+# ============================================================================
+# ADAPTIVE RATE CONTROLLER
+# ============================================================================
+
+CAPTCHA_ERROR = 90309999
+THROTTLE_HTTP_STATUSES = {429, 503}
+
+
+class AdaptiveRateController:
+    """Paces requests and learns how fast Shopee will let us go.
+
+    The rate grows additively while responses come back clean and is cut
+    multiplicatively on a captcha (error 90309999), an HTTP throttle status,
+    or when recent latency climbs well above its long-run average.  The
+    learned rate is written to ``state_file`` so the next run starts from it.
+    """
+
+    def __init__(self, initial_rate=0.25, min_rate=0.05, max_rate=2.0,
+                 increase=0.01, backoff=0.5, latency_backoff=0.8,
+                 latency_factor=2.0, jitter=0.25, state_file=None):
+        self.min_rate = min_rate
+        self.max_rate = max_rate
+        self.increase = increase
+        self.backoff = backoff
+        self.latency_backoff = latency_backoff
+        self.latency_factor = latency_factor
+        self.jitter = jitter
+        self.state_file = state_file
+
+        self.rate = initial_rate
+        self.latency_fast = None
+        self.latency_slow = None
+        self.stats = Counter()
+
+        self._next_slot = time.monotonic()
+        self._lock = threading.Lock()
+        self._dirty = 0
+
+        if state_file:
+            self.load()
+        self.rate = min(max(self.rate, self.min_rate), self.max_rate)
+
+    def acquire(self, n=1):
+        """Block until the next request slot; returns the time spent waiting"""
+        with self._lock:
+            now = time.monotonic()
+            slot = max(now, self._next_slot)
+            for _ in range(n):
+                interval = 1.0 / self.rate
+                if self.jitter:
+                    interval *= random.uniform(1 - self.jitter, 1 + self.jitter)
+                self._next_slot = max(self._next_slot, now) + interval
+        waited = slot - now
+        if waited > 0:
+            time.sleep(waited)
+        return waited
+
+    def record(self, response, latency):
+        """Adjust the rate from the outcome of one request"""
+        with self._lock:
+            self.stats['requests'] += 1
+            throttled = (
+                response.get('error') == CAPTCHA_ERROR
+                or response.get('http_status') in THROTTLE_HTTP_STATUSES
+            )
+
+            if self.latency_slow is None:
+                self.latency_fast = self.latency_slow = latency
+            else:
+                self.latency_fast += 0.3 * (latency - self.latency_fast)
+                self.latency_slow += 0.02 * (latency - self.latency_slow)
+            slow = self.latency_fast > self.latency_slow * self.latency_factor
+
+            if throttled:
+                self.stats['throttled'] += 1
+                self._set_rate(self.rate * self.backoff)
+                # Give the server a breather before the next request
+                self._next_slot = time.monotonic() + 1.0 / self.rate
+            elif slow:
+                self.stats['slow'] += 1
+                self._set_rate(self.rate * self.latency_backoff)
+                # Re-centre so one slow spell only triggers one cut
+                self.latency_fast = self.latency_slow
+            else:
+                self._set_rate(self.rate + self.increase)
+
+            self._dirty += 1
+            if throttled or self._dirty >= 20:
+                self._save_locked()
+
+    def _set_rate(self, rate):
+        self.rate = min(max(rate, self.min_rate), self.max_rate)
+
+    def load(self):
+        """Restore the learned rate from the state file, if there is one"""
+        try:
+            with open(self.state_file, 'r', encoding='utf-8') as f:
+                state = json.load(f)
+        except (OSError, ValueError):
+            return
+        self.rate = state.get('rate', self.rate)
+        self.latency_slow = state.get('latency')
+        self.latency_fast = self.latency_slow
+
+    def save(self):
+        with self._lock:
+            self._save_locked()
+
+    def _save_locked(self):
+        self._dirty = 0
+        if not self.state_file:
+            return
+        state = {'rate': self.rate, 'latency': self.latency_slow, 'updated': time.time()}
+        tmp_path = f"{self.state_file}.tmp"
+        try:
+            with open(tmp_path, 'w', encoding='utf-8') as f:
+                json.dump(state, f)
+            os.replace(tmp_path, self.state_file)
+        except OSError as e:
+            print(f"⚠️ Could not save rate state: {e}")
+
+
+RATE_STATE_FILE = "rate_state.json"
+
+_default_controller = None
+_default_controller_lock = threading.Lock()
+
+
+def get_rate_controller(**kwargs):
+    """Return the process-wide controller shared by every scrape loop"""
+    global _default_controller
+    with _default_controller_lock:
+        if _default_controller is None:
+            kwargs.setdefault('state_file', RATE_STATE_FILE)
+            _default_controller = AdaptiveRateController(**kwargs)
+            atexit.register(_default_controller.save)
+        return _default_controller
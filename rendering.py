@@ -0,0 +1,207 @@
+import hashlib
+import json
+import os
+import re
+import threading
+from collections import Counter
+from concurrent.futures import ProcessPoolExecutor
+
+from sentiment import STOPWORDS
+
+# ============================================================================
+# WORDCLOUD RENDERING
+# ============================================================================
+#
+# A wordcloud is drawn from a product's top term frequencies.  Those
+# frequencies (and the title and render settings) are hashed into the image
+# file name, so an image that already exists is reused and a product whose
+# reviews haven't changed is never drawn twice.
+#
+# Modes:
+#   inline      draw each image as its product is analyzed
+#   background  draw images in a separate process pool while analysis goes on
+#   lazy        only save what is needed to draw; the Flask app draws an
+#               image the first time it is requested
+#   skip        no wordclouds
+
+WORDCLOUD_MODES = ('inline', 'background', 'lazy', 'skip')
+WORDCLOUD_FOLDER = "wordclouds"
+MAX_WORDS = 100
+
+# Bump when the drawing code or settings change so cached images are redrawn
+RENDER_VERSION = 1
+
+SPEC_FOLDER = ".specs"
+KEY_LENGTH = 16
+
+
+def _wordcloud(**kwargs):
+    from wordcloud import WordCloud
+    return WordCloud(
+        width=800, height=400,
+        background_color='white',
+        colormap='viridis',
+        max_words=MAX_WORDS,
+        **kwargs
+    )
+
+
+def text_frequencies(text):
+    """Top term frequencies of raw text, counted exactly as WordCloud.generate() does"""
+    if not text.strip():
+        return []
+    return top_frequencies(_wordcloud(stopwords=STOPWORDS).process_text(text))
+
+
+def count_frequencies(word_counts):
+    """Top term frequencies from plain word counts (no two-word collocations)
+
+    Stopwords and bare numbers are dropped as WordCloud.generate() would.
+    """
+    return top_frequencies(Counter({
+        word: count for word, count in word_counts.items()
+        if word not in STOPWORDS and not word.isdigit()
+    }))
+
+
+def top_frequencies(frequencies):
+    """The ``MAX_WORDS`` (word, count) pairs a wordcloud actually draws, most frequent first"""
+    ranked = sorted(frequencies.items(), key=lambda item: item[1], reverse=True)
+    return [[word, count] for word, count in ranked[:MAX_WORDS]]
+
+
+def wordcloud_key(product_name, words):
+    payload = json.dumps([RENDER_VERSION, product_name, words], ensure_ascii=False)
+    return hashlib.blake2b(payload.encode('utf-8'), digest_size=KEY_LENGTH // 2).hexdigest()
+
+
+def wordcloud_path(output_folder, product_name, words):
+    """Where the image for these frequencies lives; None when there is nothing to draw"""
+    if not words:
+        return None
+    safe_name = re.sub(r'[^\w\s-]', '', product_name)[:50]
+    return f"{output_folder}/{safe_name}_wordcloud_{wordcloud_key(product_name, words)}.png"
+
+
+def _key_from_filename(filename):
+    match = re.search(r"_wordcloud_([0-9a-f]{%d})\.png$" % KEY_LENGTH, filename)
+    return match.group(1) if match else None
+
+
+def render_wordcloud(output_folder, product_name, words):
+    """Draw and save a wordcloud unless it is cached; returns (path, drawn)"""
+    path = wordcloud_path(output_folder, product_name, words)
+    if path is None or os.path.exists(path):
+        return path, False
+
+    # A bare Figure rather than pyplot: no GUI backend and no global figure
+    # state, so images can be drawn from Flask request threads
+    from matplotlib.figure import Figure
+
+    wordcloud = _wordcloud().generate_from_frequencies(dict(words))
+
+    fig = Figure(figsize=(10, 5))
+    ax = fig.add_subplot()
+    ax.imshow(wordcloud, interpolation='bilinear')
+    ax.axis('off')
+    ax.set_title(f"WordCloud: {product_name[:60]}...", fontsize=12)
+    fig.tight_layout()
+    os.makedirs(output_folder, exist_ok=True)
+    # Written under a temporary name so a reader never sees half an image
+    tmp_path = f"{path}.{os.getpid()}.{threading.get_ident()}.tmp"
+    fig.savefig(tmp_path, dpi=150, bbox_inches='tight', format='png')
+    os.replace(tmp_path, path)
+
+    return path, True
+
+
+def _render_task(task):
+    return render_wordcloud(*task)
+
+
+def save_spec(output_folder, product_name, words):
+    """Store what render_spec() needs to draw an image later"""
+    path = wordcloud_path(output_folder, product_name, words)
+    if path is None or os.path.exists(path):
+        return path, False
+    spec_dir = os.path.join(output_folder, SPEC_FOLDER)
+    os.makedirs(spec_dir, exist_ok=True)
+    spec_path = os.path.join(spec_dir, f"{wordcloud_key(product_name, words)}.json")
+    if not os.path.exists(spec_path):
+        tmp_path = f"{spec_path}.{os.getpid()}.tmp"
+        with open(tmp_path, 'w', encoding='utf-8') as f:
+            json.dump({'product_name': product_name, 'words': words}, f, ensure_ascii=False)
+        os.replace(tmp_path, spec_path)
+    return path, False
+
+
+def render_spec(output_folder, filename):
+    """Draw a lazily deferred image by file name; returns its path or None if unknown"""
+    path = os.path.join(output_folder, filename)
+    if os.path.exists(path):
+        return path
+    key = _key_from_filename(filename)
+    if key is None:
+        return None
+    spec_path = os.path.join(output_folder, SPEC_FOLDER, f"{key}.json")
+    try:
+        with open(spec_path, 'r', encoding='utf-8') as f:
+            spec = json.load(f)
+    except (OSError, ValueError):
+        return None
+    rendered, _ = render_wordcloud(output_folder, spec['product_name'], spec['words'])
+    return rendered
+
+
+class WordcloudRenderer:
+    """Hands each product's wordcloud to the selected rendering mode.
+
+    submit() returns the image path right away; in background mode the
+    image exists once close() returns.
+    """
+
+    def __init__(self, mode='inline', output_folder=WORDCLOUD_FOLDER, workers=2):
+        if mode not in WORDCLOUD_MODES:
+            raise ValueError(f"wordcloud mode must be one of {', '.join(WORDCLOUD_MODES)}")
+        self.mode = mode
+        self.output_folder = output_folder
+        self.stats = Counter()
+        self._pending = []
+        self._pool = ProcessPoolExecutor(max_workers=workers) if mode == 'background' else None
+        if mode != 'skip':
+            os.makedirs(output_folder, exist_ok=True)
+
+    def submit(self, product_name, words):
+        if self.mode == 'skip':
+            return None
+        path = wordcloud_path(self.output_folder, product_name, words)
+        if path is None:
+            return None
+        if os.path.exists(path):
+            self.stats['cached'] += 1
+        elif self.mode == 'inline':
+            render_wordcloud(self.output_folder, product_name, words)
+            self.stats['drawn'] += 1
+        elif self.mode == 'background':
+            self._pending.append(self._pool.submit(_render_task, (self.output_folder, product_name, words)))
+        else:
+            save_spec(self.output_folder, product_name, words)
+            self.stats['deferred'] += 1
+        return path
+
+    def record(self, drawn):
+        """Count an image drawn elsewhere (by an analysis worker in inline mode)"""
+        self.stats['drawn' if drawn else 'cached'] += 1
+
+    def close(self):
+        """Wait for background images to finish"""
+        if self._pool is not None:
+            for future in self._pending:
+                _, drawn = future.result()
+                self.stats['drawn' if drawn else 'cached'] += 1
+            self._pending = []
+            self._pool.shutdown()
+            self._pool = None
+
+    def summary(self):
+        return ", ".join(f"{count} {name}" for name, count in sorted(self.stats.items())) or "none"
@@ -0,0 +1,195 @@
+import hashlib
+import json
+import sqlite3
+import threading
+import time
+import urllib.parse
+import zlib
+from collections import Counter
+
+from transport import PacedTransport, fetch_json_batch
+
+# ============================================================================
+# RESPONSE CACHE
+# ============================================================================
+#
+# API responses are kept on disk, keyed by a hash of the normalized request
+# URL, so a re-run over the same keyword or products reads pages back
+# instead of asking Shopee again.  Each endpoint has its own time to live.
+# The cache sits in front of the rate controller: a hit costs no request
+# budget and no wait.  Only clean responses are stored, never errors or
+# captcha challenges.  Once the cache grows past ``max_bytes`` the least
+# recently used responses are evicted.
+
+RESPONSE_CACHE_FILE = "response_cache.sqlite"
+
+# Seconds a response stays fresh, by API path
+ENDPOINT_TTLS = {
+    "/api/v4/search/search_items": 3600,
+    "/api/v4/recommend/recommend": 3600,
+    "/api/v4/shop/search_items": 3600,
+    "/api/v2/item/get_ratings": 6 * 3600,
+}
+DEFAULT_TTL = 3600
+
+
+def normalize_url(url):
+    """The URL with its host lower-cased and its query parameters sorted"""
+    parts = urllib.parse.urlsplit(url)
+    query = urllib.parse.urlencode(sorted(urllib.parse.parse_qsl(parts.query, keep_blank_values=True)))
+    return urllib.parse.urlunsplit((parts.scheme, parts.netloc.lower(), parts.path, query, ""))
+
+
+def cache_key(url):
+    return hashlib.blake2b(normalize_url(url).encode("utf-8"), digest_size=16).hexdigest()
+
+
+def is_cacheable(response):
+    """Clean API data only: no error code, transport failure or HTTP error"""
+    if not isinstance(response, dict) or response.get("error") or response.get("transport_error"):
+        return False
+    return response.get("http_status") in (None, 200)
+
+
+class ResponseCache:
+    """SQLite store of compressed API responses with per-endpoint TTLs"""
+
+    def __init__(self, path=RESPONSE_CACHE_FILE, max_bytes=256 * 1024 * 1024, ttls=None):
+        self.path = path
+        self.max_bytes = max_bytes
+        self.ttls = dict(ENDPOINT_TTLS if ttls is None else ttls)
+        self.stats = Counter()
+        self._lock = threading.Lock()
+        self.conn = sqlite3.connect(path, check_same_thread=False)
+        self.conn.execute("PRAGMA journal_mode=WAL")
+        self.conn.execute("PRAGMA synchronous=NORMAL")
+        self.conn.executescript("""
+            CREATE TABLE IF NOT EXISTS responses (
+                key TEXT PRIMARY KEY,
+                endpoint TEXT NOT NULL,
+                body BLOB NOT NULL,
+                size INTEGER NOT NULL,
+                expires_at REAL NOT NULL,
+                accessed_at REAL NOT NULL
+            );
+            CREATE INDEX IF NOT EXISTS responses_accessed ON responses (accessed_at);
+        """)
+        self.conn.commit()
+        self.total_bytes = self.conn.execute("SELECT coalesce(sum(size), 0) FROM responses").fetchone()[0]
+
+    def ttl(self, url):
+        return self.ttls.get(urllib.parse.urlsplit(url).path, DEFAULT_TTL)
+
+    def get(self, url):
+        """The cached response for a URL, or None if missing or expired"""
+        key = cache_key(url)
+        now = time.time()
+        with self._lock:
+            row = self.conn.execute(
+                "SELECT body, expires_at FROM responses WHERE key = ?", (key,)
+            ).fetchone()
+            if row is None:
+                self.stats["misses"] += 1
+                return None
+            if row[1] <= now:
+                self.stats["misses"] += 1
+                self.stats["expired"] += 1
+                return None
+            with self.conn:
+                self.conn.execute("UPDATE responses SET accessed_at = ? WHERE key = ?", (now, key))
+            self.stats["hits"] += 1
+        return json.loads(zlib.decompress(row[0]))
+
+    def put(self, url, response):
+        """Store a clean response; anything else is ignored"""
+        ttl = self.ttl(url)
+        if ttl <= 0 or not is_cacheable(response):
+            return
+        body = zlib.compress(json.dumps(response, separators=(",", ":")).encode("utf-8"))
+        now = time.time()
+        key = cache_key(url)
+        with self._lock, self.conn:
+            old = self.conn.execute("SELECT size FROM responses WHERE key = ?", (key,)).fetchone()
+            self.conn.execute(
+                "INSERT OR REPLACE INTO responses (key, endpoint, body, size, expires_at, accessed_at) "
+                "VALUES (?, ?, ?, ?, ?, ?)",
+                (key, urllib.parse.urlsplit(url).path, body, len(body), now + ttl, now)
+            )
+            self.total_bytes += len(body) - (old[0] if old else 0)
+            self.stats["stores"] += 1
+            if self.total_bytes > self.max_bytes:
+                self._evict()
+
+    def _evict(self):
+        """Drop expired responses, then the least recently used, until under max_bytes"""
+        cursor = self.conn.execute("DELETE FROM responses WHERE expires_at <= ?", (time.time(),))
+        self.stats["evictions"] += cursor.rowcount
+        self.total_bytes = self.conn.execute("SELECT coalesce(sum(size), 0) FROM responses").fetchone()[0]
+        # Trim to 90% so the next few stores don't evict again right away
+        target = self.max_bytes * 0.9
+        rows = self.conn.execute("SELECT key, size FROM responses ORDER BY accessed_at").fetchall()
+        doomed = []
+        for key, size in rows:
+            if self.total_bytes <= target:
+                break
+            doomed.append((key,))
+            self.total_bytes -= size
+        self.conn.executemany("DELETE FROM responses WHERE key = ?", doomed)
+        self.stats["evictions"] += len(doomed)
+
+    def clear(self):
+        with self._lock, self.conn:
+            self.conn.execute("DELETE FROM responses")
+            self.total_bytes = 0
+
+    def summary(self):
+        lookups = self.stats["hits"] + self.stats["misses"]
+        rate = f"{self.stats['hits'] / lookups:.0%}" if lookups else "n/a"
+        return (
+            f"{self.stats['hits']} hits, {self.stats['misses']} misses ({rate} hit rate), "
+            f"{self.stats['stores']} stored, {self.stats['evictions']} evicted, "
+            f"{self.total_bytes / 1e6:.1f} MB on disk"
+        )
+
+    def close(self):
+        self.conn.close()
+
+
+class CachingTransport:
+    """Answers requests from a ResponseCache and stores what the inner transport fetches.
+
+    With ``bypass`` every request goes through, and the fresh responses
+    replace what was cached.
+    """
+
+    def __init__(self, inner, cache, bypass=False):
+        self.inner = inner
+        self.cache = cache
+        self.bypass = bypass
+
+    def paced(self, limiter):
+        """The same cache over a paced inner transport, so hits skip the rate controller"""
+        if hasattr(self.inner, 'paced'):
+            return CachingTransport(self.inner.paced(limiter), self.cache, self.bypass)
+        return CachingTransport(PacedTransport(self.inner, limiter), self.cache, self.bypass)
+
+    def fetch_json(self, url):
+        if not self.bypass:
+            response = self.cache.get(url)
+            if response is not None:
+                return response
+        response = self.inner.fetch_json(url)
+        self.cache.put(url, response)
+        return response
+
+    def fetch_json_batch(self, urls, concurrency=4):
+        responses = [None] * len(urls)
+        if not self.bypass:
+            responses = [self.cache.get(url) for url in urls]
+        missing = [i for i, response in enumerate(responses) if response is None]
+        if missing:
+            fetched = fetch_json_batch(self.inner, [urls[i] for i in missing], concurrency)
+            for i, response in zip(missing, fetched):
+                self.cache.put(urls[i], response)
+                responses[i] = response
+        return responses
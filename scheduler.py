@@ -0,0 +1,150 @@
+import heapq
+import itertools
+import threading
+import time
+
+# ============================================================================
+# JOB SCHEDULER
+# ============================================================================
+#
+# The API server hands every task to one scheduler instead of starting a
+# thread per request.  A fixed number of worker threads take jobs highest
+# priority first, first come first served within a priority.  The queue is
+# bounded: once it is full, submit() refuses new jobs so the endpoint can
+# push back on the client.
+#
+# Cancelling a queued job drops it.  A running job only sees its
+# ``cancelled`` event; scrape tasks pass it to a CancellableTransport,
+# which stops them at the next page.
+
+
+class QueueFull(Exception):
+    """Raised by submit() when the queue is at capacity"""
+
+
+class Job:
+    """One submitted task and its place in the scheduler"""
+
+    def __init__(self, task_id, func, args, kwargs, priority, seq):
+        self.task_id = task_id
+        self.func = func
+        self.args = args
+        self.kwargs = kwargs
+        self.priority = priority
+        self.seq = seq
+        self.state = 'queued'
+        self.cancelled = threading.Event()
+        self.submitted_at = time.time()
+        self.started_at = None
+        self.finished_at = None
+
+    def sort_key(self):
+        return (-self.priority, self.seq)
+
+    def __lt__(self, other):
+        return self.sort_key() < other.sort_key()
+
+    def wait_time(self):
+        """Seconds spent queued, so far or before it started"""
+        end = self.started_at or self.finished_at or time.time()
+        return end - self.submitted_at
+
+
+class JobScheduler:
+    """Runs jobs on ``workers`` threads with at most ``max_queued`` waiting"""
+
+    def __init__(self, workers=2, max_queued=20):
+        self.workers = workers
+        self.max_queued = max_queued
+        self._heap = []
+        self._jobs = {}
+        self._queued = 0
+        self._running = 0
+        self._seq = itertools.count()
+        self._cond = threading.Condition()
+        for i in range(workers):
+            thread = threading.Thread(target=self._work, name=f"job-worker-{i}", daemon=True)
+            thread.start()
+
+    def submit(self, task_id, func, *args, priority=0, **kwargs):
+        """Queue ``func(*args, **kwargs)``; raises QueueFull when the queue is at capacity"""
+        with self._cond:
+            if self._queued >= self.max_queued:
+                raise QueueFull(f"Too many queued tasks ({self._queued}), try again later")
+            job = Job(task_id, func, args, kwargs, priority, next(self._seq))
+            self._jobs[task_id] = job
+            heapq.heappush(self._heap, job)
+            self._queued += 1
+            self._cond.notify()
+        return job
+
+    def _next_job(self):
+        with self._cond:
+            while True:
+                while self._heap:
+                    job = heapq.heappop(self._heap)
+                    # Cancelled jobs are left in the heap and skipped here
+                    if job.state == 'queued':
+                        self._queued -= 1
+                        self._running += 1
+                        job.state = 'running'
+                        job.started_at = time.time()
+                        return job
+                self._cond.wait()
+
+    def _work(self):
+        while True:
+            job = self._next_job()
+            try:
+                job.func(*job.args, **job.kwargs)
+            except Exception as e:
+                print(f"[{job.task_id}] Unhandled error in job: {e}")
+            finally:
+                with self._cond:
+                    self._running -= 1
+                    job.state = 'done'
+                    job.finished_at = time.time()
+
+    def cancel(self, task_id):
+        """Drop a queued job or signal a running one; returns the state it was in, or None"""
+        with self._cond:
+            job = self._jobs.get(task_id)
+            if job is None or job.state == 'done':
+                return None
+            state = job.state
+            job.cancelled.set()
+            if state == 'queued':
+                job.state = 'done'
+                job.finished_at = time.time()
+                self._queued -= 1
+            return state
+
+    def get(self, task_id):
+        return self._jobs.get(task_id)
+
+    def forget(self, task_id):
+        with self._cond:
+            job = self._jobs.get(task_id)
+            if job is not None and job.state == 'done':
+                del self._jobs[task_id]
+
+    def position(self, task_id):
+        """1-based place of a queued job in line to run, or None"""
+        with self._cond:
+            job = self._jobs.get(task_id)
+            if job is None or job.state != 'queued':
+                return None
+            key = job.sort_key()
+            return 1 + sum(
+                1 for other in self._heap
+                if other.state == 'queued' and other.sort_key() < key
+            )
+
+    def stats(self):
+        with self._cond:
+            return {
+                'workers': self.workers,
+                'running': self._running,
+                'queued': self._queued,
+                'max_queued': self.max_queued,
+            }
@@ -0,0 +1,362 @@
+import hashlib
+import sqlite3
+import threading
+from collections import OrderedDict
+
+import numpy as np
+import pandas as pd
+
+# ============================================================================
+# SHARED WORD LISTS
+# ============================================================================
+
+# Filler words dropped from wordclouds and keyword lists.  PH reviews mix
+# Tagalog and English, often in the same sentence.
+STOPWORDS = {
+    # Tagalog
+    'ang', 'ng', 'sa', 'na', 'at', 'mga', 'para', 'ko', 'mo', 'po',
+    'yung', 'lang', 'naman', 'pa', 'din', 'rin', 'kasi', 'yan', 'yun',
+    'nga', 'ba', 'daw', 'raw', 'siya', 'sya', 'ito', 'iyan', 'iyon', 'nya',
+    'niya', 'ako', 'ikaw', 'kayo', 'kami', 'tayo', 'sila', 'nila', 'namin',
+    'natin', 'ninyo', 'ay', 'si', 'ni', 'kay', 'may', 'mayroon', 'meron',
+    'pag', 'kung', 'kapag', 'nang', 'dahil', 'pero', 'tapos', 'lng', 'nmn',
+    'ung', 'un', 'dn', 'pra', 'sna', 'sana', 'talaga', 'tlga', 'ulit',
+    # English
+    'the', 'and', 'is', 'it', 'to', 'of', 'a', 'in', 'for', 'on',
+    'very', 'so', 'got', 'just', 'really', 'much', 'good',
+    'i', 'my', 'this', 'that', 'was', 'with', 'but', 'are', 'be', 'as',
+}
+
+# Words that flip the polarity of the word after them
+PATTERN_NEGATIONS = {'no', 'not', "n't", 'never'}
+NEGATIONS = PATTERN_NEGATIONS | {
+    'dont', 'didnt', 'isnt', 'wasnt', 'doesnt',
+    'hindi', 'di', 'wag', 'huwag', 'walang', 'wala',
+}
+
+# Tagalog and Taglish sentiment words missing from the English lexicon,
+# scored on the same -1..1 scale
+TAGALOG_LEXICON = {
+    'maganda': 0.7, 'ganda': 0.7, 'napakaganda': 0.9, 'pangit': -0.7,
+    'panget': -0.7, 'sira': -0.6, 'nasira': -0.6, 'basag': -0.6,
+    'peke': -0.7, 'mabilis': 0.4, 'bilis': 0.4, 'mabagal': -0.4,
+    'bagal': -0.4, 'sulit': 0.6, 'salamat': 0.3, 'ayos': 0.4,
+    'maayos': 0.5, 'legit': 0.5, 'solid': 0.5, 'galing': 0.6,
+    'magaling': 0.6, 'gusto': 0.4, 'nagustuhan': 0.5, 'matibay': 0.5,
+    'mura': 0.3, 'mali': -0.4, 'kulang': -0.4, 'dismayado': -0.7,
+    'sayang': -0.5, 'malinis': 0.4, 'madumi': -0.5, 'malambot': 0.3,
+    'masarap': 0.7, 'sarap': 0.7, 'mabango': 0.5, 'mabaho': -0.6,
+    'lupet': 0.6, 'astig': 0.6, 'bongga': 0.6, 'bulok': -0.8,
+}
+
+# Intensifiers that scale the next word instead of being scored themselves
+TAGALOG_INTENSIFIERS = {
+    'sobrang': 1.5, 'napaka': 1.5, 'grabe': 1.4, 'super': 1.4, 'sobra': 1.4,
+}
+
+# ============================================================================
+# TEXT CLEANING
+# ============================================================================
+
+def clean_series(texts):
+    """Vectorized ShopeeTool.clean_text over a pandas Series"""
+    texts = pd.Series(texts, dtype=object).fillna('').astype(str)
+    return (
+        texts.str.lower()
+        .str.replace(r'http\S+|www\S+|@\w+', '', regex=True)
+        .str.replace(r'[^\w\s]', ' ', regex=True)
+        .str.replace(r'\s+', ' ', regex=True)
+        .str.strip()
+    )
+
+# ============================================================================
+# SENTIMENT BACKENDS
+# ============================================================================
+#
+# A backend turns a list of already-cleaned comments into polarities in
+# -1..1.  TextBlob is the reference; the lexicon backend trades some accuracy
+# for scoring a whole column at once.
+
+class TextBlobBackend:
+    """Per-comment TextBlob polarity (the original behaviour)"""
+
+    name = 'textblob'
+
+    def score(self, text):
+        if not text:
+            return 0
+        try:
+            from textblob import TextBlob
+            return TextBlob(text).sentiment.polarity
+        except Exception:
+            return 0
+
+    def score_many(self, texts):
+        return np.array([self.score(text) for text in texts], dtype=float)
+
+
+def load_lexicon(include_tagalog=True):
+    """Load TextBlob's pattern lexicon as flat lookup tables.
+
+    Returns (polarity, intensity, modifiers): word -> polarity and word ->
+    intensity using pattern's sense-averaged scores, and the set of adverbs
+    that pattern treats as modifiers of the next word.  Tagalog words and
+    intensifiers are layered on top unless ``include_tagalog`` is False.
+    """
+    from textblob.en import sentiment as pattern
+
+    polarity = {}
+    intensity = {}
+    modifiers = set()
+    for word, senses in list(pattern.items()):
+        p, s, i = senses[None]
+        polarity[word] = p
+        intensity[word] = i
+        if 'RB' in senses:
+            modifiers.add(word)
+
+    if include_tagalog:
+        polarity.update(TAGALOG_LEXICON)
+        for word, value in TAGALOG_INTENSIFIERS.items():
+            polarity.setdefault(word, 0.0)
+            intensity[word] = value
+            modifiers.add(word)
+    return polarity, intensity, modifiers
+
+
+class LexiconBackend:
+    """Vectorized lexicon scorer.
+
+    Approximates TextBlob's pattern analyzer with array operations over every
+    token of every comment at once: a comment's polarity is the mean of its
+    scored words, an adverb directly before a scored word scales it by the
+    adverb's intensity instead of being scored itself, and a negation before
+    the word (or before its adverb) multiplies it by -0.5.  Unlike TextBlob it
+    ignores punctuation and emoticons, which clean_text strips anyway.
+    """
+
+    name = 'lexicon'
+
+    def __init__(self, include_tagalog=True):
+        self.polarity, self.intensity, self.modifiers = load_lexicon(include_tagalog)
+        self.negations = NEGATIONS if include_tagalog else PATTERN_NEGATIONS
+
+    def score(self, text):
+        return float(self.score_many([text])[0])
+
+    def score_many(self, texts):
+        texts = pd.Series(list(texts), dtype=object).fillna('')
+        n = len(texts)
+        if n == 0:
+            return np.zeros(0)
+
+        tokens = texts.str.split().explode()
+        tokens = tokens[tokens.notna()]
+        # Like pattern, a negation carries across one-letter words ("not a good")
+        tokens = tokens[(tokens.str.len() > 1) | tokens.isin(self.polarity)]
+        if tokens.empty:
+            return np.zeros(n)
+
+        rows = tokens.index.to_numpy()
+        words = pd.Series(tokens.to_numpy())
+        polarity = words.map(self.polarity).to_numpy(dtype=float)
+        intensity = words.map(self.intensity).fillna(1.0).to_numpy(dtype=float)
+        is_modifier = words.isin(self.modifiers).to_numpy()
+        is_negation = words.isin(self.negations).to_numpy()
+        scored = ~np.isnan(polarity)
+
+        # Neighbours only count inside the same comment
+        same_as_prev = np.zeros(len(words), dtype=bool)
+        same_as_prev[1:] = rows[1:] == rows[:-1]
+
+        def shifted(values, fill):
+            out = np.full(len(values), fill, dtype=values.dtype)
+            out[1:] = values[:-1]
+            out[~same_as_prev] = fill
+            return out
+
+        # An adverb is folded into the scored word right after it
+        next_scored = np.zeros(len(words), dtype=bool)
+        next_scored[:-1] = scored[1:] & same_as_prev[1:]
+        modifies_next = is_modifier & scored & next_scored
+        modified = shifted(modifies_next, False)
+        modifier_intensity = shifted(intensity, 1.0)
+
+        # "not good", and "not very good" where the negation precedes the
+        # adverb, which pattern also softens by inverting its intensity
+        negated_modifier = modified & shifted(shifted(is_negation, False), False)
+        negated = shifted(is_negation, False) | negated_modifier
+        factor = np.where(modified, modifier_intensity, 1.0)
+        factor = np.where(negated_modifier, 1.0 / modifier_intensity, factor)
+
+        values = np.clip(polarity * factor, -1.0, 1.0) * np.where(negated, -0.5, 1.0)
+        keep = scored & ~modifies_next
+
+        sums = np.bincount(rows[keep], weights=values[keep], minlength=n)
+        counts = np.bincount(rows[keep], minlength=n)
+        return np.divide(sums, counts, out=np.zeros(n), where=counts > 0)
+
+
+SENTIMENT_BACKENDS = {
+    'textblob': TextBlobBackend,
+    'lexicon': LexiconBackend,
+}
+
+_backends = {}
+
+
+def get_backend(name='textblob'):
+    """Return a shared backend instance, so lexicons load once per process"""
+    if name not in SENTIMENT_BACKENDS:
+        raise ValueError(f"Unknown sentiment backend '{name}' (choose from {', '.join(SENTIMENT_BACKENDS)})")
+    if name not in _backends:
+        _backends[name] = SENTIMENT_BACKENDS[name]()
+    return _backends[name]
+
+
+# ============================================================================
+# COMMENT CACHE
+# ============================================================================
+#
+# Reviews repeat a lot ("good quality", template tags, copy-paste comments),
+# so cleaned text and polarity are memoized per normalized comment.  Lookups
+# go to a bounded in-process LRU first and then, if a cache file is given, to
+# a SQLite table that persists across runs.
+
+def normalize_comment(text):
+    """Lowercase and collapse whitespace; clean_text gives the same result either way"""
+    if text is None or (isinstance(text, float) and np.isnan(text)):
+        return ''
+    return ' '.join(str(text).lower().split())
+
+
+def comment_key(backend_name, normalized):
+    return hashlib.blake2b(f"{backend_name}\0{normalized}".encode('utf-8'), digest_size=16).digest()
+
+
+class CommentCache:
+    """Bounded LRU of comment key -> (cleaned text, polarity), optionally backed by SQLite
+
+    One instance is shared by every thread of a process (the API server
+    runs analyses on several scheduler threads), so the entries, counters
+    and connection are only touched under a lock.  Scoring itself runs
+    outside it.
+    """
+
+    def __init__(self, max_entries=200000, path=None):
+        self.max_entries = max_entries
+        self.path = path
+        self.hits = 0
+        self.misses = 0
+        self._entries = OrderedDict()
+        self._pending = []
+        self._conn = None
+        self._lock = threading.Lock()
+        self._local = threading.local()
+        if path:
+            self._conn = sqlite3.connect(path, timeout=30, check_same_thread=False)
+            self._conn.execute("PRAGMA journal_mode=WAL")
+            self._conn.execute(
+                "CREATE TABLE IF NOT EXISTS comments ("
+                "key BLOB PRIMARY KEY, cleaned TEXT NOT NULL, polarity REAL NOT NULL)"
+            )
+            self._conn.commit()
+
+    def _remember(self, key, value):
+        self._entries[key] = value
+        self._entries.move_to_end(key)
+        if len(self._entries) > self.max_entries:
+            self._entries.popitem(last=False)
+
+    def _load(self, keys):
+        """Fetch keys missing from memory out of the SQLite table"""
+        found = {}
+        for start in range(0, len(keys), 500):
+            chunk = keys[start:start + 500]
+            placeholders = ",".join("?" * len(chunk))
+            for key, cleaned, polarity in self._conn.execute(
+                f"SELECT key, cleaned, polarity FROM comments WHERE key IN ({placeholders})", chunk
+            ):
+                found[key] = (cleaned, polarity)
+        return found
+
+    def score(self, comments, backend_name='textblob'):
+        """Return (cleaned texts, polarities) for comments, scoring only unseen ones"""
+        normalized = [normalize_comment(c) for c in comments]
+        keys = [comment_key(backend_name, text) for text in normalized]
+
+        values = {}
+        missing = []
+        with self._lock:
+            for key in keys:
+                if key in values:
+                    continue
+                value = self._entries.get(key)
+                if value is not None:
+                    self._entries.move_to_end(key)
+                    values[key] = value
+                else:
+                    values[key] = None
+                    missing.append(key)
+
+            if missing and self._conn is not None:
+                for key, value in self._load(missing).items():
+                    values[key] = value
+                    self._remember(key, value)
+                missing = [key for key in missing if values[key] is None]
+
+        if missing:
+            first_text = {}
+            for key, text in zip(keys, normalized):
+                first_text.setdefault(key, text)
+            texts = [first_text[key] for key in missing]
+            cleaned = clean_series(texts).tolist()
+            polarities = get_backend(backend_name).score_many(cleaned)
+            with self._lock:
+                for key, text, polarity in zip(missing, cleaned, polarities):
+                    value = (text, float(polarity))
+                    values[key] = value
+                    self._remember(key, value)
+                    if self._conn is not None:
+                        self._pending.append((key, text, float(polarity)))
+
+        # Later duplicates of a new comment within this batch are hits
+        misses = len(set(missing))
+        hits = len(keys) - misses
+        with self._lock:
+            self.hits += hits
+            self.misses += misses
+        self._local.hits = getattr(self._local, 'hits', 0) + hits
+        self._local.misses = getattr(self._local, 'misses', 0) + misses
+
+        return [values[key][0] for key in keys], np.array([values[key][1] for key in keys], dtype=float)
+
+    def thread_counts(self):
+        """(hits, misses) of the calling thread's score() calls, so a task
+        can count its own while others share the cache"""
+        return getattr(self._local, 'hits', 0), getattr(self._local, 'misses', 0)
+
+    def flush(self):
+        """Write newly scored comments to the cache file"""
+        with self._lock:
+            if self._conn is None or not self._pending:
+                return
+            with self._conn:
+                self._conn.executemany(
+                    "INSERT OR IGNORE INTO comments (key, cleaned, polarity) VALUES (?, ?, ?)",
+                    self._pending
+                )
+            self._pending = []
+
+
+_comment_caches = {}
+_comment_caches_lock = threading.Lock()
+
+
+def get_comment_cache(max_entries=200000, path=None):
+    """Return this process's cache for the given settings"""
+    key = (max_entries, path)
+    with _comment_caches_lock:
+        if key not in _comment_caches:
+            _comment_caches[key] = CommentCache(max_entries, path)
+        return _comment_caches[key]
@@ -0,0 +1,191 @@
+import json
+import os
+import sqlite3
+import threading
+import time
+
+from output import dataset_parts
+
+# ============================================================================
+# TASK AND OUTPUT STORE
+# ============================================================================
+#
+# The API server keeps task metadata and results, and an index of the files
+# it has written, in one SQLite database (WAL mode).  Tasks survive a
+# restart, and the file list is an indexed query instead of a directory
+# crawl.  Output rows and sizes are recorded by an output listener when
+# each writer closes (see output.add_output_listener), so nothing has to be
+# re-read to list them.  Live task logs stay in memory.
+
+UNFINISHED_STATUSES = ('queued', 'running', 'cancelling')
+
+
+def disk_size(path):
+    """Bytes used by an output file or Parquet dataset directory"""
+    if os.path.isdir(path):
+        return sum(os.path.getsize(part) for part in dataset_parts(path))
+    if os.path.exists(path):
+        return os.path.getsize(path)
+    return None
+
+
+class TaskStore:
+    """Durable task records and output file index"""
+
+    def __init__(self, path):
+        self.path = path
+        self._lock = threading.Lock()
+        self.conn = sqlite3.connect(path, check_same_thread=False)
+        self.conn.row_factory = sqlite3.Row
+        self.conn.execute("PRAGMA journal_mode=WAL")
+        self.conn.execute("PRAGMA synchronous=NORMAL")
+        self.conn.executescript("""
+            CREATE TABLE IF NOT EXISTS tasks (
+                task_id TEXT PRIMARY KEY,
+                kind TEXT,
+                status TEXT NOT NULL,
+                params TEXT,
+                result TEXT,
+                error TEXT,
+                created_at REAL NOT NULL,
+                started_at REAL,
+                finished_at REAL
+            );
+            CREATE INDEX IF NOT EXISTS tasks_created ON tasks (created_at);
+            CREATE INDEX IF NOT EXISTS tasks_status ON tasks (status);
+            CREATE TABLE IF NOT EXISTS files (
+                filename TEXT PRIMARY KEY,
+                path TEXT NOT NULL,
+                task_id TEXT,
+                rows INTEGER,
+                size INTEGER,
+                created_at REAL NOT NULL,
+                updated_at REAL NOT NULL
+            );
+            CREATE INDEX IF NOT EXISTS files_created ON files (created_at);
+            CREATE INDEX IF NOT EXISTS files_task ON files (task_id);
+        """)
+        self.conn.commit()
+
+    def _write(self, sql, params=()):
+        with self._lock, self.conn:
+            return self.conn.execute(sql, params)
+
+    def _read(self, sql, params=()):
+        with self._lock:
+            return self.conn.execute(sql, params).fetchall()
+
+    # Tasks
+
+    def create_task(self, task_id, kind=None, params=None, created_at=None):
+        self._write(
+            "INSERT OR REPLACE INTO tasks (task_id, kind, status, params, created_at) "
+            "VALUES (?, ?, 'queued', ?, ?)",
+            (task_id, kind, json.dumps(params), created_at or time.time())
+        )
+
+    def set_status(self, task_id, status):
+        now = time.time()
+        if status == 'running':
+            self._write(
+                "UPDATE tasks SET status = ?, started_at = ? WHERE task_id = ?",
+                (status, now, task_id)
+            )
+        else:
+            self._write("UPDATE tasks SET status = ? WHERE task_id = ?", (status, task_id))
+
+    def finish_task(self, task_id, status, result=None, error=None):
+        self._write(
+            "UPDATE tasks SET status = ?, result = ?, error = ?, finished_at = ? WHERE task_id = ?",
+            (status, json.dumps(result), error, time.time(), task_id)
+        )
+
+    def delete_task(self, task_id):
+        self._write("DELETE FROM tasks WHERE task_id = ?", (task_id,))
+
+    def get_task(self, task_id):
+        rows = self._read("SELECT * FROM tasks WHERE task_id = ?", (task_id,))
+        return self._task(rows[0]) if rows else None
+
+    def list_tasks(self, limit=50, offset=0):
+        rows = self._read(
+            "SELECT * FROM tasks ORDER BY created_at DESC LIMIT ? OFFSET ?", (limit, offset)
+        )
+        return [self._task(row) for row in rows]
+
+    def _task(self, row):
+        task = dict(row)
+        task['params'] = json.loads(task['params']) if task['params'] else None
+        task['result'] = json.loads(task['result']) if task['result'] else None
+        return task
+
+    def fail_unfinished(self, error):
+        """Mark tasks a previous server process never finished"""
+        placeholders = ", ".join("?" for _ in UNFINISHED_STATUSES)
+        cursor = self._write(
+            f"UPDATE tasks SET status = 'error', error = ?, finished_at = ? "
+            f"WHERE status IN ({placeholders})",
+            (error, time.time(), *UNFINISHED_STATUSES)
+        )
+        return cursor.rowcount
+
+    # Output files
+
+    def link_file(self, path, task_id):
+        """Note which task writes an output, before anything is written"""
+        now = time.time()
+        self._write(
+            "INSERT INTO files (filename, path, task_id, created_at, updated_at) "
+            "VALUES (?, ?, ?, ?, ?) "
+            "ON CONFLICT (filename) DO UPDATE SET task_id = excluded.task_id",
+            (os.path.basename(path), path, task_id, now, now)
+        )
+
+    def record_file(self, path, rows, appended=False):
+        """Record an output's row count and size once a writer has closed it"""
+        now = time.time()
+        self._write(
+            "INSERT INTO files (filename, path, rows, size, created_at, updated_at) "
+            "VALUES (?, ?, ?, ?, ?, ?) "
+            "ON CONFLICT (filename) DO UPDATE SET "
+            "path = excluded.path, size = excluded.size, updated_at = excluded.updated_at, "
+            "rows = CASE WHEN ? THEN coalesce(files.rows, 0) + excluded.rows ELSE excluded.rows END",
+            (os.path.basename(path), path, rows, disk_size(path), now, now, int(appended))
+        )
+
+    def list_files(self, limit=None, offset=0):
+        rows = self._read(
+            "SELECT filename, task_id, rows, size, created_at, updated_at FROM files "
+            "WHERE size IS NOT NULL ORDER BY created_at DESC LIMIT ? OFFSET ?",
+            (-1 if limit is None else limit, offset)
+        )
+        return [dict(row) for row in rows]
+
+    def files_for_task(self, task_id):
+        rows = self._read(
+            "SELECT filename, rows, size FROM files WHERE task_id = ? AND size IS NOT NULL", (task_id,)
+        )
+        return [dict(row) for row in rows]
+
+    def remove_file(self, filename):
+        self._write("DELETE FROM files WHERE filename = ?", (filename,))
+
+    def reconcile(self, folder, is_output):
+        """Index outputs written while the server wasn't running and drop vanished ones
+
+        Run once at startup; row counts of files found this way are unknown.
+        """
+        on_disk = {name for name in os.listdir(folder) if is_output(name)}
+        indexed = {row['filename'] for row in self._read("SELECT filename FROM files")}
+        for name in indexed - on_disk:
+            self.remove_file(name)
+        for name in on_disk - indexed:
+            path = os.path.join(folder, name)
+            created = os.path.getctime(path)
+            self._write(
+                "INSERT INTO files (filename, path, size, created_at, updated_at) VALUES (?, ?, ?, ?, ?)",
+                (name, path, disk_size(path), created, created)
+            )
+
+    def close(self):
+        self.conn.close()
@@ -0,0 +1,385 @@
+import gzip
+import http.client
+import json
+import math
+import queue
+import threading
+import time
+import urllib.parse
+import zlib
+from concurrent.futures import ThreadPoolExecutor
+
+import metrics
+
+# ============================================================================
+# TRANSPORTS
+# ============================================================================
+#
+# Every Shopee API call goes through an object with a ``fetch_json(url)``
+# method that returns the decoded JSON body as a dict.  Failures never raise;
+# they come back as ``{'error': ...}`` exactly like the in-browser fetch()
+# path always did, so the scraping loops don't care which transport is used.
+
+SHOPEE_BASE_URL = "https://shopee.ph"
+
+FETCH_SCRIPT = """
+var callback = arguments[arguments.length - 1];
+fetch(arguments[0])
+    .then(response => response.json())
+    .then(data => callback(data))
+    .catch(err => callback({'error': err.message}));
+"""
+
+# Fetches a list of URLs with at most ``concurrency`` requests in flight and
+# returns the results in URL order; a failed page becomes {'error': ...}
+BATCH_FETCH_SCRIPT = """
+var urls = arguments[0];
+var concurrency = arguments[1];
+var callback = arguments[arguments.length - 1];
+var results = new Array(urls.length);
+var next = 0;
+
+function worker() {
+    if (next >= urls.length) {
+        return Promise.resolve();
+    }
+    var i = next++;
+    return fetch(urls[i])
+        .then(response => response.json())
+        .then(data => { results[i] = data; })
+        .catch(err => { results[i] = {'error': err.message}; })
+        .then(worker);
+}
+
+var workers = [];
+for (var w = 0; w < Math.min(concurrency, urls.length); w++) {
+    workers.push(worker());
+}
+Promise.all(workers).then(() => callback(results));
+"""
+
+DEFAULT_HEADERS = {
+    "Accept": "application/json",
+    "Accept-Encoding": "gzip",
+    "Accept-Language": "en-US,en;q=0.9",
+    "Referer": SHOPEE_BASE_URL + "/",
+    "X-Api-Source": "pc",
+    "X-Requested-With": "XMLHttpRequest",
+    "X-Shopee-Language": "en",
+}
+
+# Responses that mean the harvested session is no longer accepted
+STALE_HTTP_STATUSES = {401, 403}
+CAPTCHA_ERROR = 90309999
+
+
+class BrowserTransport:
+    """Runs fetch() inside the logged-in Chrome tab"""
+
+    def __init__(self, driver):
+        self.driver = driver
+        # WebDriver commands are not safe to issue from several threads at once
+        self._lock = threading.Lock()
+
+    def fetch_json(self, url):
+        with self._lock:
+            return self.driver.execute_async_script(FETCH_SCRIPT, url)
+
+    def fetch_json_batch(self, urls, concurrency=4):
+        """Fetch several URLs with one execute_async_script round-trip"""
+        if not urls:
+            return []
+        with self._lock:
+            return self.driver.execute_async_script(BATCH_FETCH_SCRIPT, list(urls), concurrency)
+
+
+class HttpTransport:
+    """Keep-alive, connection-pooled HTTP client using harvested session state"""
+
+    def __init__(self, cookies=None, headers=None, base_url=None, pool_size=8, timeout=30):
+        self.cookies = dict(cookies or {})
+        self.headers = dict(DEFAULT_HEADERS)
+        self.headers.update(headers or {})
+        self.base_url = base_url
+        self.pool_size = pool_size
+        self.timeout = timeout
+        self._pools = {}
+        self._pools_lock = threading.Lock()
+
+    @classmethod
+    def from_driver(cls, driver, **kwargs):
+        """Build a transport from the cookies and user agent of a Chrome session"""
+        transport = cls(**kwargs)
+        transport.harvest(driver)
+        return transport
+
+    def harvest(self, driver):
+        """Copy cookies and identifying headers from the browser session"""
+        cookies = {c['name']: c['value'] for c in driver.get_cookies()}
+        user_agent = driver.execute_script("return navigator.userAgent")
+        self.cookies = cookies
+        if user_agent:
+            self.headers['User-Agent'] = user_agent
+        if 'csrftoken' in cookies:
+            self.headers['X-CSRFToken'] = cookies['csrftoken']
+
+    def _resolve(self, url):
+        """Split a URL into (scheme, netloc, path), honouring base_url overrides"""
+        parts = urllib.parse.urlsplit(url)
+        scheme, netloc = parts.scheme, parts.netloc
+        if self.base_url:
+            base = urllib.parse.urlsplit(self.base_url)
+            scheme, netloc = base.scheme, base.netloc
+        path = parts.path or "/"
+        if parts.query:
+            path += "?" + parts.query
+        return scheme, netloc, path
+
+    def _pool(self, scheme, netloc):
+        with self._pools_lock:
+            key = (scheme, netloc)
+            if key not in self._pools:
+                self._pools[key] = queue.LifoQueue(maxsize=self.pool_size)
+            return self._pools[key]
+
+    def _connect(self, scheme, netloc):
+        if scheme == "https":
+            return http.client.HTTPSConnection(netloc, timeout=self.timeout)
+        return http.client.HTTPConnection(netloc, timeout=self.timeout)
+
+    def _request_headers(self):
+        headers = dict(self.headers)
+        if self.cookies:
+            headers['Cookie'] = "; ".join(f"{k}={v}" for k, v in self.cookies.items())
+        return headers
+
+    def fetch_json(self, url):
+        scheme, netloc, path = self._resolve(url)
+        pool = self._pool(scheme, netloc)
+        headers = self._request_headers()
+
+        # A pooled connection may have been closed by the server while idle,
+        # so one failure on a reused connection is retried on a fresh one.
+        for attempt in range(2):
+            try:
+                conn = pool.get_nowait()
+                reused = True
+            except queue.Empty:
+                conn = self._connect(scheme, netloc)
+                reused = False
+
+            try:
+                conn.request("GET", path, headers=headers)
+                resp = conn.getresponse()
+                body = resp.read()
+            except (OSError, http.client.HTTPException) as e:
+                conn.close()
+                if reused and attempt == 0:
+                    continue
+                return {'error': str(e), 'transport_error': True}
+
+            if resp.will_close:
+                conn.close()
+            else:
+                try:
+                    pool.put_nowait(conn)
+                except queue.Full:
+                    conn.close()
+            break
+
+        if resp.getheader('Content-Encoding', '') == 'gzip':
+            try:
+                body = gzip.decompress(body)
+            except (OSError, EOFError, zlib.error) as e:
+                # A truncated or corrupt body, e.g. a connection cut mid-response
+                return {'error': f"Bad gzip body: {e}", 'transport_error': True}
+
+        if resp.status >= 400:
+            return {'error': f"HTTP {resp.status}", 'http_status': resp.status}
+
+        try:
+            return json.loads(body)
+        except ValueError:
+            return {'error': 'Invalid JSON response', 'http_status': resp.status}
+
+    def fetch_json_batch(self, urls, concurrency=4):
+        """Fetch several URLs over up to ``concurrency`` pooled connections"""
+        if len(urls) <= 1 or concurrency <= 1:
+            return [self.fetch_json(url) for url in urls]
+        with ThreadPoolExecutor(max_workers=min(concurrency, len(urls))) as pool:
+            return list(pool.map(self.fetch_json, urls))
+
+    def close(self):
+        with self._pools_lock:
+            for pool in self._pools.values():
+                while True:
+                    try:
+                        pool.get_nowait().close()
+                    except queue.Empty:
+                        break
+            self._pools.clear()
+
+
+def is_stale(response):
+    """True when a direct HTTP response means the session was rejected"""
+    if response.get('http_status') in STALE_HTTP_STATUSES:
+        return True
+    if response.get('error') == CAPTCHA_ERROR:
+        return True
+    return bool(response.get('transport_error'))
+
+
+class SessionTransport:
+    """Direct HTTP first, falling back to the browser when the session goes stale.
+
+    On a stale response the cookies are re-harvested from the browser and the
+    request is retried once.  If that still fails the request is sent through
+    the browser, and the browser stays in charge for ``cooldown`` seconds
+    before direct HTTP is tried again.
+    """
+
+    def __init__(self, driver, base_url=None, pool_size=8, timeout=30, cooldown=300):
+        self.browser = BrowserTransport(driver)
+        self.http = HttpTransport.from_driver(
+            driver, base_url=base_url, pool_size=pool_size, timeout=timeout
+        )
+        self.cooldown = cooldown
+        self._fallback_until = 0
+        self._harvest_lock = threading.Lock()
+
+    def _fallback(self):
+        self._fallback_until = time.time() + self.cooldown
+        print(f"⚠️ Direct session rejected, using the browser for the next {self.cooldown}s")
+
+    def fetch_json(self, url):
+        if time.time() < self._fallback_until:
+            return self.browser.fetch_json(url)
+
+        response = self.http.fetch_json(url)
+        if not is_stale(response):
+            return response
+
+        with self._harvest_lock, self.browser._lock:
+            self.http.harvest(self.browser.driver)
+        response = self.http.fetch_json(url)
+        if not is_stale(response):
+            return response
+
+        self._fallback()
+        return self.browser.fetch_json(url)
+
+    def fetch_json_batch(self, urls, concurrency=4):
+        if time.time() < self._fallback_until:
+            return self.browser.fetch_json_batch(urls, concurrency)
+
+        responses = self.http.fetch_json_batch(urls, concurrency)
+        stale = [i for i, response in enumerate(responses) if is_stale(response)]
+        if not stale:
+            return responses
+
+        with self._harvest_lock, self.browser._lock:
+            self.http.harvest(self.browser.driver)
+        retried = self.http.fetch_json_batch([urls[i] for i in stale], concurrency)
+        for i, response in zip(stale, retried):
+            responses[i] = response
+
+        stale = [i for i in stale if is_stale(responses[i])]
+        if stale:
+            self._fallback()
+            retried = self.browser.fetch_json_batch([urls[i] for i in stale], concurrency)
+            for i, response in zip(stale, retried):
+                responses[i] = response
+        return responses
+
+    def close(self):
+        self.http.close()
+
+
+class PacedTransport:
+    """Draws every request from a shared budget before passing it on
+
+    Wait and request times are recorded in ``metrics`` here, where cache
+    hits have already been answered and only real requests remain.
+    """
+
+    def __init__(self, inner, limiter):
+        self.inner = inner
+        self.limiter = limiter
+
+    def fetch_json(self, url):
+        metrics.record_pacing(self.limiter.acquire())
+        start = time.monotonic()
+        response = self.inner.fetch_json(url)
+        latency = time.monotonic() - start
+        self.limiter.record(response, latency)
+        metrics.record_fetch(url, response, latency)
+        return response
+
+    def fetch_json_batch(self, urls, concurrency=4):
+        if not urls:
+            return []
+        metrics.record_pacing(self.limiter.acquire(len(urls)))
+        start = time.monotonic()
+        responses = fetch_json_batch(self.inner, urls, concurrency)
+        # Approximate per-request latency: the batch ran in waves of `concurrency`
+        latency = (time.monotonic() - start) / math.ceil(len(urls) / max(concurrency, 1))
+        for url, response in zip(urls, responses):
+            self.limiter.record(response, latency)
+            metrics.record_fetch(url, response, latency)
+        return responses
+
+
+class TaskCancelled(Exception):
+    """Raised in place of a request once the task sending it has been cancelled"""
+
+
+class CancellableTransport:
+    """Refuses further requests once ``cancelled`` (a threading.Event) is set.
+
+    Scrape loops request a page before writing it, so raising here stops a
+    scrape between pages; a review scrape's journal already holds every
+    page written.
+    """
+
+    def __init__(self, inner, cancelled):
+        self.inner = inner
+        self.cancelled = cancelled
+
+    def _check(self):
+        if self.cancelled.is_set():
+            raise TaskCancelled("Task cancelled")
+
+    def paced(self, limiter):
+        """The same check in front of a paced inner transport"""
+        if hasattr(self.inner, 'paced'):
+            return CancellableTransport(self.inner.paced(limiter), self.cancelled)
+        return CancellableTransport(PacedTransport(self.inner, limiter), self.cancelled)
+
+    def fetch_json(self, url):
+        self._check()
+        return self.inner.fetch_json(url)
+
+    def fetch_json_batch(self, urls, concurrency=4):
+        self._check()
+        return fetch_json_batch(self.inner, urls, concurrency)
+
+
+def as_transport(driver):
+    """Wrap a raw WebDriver in a BrowserTransport; pass transports through"""
+    if hasattr(driver, 'fetch_json'):
+        return driver
+    return BrowserTransport(driver)
+
+
+def fetch_json_batch(transport, urls, concurrency=4):
+    """Batch fetch through a transport, one request at a time if it can't batch"""
+    if hasattr(transport, 'fetch_json_batch'):
+        return transport.fetch_json_batch(urls, concurrency)
+    return [transport.fetch_json(url) for url in urls]
+
+
+def open_transport(driver, mode="browser", **kwargs):
+    """Build the transport selected on the command line"""
+    if mode == "http":
+        return SessionTransport(driver, **kwargs)
+    return BrowserTransport(driver)